@@ -0,0 +1,140 @@
+# Copyright Sierra
+
+"""
+Latency of search_direct_flight and search_onestop_flight as the flights
+table grows, with the route indexes versus the full scans they replaced.
+
+The airline flights table is replicated `--scale` times, each copy on its
+own airports, so the table grows while every query still returns the same
+flights. Run it from the repository root with tau_bench installed
+(`pip install -e .`):
+
+    python benchmarks/bench_flight_search.py --scales 1 4 16 64
+"""
+
+import json
+import time
+import random
+import argparse
+import statistics
+from typing import Any, Callable, Dict, List, Tuple
+
+from tau_bench.envs.airline.data import load_data
+from tau_bench.envs.airline.tools import SearchDirectFlight, SearchOnestopFlight
+from tau_bench.envs.snapshot import EpisodeData
+
+Query = Tuple[str, str, str]
+
+
+def scan_direct(data: Dict[str, Any], origin: str, destination: str, date: str) -> str:
+    # search_direct_flight before the route indexes
+    results = []
+    for flight in data["flights"].values():
+        if flight["origin"] == origin and flight["destination"] == destination:
+            if date in flight["dates"] and flight["dates"][date]["status"] == "available":
+                results.append({k: v for k, v in flight.items() if k != "dates"})
+                results[-1].update(flight["dates"][date])
+    return json.dumps(results)
+
+
+def scan_onestop(data: Dict[str, Any], origin: str, destination: str, date: str) -> str:
+    # search_onestop_flight before the route indexes
+    flights = data["flights"]
+    results = []
+    for flight1 in flights.values():
+        if flight1["origin"] != origin:
+            continue
+        for flight2 in flights.values():
+            if flight2["destination"] != destination or flight1["destination"] != flight2["origin"]:
+                continue
+            date2 = (
+                f"2024-05-{int(date[-2:])+1}"
+                if "+1" in flight1["scheduled_arrival_time_est"]
+                else date
+            )
+            if flight1["scheduled_arrival_time_est"] > flight2["scheduled_departure_time_est"]:
+                continue
+            if date in flight1["dates"] and date2 in flight2["dates"]:
+                if (
+                    flight1["dates"][date]["status"] == "available"
+                    and flight2["dates"][date2]["status"] == "available"
+                ):
+                    result1 = {k: v for k, v in flight1.items() if k != "dates"}
+                    result1.update(flight1["dates"][date])
+                    result1["date"] = date
+                    result2 = {k: v for k, v in flight2.items() if k != "dates"}
+                    result2.update(flight2["dates"][date])
+                    result2["date"] = date2
+                    results.append([result1, result2])
+    return json.dumps(results)
+
+
+def scaled_data(scale: int) -> Dict[str, Any]:
+    data = load_data()
+    flights: Dict[str, Any] = {}
+    for copy in range(scale):
+        suffix = "" if copy == 0 else f"-{copy}"
+        for flight_number, flight in data["flights"].items():
+            flights[flight_number + suffix] = {
+                **flight,
+                "flight_number": flight_number + suffix,
+                "origin": flight["origin"] + suffix,
+                "destination": flight["destination"] + suffix,
+            }
+    data["flights"] = flights
+    return data
+
+
+def make_queries(data: Dict[str, Any], num_queries: int, seed: int) -> List[Query]:
+    rng = random.Random(seed)
+    # queries stay on the original airports, so their results do not change with scale
+    airports = sorted({flight["origin"] for flight in data["flights"].values() if "-" not in flight["origin"]})
+    return [
+        (rng.choice(airports), rng.choice(airports), f"2024-05-{rng.randint(1, 30):02d}")
+        for _ in range(num_queries)
+    ]
+
+
+def time_queries(search: Callable[..., str], data: Any, queries: List[Query]) -> List[float]:
+    latencies = []
+    for origin, destination, date in queries:
+        started_at = time.perf_counter()
+        search(data, origin, destination, date)
+        latencies.append(time.perf_counter() - started_at)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=10)
+    args = parser.parse_args()
+
+    searches = [
+        ("direct", scan_direct, SearchDirectFlight._raw_invoke),
+        ("onestop", scan_onestop, SearchOnestopFlight._raw_invoke),
+    ]
+    print(f"{'flights':>8} {'search':>8} {'scan p50':>10} {'index p50':>10} {'speedup':>8} {'index build':>12}")
+    for scale in args.scales:
+        base = scaled_data(scale)
+        queries = make_queries(base, args.queries, args.seed)
+        episode = EpisodeData(base)
+        # the first query builds the shared indexes for this snapshot
+        started_at = time.perf_counter()
+        SearchDirectFlight._raw_invoke(episode, *queries[0])
+        SearchOnestopFlight._raw_invoke(episode, *queries[0])
+        build = time.perf_counter() - started_at
+        for name, scan, indexed in searches:
+            for query in queries:
+                assert scan(base, *query) == indexed(episode, *query)
+            scan_p50 = statistics.median(time_queries(scan, base, queries))
+            index_p50 = statistics.median(time_queries(indexed, episode, queries))
+            print(
+                f"{len(base['flights']):>8} {name:>8} {scan_p50 * 1e3:>8.3f}ms {index_p50 * 1e3:>8.3f}ms"
+                f" {scan_p50 / index_p50:>7.1f}x {build * 1e3:>10.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
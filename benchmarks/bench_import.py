@@ -0,0 +1,67 @@
+# Copyright Sierra
+
+"""
+Time to import a domain package (its tools, and so their supervisors) in a
+fresh interpreter, as the CLI and every spawned worker process do. Each
+run is a new `python -X importtime` subprocess; the median wall time and
+the cumulative import time of the heaviest tau_bench modules are reported.
+Run it from the repository root with tau_bench installed (`pip install -e .`):
+
+    python benchmarks/bench_import.py --module tau_bench.envs.retail --runs 10
+"""
+
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+
+def import_once(module: str) -> Tuple[float, Dict[str, int]]:
+    started_at = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = time.perf_counter() - started_at
+    # lines look like "import time:  self [us] | cumulative | imported package"
+    cumulative: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line[len("import time:") :].split("|")
+        name = name.strip()
+        if name.startswith("tau_bench") and cumulative_us.strip().isdigit():
+            cumulative[name] = int(cumulative_us)
+    return elapsed, cumulative
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", type=str, default="tau_bench.envs.retail")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=5, help="Number of tau_bench modules to list")
+    args = parser.parse_args()
+
+    # the first run warms the bytecode and filesystem caches
+    import_once(args.module)
+    walls: List[float] = []
+    modules: Dict[str, List[int]] = {}
+    for _ in range(args.runs):
+        elapsed, cumulative = import_once(args.module)
+        walls.append(elapsed)
+        for name, us in cumulative.items():
+            modules.setdefault(name, []).append(us)
+
+    print(f"import {args.module}, {args.runs} runs")
+    print(f"  wall time p50: {statistics.median(walls) * 1e3:.0f}ms (min {min(walls) * 1e3:.0f}ms)")
+    heaviest = sorted(modules.items(), key=lambda item: -statistics.median(item[1]))[: args.top]
+    for name, us in heaviest:
+        print(f"  {name:<40} {statistics.median(us) / 1e3:>8.1f}ms cumulative")
+
+
+if __name__ == "__main__":
+    main()
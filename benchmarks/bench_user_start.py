@@ -0,0 +1,96 @@
+# Copyright Sierra
+
+"""
+User-model requests and latency spent per episode before the agent's first
+turn, i.e. building envs the way run.py does and resetting one to a task.
+
+The user model is replaced by litellm's mock responses with a fixed
+latency, so the benchmark sends nothing to the provider. `--eager`
+reproduces the old constructors, which reset the user simulator (issuing
+a request with no instruction) as soon as it was built. Run it from the
+repository root with tau_bench installed (`pip install -e .`):
+
+    python benchmarks/bench_user_start.py --env retail --episodes 20
+    python benchmarks/bench_user_start.py --env retail --episodes 20 --eager
+"""
+
+import time
+import argparse
+import threading
+from typing import Any, Dict
+
+import litellm
+
+from tau_bench.envs import get_env
+from tau_bench.envs.user import ReactUserSimulationEnv
+
+MOCK_RESPONSE = "Thought:\nI should say hello.\n\nUser Response:\nHi, I need help with an order."
+
+stats: Dict[str, float] = {"requests": 0, "latency": 0.0}
+stats_lock = threading.Lock()
+
+
+def install_mock_completion(latency: float) -> None:
+    real_completion = litellm.completion
+
+    def mock_completion(**kwargs: Any) -> Any:
+        started_at = time.perf_counter()
+        time.sleep(latency)
+        res = real_completion(mock_response=MOCK_RESPONSE, **kwargs)
+        with stats_lock:
+            stats["requests"] += 1
+            stats["latency"] += time.perf_counter() - started_at
+        return res
+
+    # tau_bench.rate_limit calls litellm.completion through the module
+    litellm.completion = mock_completion
+
+
+def build_env(args: argparse.Namespace, task_index: int):
+    env = get_env(
+        args.env,
+        user_strategy=args.user_strategy,
+        user_model="gpt-4o",
+        user_provider="openai",
+        task_split="test",
+        task_index=task_index,
+    )
+    if args.eager:
+        # what LLMUserSimulationEnv.__init__ (and ReactUserSimulationEnv's,
+        # a second time) used to do
+        env.user.reset()
+        if isinstance(env.user, ReactUserSimulationEnv):
+            env.user.reset()
+    return env
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--env", type=str, choices=["retail", "airline"], default="retail")
+    parser.add_argument("--user-strategy", type=str, default="llm", choices=["llm", "react"])
+    parser.add_argument("--episodes", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per mocked user-model request")
+    parser.add_argument("--eager", action="store_true", help="Reset the user on construction, as before")
+    args = parser.parse_args()
+
+    install_mock_completion(args.latency)
+
+    started_at = time.perf_counter()
+    # run.py builds one env up front for the task list and the agent
+    build_env(args, task_index=0)
+    for idx in range(args.episodes):
+        # ... and one isolated env per task, which is then reset to the task
+        env = build_env(args, task_index=idx)
+        env.reset(task_index=idx)
+    elapsed = time.perf_counter() - started_at
+
+    mode = "eager" if args.eager else "lazy"
+    print(f"{mode} user start, {args.user_strategy} user, {args.episodes} episodes")
+    print(f"  user-model requests:             {stats['requests']:.0f}")
+    print(f"  requests per episode:            {stats['requests'] / args.episodes:.2f}")
+    print(f"  user-model latency per episode:  {stats['latency'] / args.episodes:.3f}s")
+    print(f"  wall time per episode:           {elapsed / args.episodes:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# Copyright Sierra
+
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple, Type
+
+from tau_bench.envs.tool import Tool
+from tau_bench.envs.gt_cache import (
+    CACHE_DIR_ENV_VAR,
+    GroundTruthHashCache,
+    default_cache_dir,
+    replay_ground_truth,
+    task_key,
+)
+from tau_bench.types import Task
+
+Domain = Tuple[Callable[[], Dict[str, Any]], List[Type[Tool]], List[str], Dict[str, List[Task]]]
+
+
+def get_domain(env: str) -> Domain:
+    if env == "retail":
+        from tau_bench.envs.retail.data import load_data
+        from tau_bench.envs.retail.env import TERMINATE_TOOLS
+        from tau_bench.envs.retail.tools import ALL_TOOLS
+        from tau_bench.envs.retail.tasks_test import TASKS_TEST
+        from tau_bench.envs.retail.tasks_train import TASKS_TRAIN
+        from tau_bench.envs.retail.tasks_dev import TASKS_DEV
+
+        return load_data, ALL_TOOLS, TERMINATE_TOOLS, {"test": TASKS_TEST, "train": TASKS_TRAIN, "dev": TASKS_DEV}
+    elif env == "airline":
+        from tau_bench.envs.airline.data import load_data
+        from tau_bench.envs.airline.env import TERMINATE_TOOLS
+        from tau_bench.envs.airline.tools import ALL_TOOLS
+        from tau_bench.envs.airline.tasks_test import TASKS
+
+        return load_data, ALL_TOOLS, TERMINATE_TOOLS, {"test": TASKS}
+    else:
+        raise ValueError(f"Unknown environment: {env}")
+
+
+def compute_hashes(env: str, split: str, task_indices: List[int]) -> Dict[str, str]:
+    load_data, tools, terminate_tools, splits = get_domain(env)
+    tasks = splits[split]
+    return {
+        task_key(tasks[idx]): replay_ground_truth(load_data, tools, terminate_tools, tasks[idx])
+        for idx in task_indices
+    }
+
+
+def precompute(env: str, cache_dir: str, num_workers: int, chunk_size: int, force: bool) -> None:
+    load_data, tools, _, splits = get_domain(env)
+    cache = GroundTruthHashCache.for_data(load_data, tools, cache_dir=cache_dir)
+    jobs = []
+    for split, tasks in splits.items():
+        # tasks graded on their outputs never replay their actions
+        idxs = [
+            idx
+            for idx, task in enumerate(tasks)
+            if len(task.outputs) == 0 and (force or cache.get(task) is None)
+        ]
+        print(f"{env}/{split}: {len(idxs)} of {len(tasks)} tasks to replay")
+        for start in range(0, len(idxs), chunk_size):
+            jobs.append((env, split, idxs[start : start + chunk_size]))
+    if len(jobs) == 0:
+        print(f"{env}: cache is up to date ({cache.path})")
+        return
+    start_time = time.time()
+    hashes: Dict[str, str] = {}
+    # each worker loads and hashes the base data once, then replays its chunks
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        for chunk in executor.map(compute_hashes, *zip(*jobs)):
+            hashes.update(chunk)
+    cache.update(hashes)
+    print(
+        f"{env}: wrote {len(hashes)} hashes to {cache.path} in {time.time() - start_time:.1f}s"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Replay every task's ground-truth actions once and cache the resulting data hashes used by Env.calculate_reward"
+    )
+    parser.add_argument("--env", type=str, choices=["retail", "airline", "all"], default="all")
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=None,
+        help=f"Defaults to ${CACHE_DIR_ENV_VAR}. Runs only read cached hashes when it is set",
+    )
+    parser.add_argument("--num-workers", type=int, default=None, help="Defaults to the number of CPUs")
+    parser.add_argument("--chunk-size", type=int, default=16, help="Tasks per job sent to a worker")
+    parser.add_argument("--force", action="store_true", help="Recompute hashes that are already cached")
+    args = parser.parse_args()
+    cache_dir = args.cache_dir or default_cache_dir()
+    if cache_dir is None:
+        sys.exit(f"Pass --cache-dir or set ${CACHE_DIR_ENV_VAR}: the cache is not persisted otherwise")
+
+    envs = ["retail", "airline"] if args.env == "all" else [args.env]
+    for env in envs:
+        precompute(env, cache_dir, args.num_workers, args.chunk_size, args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,46 @@
 
 import os
 import json
+import asyncio
+import functools
+import threading
 import random
 import argparse
 import traceback
 from math import comb
-import multiprocessing
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 
 from tau_bench.envs import get_env
+from tau_bench.envs.base import Env
+from tau_bench.envs.pool import EnvPool
 from tau_bench.agents.base import Agent
 from tau_bench.types import EnvRunResult
+from tau_bench.runner.checkpoint import (
+    CheckpointWriter,
+    index_checkpoint,
+    load_checkpoint,
+    merge_results,
+)
+from tau_bench.runner.adaptive import AdaptiveConcurrency
+from tau_bench.runner.async_runner import run_work_queue_async
+from tau_bench.runner.process_pool import run_work_queue_sharded
+from tau_bench.runner.work_queue import (
+    WorkQueue,
+    default_worker_id,
+    merge_shards,
+    run_queue_worker,
+    shard_path,
+    shard_paths,
+    wait_for_queue,
+)
+from tau_bench.runner.scheduler import SCHEDULE_ORDERS, WorkItem, build_work_queue
+from tau_bench.rate_limit import add_call_observer, limit_openai_client, set_rate_limit
 from litellm import provider_list
 from tau_bench.envs.user import UserStrategy
 from entropy_labs.supervision.config import supervision_config
+from entropy_labs.supervision import supervisors as entropy_supervisors
 from entropy_labs.api import (
     register_project,
     create_run,
@@ -32,6 +57,11 @@ import importlib
 import inspect
 
 from tau_bench.envs.tool import Tool
+from tau_bench.envs.speculation import set_speculative_execution
+from tau_bench.envs.supervision import register_supervised_functions, set_max_concurrent_calls
+from tau_bench.envs.supervision_mode import SUPERVISION_MODES, set_supervision_mode
+from tau_bench.envs.supervision_profile import SupervisionProfile, profiling
+from tau_bench.envs.verdict_cache import VerdictCache, caching
 
 ENVIRONMENT = "retail" #"airline"
 
@@ -39,7 +69,10 @@ ENVIRONMENT = "retail" #"airline"
 def run(
     args: argparse.Namespace,
     ckpt_path: str,
+    completed: Optional[Set[Tuple[int, int]]] = None,
 ) -> List[EnvRunResult]:
+    configure_rate_limits(args)
+    configure_supervision(args)
     print(f"Loading user with strategy: {args.user_strategy}")
     env = get_env(
         args.env,
@@ -47,6 +80,7 @@ def run(
         user_model=args.user_model,
         user_provider=args.user_model_provider,
         task_split=args.task_split,
+        extra_tools=args.extra_tools,
     )
     agent = agent_factory(
         tools_info=env.tools_info,
@@ -57,92 +91,349 @@ def run(
         len(env.tasks) if args.end_index == -1 else min(args.end_index, len(env.tasks))
     )
     results: List[EnvRunResult] = []
-    lock = multiprocessing.Lock()
+    if args.task_ids and len(args.task_ids) > 0:
+        idxs = args.task_ids
+    else:
+        idxs = list(range(args.start_index, end_index))
+    work = build_work_queue(
+        task_ids=idxs,
+        num_trials=args.num_trials,
+        tasks=env.tasks,
+        completed=completed,
+        shuffle=bool(args.shuffle),
+        order=args.schedule,
+    )
+    if args.queue is not None:
+        return run_from_queue(args, work)
+
+    ckpt_writer = CheckpointWriter(ckpt_path, fsync_every=args.checkpoint_fsync_every)
     if args.task_ids and len(args.task_ids) > 0:
         print(f"Running tasks {args.task_ids} (checkpoint path: {ckpt_path})")
     else:
         print(
             f"Running tasks {args.start_index} to {end_index} (checkpoint path: {ckpt_path})"
     )
-    for i in range(args.num_trials):
-        if args.task_ids and len(args.task_ids) > 0:
-            idxs = args.task_ids
-        else:
-            idxs = list(range(args.start_index, end_index))
-        if args.shuffle:
-            random.shuffle(idxs)
-
-        def _run(idx: int) -> EnvRunResult:
-            isolated_env = get_env(
-                args.env,
-                user_strategy=args.user_strategy,
-                user_model=args.user_model,
-                task_split=args.task_split,
-                user_provider=args.user_model_provider,
-                task_index=idx,
-            )
 
-            print(f"Running task {idx}")
-            # Create an execution for the task
-            # Register the project and create a run
-            project_id = register_project(f"Tau Bench", "http://localhost:8080")
-            task_id = register_task(project_id=project_id, task_name=f"Tau Bench {ENVIRONMENT} Task {idx}")
-            run_id = create_run(project_id=project_id, task_id=task_id, run_name=f"Tau Bench {ENVIRONMENT} Task {idx}")
-            supervision_config.run_id = run_id
-
-            # Register all tools and supervisors
-            register_tools_and_supervisors(run_id)
-
-            try:
-                res = agent.solve(
-                    env=isolated_env,
-                    task_index=idx,
-                )
-                print(f"Result: Reward={res.reward} Info={res.info}")
-                result = EnvRunResult(
-                    task_id=idx,
-                    reward=res.reward,
-                    info=res.info,
-                    traj=res.messages,
-                    trial=i,
-                )
-                # send the result to the sentinel API
-                status = Status.COMPLETED
-                submit_run_status(run_id, status)
-                # send the result to the supervisor
-                run_outcome = "passed" if res.reward == 1 else "failed"
-                update_run_result(run_id, run_outcome, supervision_config.client)
-            except Exception as e:
-                result = EnvRunResult(
-                    task_id=idx,
-                    reward=0.0,
-                    info={"error": str(e), "traceback": traceback.format_exc()},
-                    traj=[],
-                    trial=i,
+    controller: Optional[AdaptiveConcurrency] = None
+    if args.adaptive_concurrency:
+        controller = AdaptiveConcurrency(
+            max_concurrency=args.max_concurrency,
+            min_concurrency=args.min_concurrency,
+            initial_concurrency=max(args.min_concurrency, args.max_concurrency // 4),
+        )
+        add_call_observer(controller.observe_call)
+    num_done = 0
+    num_done_lock = threading.Lock()
+
+    env_pool = EnvPool(
+        user_model=args.user_model,
+        user_provider=args.user_model_provider,
+        max_envs_per_key=args.max_concurrency,
+        extra_tools=args.extra_tools,
+    )
+
+    def _run_pooled(idx: int, trial: int) -> EnvRunResult:
+        with env_pool.env(args.env, args.task_split, args.user_strategy, idx) as pooled_env:
+            return run_episode(args=args, agent=agent, idx=idx, trial=trial, env=pooled_env)
+
+    def _run(item: WorkItem) -> EnvRunResult:
+        nonlocal num_done
+        trial, idx = item
+        if controller is None:
+            result = _run_pooled(idx, trial)
+            ckpt_writer.write(result)
+            return result
+        controller.acquire()
+        result = None
+        try:
+            result = _run_pooled(idx, trial)
+        finally:
+            controller.release(result)
+        ckpt_writer.write(result)
+        with num_done_lock:
+            num_done += 1
+            print(f"[{num_done}/{len(work)}] {controller.status()}")
+        return result
+
+    async def _run_async(item: WorkItem) -> EnvRunResult:
+        trial, idx = item
+        pooled_env = await asyncio.to_thread(
+            env_pool.checkout, args.env, args.task_split, args.user_strategy, idx
+        )
+        try:
+            return await run_episode_async(
+                args=args, agent=agent, idx=idx, trial=trial, env=pooled_env
+            )
+        finally:
+            env_pool.checkin(pooled_env)
+
+    if args.workers > 0:
+        results.extend(
+            run_work_queue_sharded(
+                work,
+                functools.partial(make_episode_runner, args),
+                num_workers=args.workers,
+                threads_per_worker=max(1, args.max_concurrency // args.workers),
+                on_result=ckpt_writer.write,
+            )
+        )
+    elif args.use_async:
+        results.extend(
+            asyncio.run(
+                run_work_queue_async(
+                    work,
+                    _run_async,
+                    max_concurrency=args.max_concurrency,
+                    on_result=ckpt_writer.write,
+                    controller=controller,
                 )
-            # TODO: End the run
-            print(
-                "✅" if result.reward == 1 else "❌",
-                f"task_id={idx}",
-                result.info,
             )
-            print("-----")
-            with lock:
-                data = []
-                if os.path.exists(ckpt_path):
-                    with open(ckpt_path, "r") as f:
-                        data = json.load(f)
-                with open(ckpt_path, "w") as f:
-                    json.dump(data + [result.model_dump()], f, indent=2)
-            return result
-
+        )
+    else:
+        # one pool for every (trial, task) pair, so a trial's slowest episode
+        # never holds back the next trial
         with ThreadPoolExecutor(max_workers=args.max_concurrency) as executor:
-            res = list(executor.map(_run, idxs))
-            results.extend(res)
+            results.extend(executor.map(_run, work))
 
+    ckpt_writer.close()
     return results
 
 
+def run_from_queue(args: argparse.Namespace, work: List[WorkItem]) -> List[EnvRunResult]:
+    work_queue = WorkQueue(args.queue, lease_seconds=args.queue_lease_seconds)
+    if args.queue_role == "coordinator":
+        num_added = work_queue.enqueue(work)
+        print(f"Added {num_added} episodes to {args.queue}")
+        wait_for_queue(work_queue)
+        shards = shard_paths(args.queue)
+        print(f"Merging {len(shards)} worker shards")
+        return merge_shards(args.queue)
+    worker_id = args.worker_id or default_worker_id()
+    path = shard_path(args.queue, worker_id)
+    print(f"Worker {worker_id} draining {args.queue} (shard: {path})")
+    # fsync every result: a pair is only marked done once its shard line is durable
+    with CheckpointWriter(path, fsync_every=1) as ckpt_writer:
+        return run_queue_worker(
+            work_queue,
+            worker_id,
+            make_episode_runner(args),
+            ckpt_writer,
+            num_threads=args.max_concurrency,
+        )
+
+
+def run_episode(
+    args: argparse.Namespace,
+    agent: Agent,
+    idx: int,
+    trial: int,
+    env: Optional[Env] = None,
+) -> EnvRunResult:
+    if env is not None:
+        # `agent.solve` resets the env to the task, so it can be reused
+        isolated_env = env
+    else:
+        isolated_env = get_env(
+            args.env,
+            user_strategy=args.user_strategy,
+            user_model=args.user_model,
+            task_split=args.task_split,
+            extra_tools=args.extra_tools,
+            user_provider=args.user_model_provider,
+            task_index=idx,
+        )
+
+    print(f"Running task {idx} (trial {trial})")
+    # Create an execution for the task
+    # Register the project and create a run
+    project_id = register_project(f"Tau Bench", "http://localhost:8080")
+    task_id = register_task(project_id=project_id, task_name=f"Tau Bench {ENVIRONMENT} Task {idx}")
+    register_supervised_functions()
+    run_id = create_run(project_id=project_id, task_id=task_id, run_name=f"Tau Bench {ENVIRONMENT} Task {idx}")
+    supervision_config.run_id = run_id
+
+    # Register all tools and supervisors
+    register_tools_and_supervisors(run_id)
+
+    profile = SupervisionProfile()
+    # decisions are only reused within the episode
+    verdict_cache = VerdictCache(args.supervisor_cache_size, args.supervisor_cache_reuses)
+    try:
+        with profiling(profile), caching(verdict_cache):
+            res = agent.solve(
+                env=isolated_env,
+                task_index=idx,
+            )
+        print(f"Result: Reward={res.reward} Info={res.info}")
+        result = EnvRunResult(
+            task_id=idx,
+            reward=res.reward,
+            info=res.info,
+            traj=res.messages,
+            trial=trial,
+        )
+        # send the result to the sentinel API
+        status = Status.COMPLETED
+        submit_run_status(run_id, status)
+        # send the result to the supervisor
+        run_outcome = "passed" if res.reward == 1 else "failed"
+        update_run_result(run_id, run_outcome, supervision_config.client)
+    except Exception as e:
+        result = EnvRunResult(
+            task_id=idx,
+            reward=0.0,
+            info={"error": str(e), "traceback": traceback.format_exc()},
+            traj=[],
+            trial=trial,
+        )
+    result.info["supervision"] = {
+        "mode": args.supervision,
+        "speculative_tools": args.speculative_tools,
+        "supervisors": profile.summary(),
+        "verdict_cache": verdict_cache.stats(),
+    }
+    # TODO: End the run
+    print(
+        "✅" if result.reward == 1 else "❌",
+        f"task_id={idx}",
+        result.info,
+    )
+    print("-----")
+    return result
+
+
+async def run_episode_async(
+    args: argparse.Namespace,
+    agent: Agent,
+    idx: int,
+    trial: int,
+    env: Optional[Env] = None,
+) -> EnvRunResult:
+    if env is not None:
+        isolated_env = env
+    else:
+        isolated_env = await asyncio.to_thread(
+            get_env,
+            args.env,
+            user_strategy=args.user_strategy,
+            user_model=args.user_model,
+            task_split=args.task_split,
+            extra_tools=args.extra_tools,
+            user_provider=args.user_model_provider,
+            task_index=idx,
+        )
+
+    print(f"Running task {idx} (trial {trial})")
+    project_id = await asyncio.to_thread(register_project, f"Tau Bench", "http://localhost:8080")
+    task_id = await asyncio.to_thread(register_task, project_id=project_id, task_name=f"Tau Bench {ENVIRONMENT} Task {idx}")
+    await asyncio.to_thread(register_supervised_functions)
+    run_id = await asyncio.to_thread(create_run, project_id=project_id, task_id=task_id, run_name=f"Tau Bench {ENVIRONMENT} Task {idx}")
+    supervision_config.run_id = run_id
+    await asyncio.to_thread(register_tools_and_supervisors, run_id)
+
+    profile = SupervisionProfile()
+    # decisions are only reused within the episode
+    verdict_cache = VerdictCache(args.supervisor_cache_size, args.supervisor_cache_reuses)
+    try:
+        with profiling(profile), caching(verdict_cache):
+            res = await agent.solve_async(
+                env=isolated_env,
+                task_index=idx,
+            )
+        print(f"Result: Reward={res.reward} Info={res.info}")
+        result = EnvRunResult(
+            task_id=idx,
+            reward=res.reward,
+            info=res.info,
+            traj=res.messages,
+            trial=trial,
+        )
+        await asyncio.to_thread(submit_run_status, run_id, Status.COMPLETED)
+        run_outcome = "passed" if res.reward == 1 else "failed"
+        await asyncio.to_thread(update_run_result, run_id, run_outcome, supervision_config.client)
+    except Exception as e:
+        result = EnvRunResult(
+            task_id=idx,
+            reward=0.0,
+            info={"error": str(e), "traceback": traceback.format_exc()},
+            traj=[],
+            trial=trial,
+        )
+    result.info["supervision"] = {
+        "mode": args.supervision,
+        "speculative_tools": args.speculative_tools,
+        "supervisors": profile.summary(),
+        "verdict_cache": verdict_cache.stats(),
+    }
+    print(
+        "✅" if result.reward == 1 else "❌",
+        f"task_id={idx}",
+        result.info,
+    )
+    print("-----")
+    return result
+
+
+def make_episode_runner(args: argparse.Namespace) -> Callable[[WorkItem], EnvRunResult]:
+    """
+    Build an agent once and return a function that runs one (trial, task)
+    pair with it. Envs come from a pool shared by the threads that call the
+    runner, so each is built once and reused across episodes.
+    """
+    # every worker process gets an equal share of the provider quotas
+    configure_rate_limits(args, share=1.0 / max(1, args.workers))
+    configure_supervision(args, max_concurrency=max(1, args.max_concurrency // max(1, args.workers)))
+    env = get_env(
+        args.env,
+        user_strategy=args.user_strategy,
+        user_model=args.user_model,
+        user_provider=args.user_model_provider,
+        task_split=args.task_split,
+        extra_tools=args.extra_tools,
+    )
+    agent = agent_factory(tools_info=env.tools_info, wiki=env.wiki, args=args)
+    env_pool = EnvPool(
+        user_model=args.user_model,
+        user_provider=args.user_model_provider,
+        max_envs_per_key=args.max_concurrency,
+        extra_tools=args.extra_tools,
+    )
+
+    def _run(item: WorkItem) -> EnvRunResult:
+        trial, idx = item
+        with env_pool.env(args.env, args.task_split, args.user_strategy, idx) as pooled_env:
+            return run_episode(args=args, agent=agent, idx=idx, trial=trial, env=pooled_env)
+
+    return _run
+
+
+def configure_rate_limits(args: argparse.Namespace, share: float = 1.0) -> None:
+    """
+    Install the `--rate-limit` budgets, scaled by `share`. The agent, the
+    user simulator and the LLM supervisors all draw from the same budget
+    for a given provider and model. Budgets are per process: `--workers`
+    processes split them, but every `--queue` worker gets the full budget.
+    """
+    for target, rpm, tpm in args.rate_limit or []:
+        provider, _, model = target.partition("/")
+        set_rate_limit(
+            provider,
+            model or None,
+            requests_per_minute=float(rpm) * share or None,
+            tokens_per_minute=float(tpm) * share or None,
+        )
+    # the supervisors call the OpenAI SDK directly rather than through litellm
+    limit_openai_client(entropy_supervisors.client, provider="openai")
+
+
+def configure_supervision(args: argparse.Namespace, max_concurrency: Optional[int] = None) -> None:
+    set_supervision_mode(args.supervision)
+    # each episode in flight has at most one supervised call at a time
+    max_concurrent_calls = max_concurrency or args.max_concurrency
+    set_max_concurrent_calls(max_concurrent_calls)
+    set_speculative_execution(args.speculative_tools, max_concurrent_calls)
+
+
 def agent_factory(
     tools_info: List[Dict[str, Any]], wiki, args: argparse.Namespace
 ) -> Agent:
@@ -211,6 +502,14 @@ def display_metrics(results: List[EnvRunResult]) -> None:
         print(f"  k={k}: {pass_hat_k}")
 
 
+def results_path_for_checkpoint(ckpt_path: str) -> str:
+    base = ckpt_path
+    for suffix in (".gz", ".jsonl", ".ckpt"):
+        if base.endswith(suffix):
+            base = base[: -len(suffix)]
+    return base + ".json"
+
+
 def find_all_tools():
     """
     Dynamically find all classes inheriting from Tool in the tau_bench.envs package.
@@ -232,6 +531,42 @@ def find_all_tools():
     return tools
 
 
+def display_supervision_profile(results: List[EnvRunResult]) -> None:
+    profile = SupervisionProfile.merged(
+        result.info["supervision"]["supervisors"]
+        for result in results
+        if "supervision" in result.info
+    )
+    summary = profile.summary()
+    if len(summary) == 0:
+        return
+    print("🔍 Supervision profile")
+    for name, stats in summary.items():
+        p50, p95 = stats["latency_p50"], stats["latency_p95"]
+        print(
+            f"  {name}: {stats['invocations']} calls ({stats['cached']} cached),"
+            f" {stats['approve_rate']:.0%} approved, {stats['reject_rate']:.0%} rejected,"
+            f" latency p50 {p50:.2f}s p95 {p95:.2f}s,"
+            f" {stats['prompt_tokens'] + stats['completion_tokens']} tokens"
+        )
+        for tool, tokens in sorted(stats["tokens_by_tool"].items(), key=lambda item: -item[1]):
+            if tokens > 0:
+                print(f"    {tool}: {tokens} tokens")
+
+
+def display_verdict_cache_stats(results: List[EnvRunResult]) -> None:
+    stats = VerdictCache.merged_stats(
+        result.info["supervision"]["verdict_cache"]
+        for result in results
+        if "verdict_cache" in result.info.get("supervision", {})
+    )
+    if len(stats) == 0:
+        return
+    print("🗂️ Supervisor verdict cache")
+    for name, counts in stats.items():
+        print(f"  {name}: {counts['hits']} hits, {counts['misses']} misses ({counts['hit_rate']:.0%} hit rate)")
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--num-trials", type=int, default=1)
@@ -283,6 +618,15 @@ def main():
         choices=["train", "test", "dev"],
         help="The split of tasks to run (only applies to the retail domain for now",
     )
+    parser.add_argument(
+        "--extra-tools",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Optional tools to give the agent on top of the domain's standard ones "
+        "(airline: search_multistop_flight). This changes the benchmark, so results "
+        "are only comparable to runs with the same extra tools",
+    )
     parser.add_argument("--start-index", type=int, default=0)
     parser.add_argument("--end-index", type=int, default=-1, help="Run all tasks if -1")
     parser.add_argument("--task-ids", type=int, nargs="+", default=[54], help="(Optional) run only the tasks with the given IDs") #TODO: remove default , default=[3] [30, 31, 32, 33, 34, 35]
@@ -293,26 +637,156 @@ def main():
         default=1,
         help="Number of tasks to run in parallel",
     )
+    parser.add_argument(
+        "--adaptive-concurrency",
+        action="store_true",
+        help="Adjust the number of episodes in flight at runtime (AIMD on 429s, timeouts and latency), up to --max-concurrency. Not supported with --workers or --queue",
+    )
+    parser.add_argument(
+        "--min-concurrency",
+        type=int,
+        default=1,
+        help="Lower bound for --adaptive-concurrency",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Number of worker processes to shard episodes across (0 runs in this process); --max-concurrency is split between them",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        nargs=3,
+        action="append",
+        metavar=("PROVIDER[/MODEL]", "RPM", "TPM"),
+        help="Requests and tokens per minute allowed for a provider (or one of its models), shared by the agent, user and supervisors; 0 means unlimited. Can be repeated. "
+        "The budget is split between --workers processes, but applies to each --queue worker on its own, so divide it by the number of queue workers",
+    )
+    parser.add_argument(
+        "--queue",
+        type=str,
+        default=None,
+        help="(Optional) SQLite work queue on a shared filesystem for running one sweep from several machines",
+    )
+    parser.add_argument(
+        "--queue-role",
+        type=str,
+        default="worker",
+        choices=["coordinator", "worker"],
+        help="The coordinator fills the queue, waits for it to drain and merges the worker shards; workers claim and run episodes",
+    )
+    parser.add_argument("--worker-id", type=str, default=None, help="Defaults to <hostname>-<pid>")
+    parser.add_argument(
+        "--queue-lease-seconds",
+        type=float,
+        default=600.0,
+        help="Episodes claimed by a worker that stops heartbeating are re-queued after this long",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Run episodes as coroutines on one event loop instead of one thread each. "
+        "Only the agent's model calls are async: env steps, and so tool calls and "
+        "supervision, still run on threads via asyncio.to_thread (the progress "
+        "output reports the thread count)",
+    )
+    parser.add_argument(
+        "--checkpoint-fsync-every",
+        type=int,
+        default=16,
+        help="Number of episode results to buffer before fsyncing the checkpoint",
+    )
+    parser.add_argument(
+        "--checkpoint-compress",
+        action="store_true",
+        help="Gzip the JSONL checkpoint",
+    )
+    parser.add_argument(
+        "--resume",
+        type=str,
+        default=None,
+        help="(Optional) checkpoint of an interrupted run; only the missing (task_id, trial) pairs are run",
+    )
+    parser.add_argument(
+        "--schedule",
+        type=str,
+        default="fifo",
+        choices=SCHEDULE_ORDERS,
+        help="Order in which (trial, task) pairs are fed to the worker pool",
+    )
+    parser.add_argument(
+        "--supervision",
+        type=str,
+        default="full",
+        choices=SUPERVISION_MODES,
+        help="Which calls the LLM supervisors review: none, only the tools that cannot change the data, or every tool call and response",
+    )
+    parser.add_argument(
+        "--speculative-tools",
+        action="store_true",
+        help="Run tools that change the data on a copy of it while their supervisors deliberate, keeping the changes only if the call is approved",
+    )
+    parser.add_argument(
+        "--supervisor-cache-size",
+        type=int,
+        default=4096,
+        help="Number of supervisor decisions each episode keeps for retried actions in an unchanged conversation (0 disables the cache)",
+    )
+    parser.add_argument(
+        "--supervisor-cache-reuses",
+        type=int,
+        default=2,
+        help="Number of times a cached supervisor decision is reused before the supervisor is asked again",
+    )
     parser.add_argument("--seed", type=int, default=10)
     parser.add_argument("--shuffle", type=int, default=0)
     parser.add_argument("--user-strategy", type=str, default="llm", choices=[item.value for item in UserStrategy])
 
     args = parser.parse_args()
+    if args.adaptive_concurrency and (args.workers > 0 or args.queue is not None):
+        # the controller paces the threads of this process only; worker
+        # processes and queue workers run a fixed number of threads
+        parser.error("--adaptive-concurrency cannot be combined with --workers or --queue")
     print(args)
     random.seed(args.seed)
 
     time_str = datetime.now().strftime("%m%d%H%M%S")
     file_str = f"{args.log_dir}/{args.agent_strategy}-{args.model.split('/')[-1]}-{args.temperature}_range_{args.start_index}-{args.end_index}_user-{args.user_model}-{args.user_strategy}_{time_str}.json"
+    ckpt_path = file_str[: -len(".json")] + ".ckpt.jsonl"
+    if args.checkpoint_compress:
+        ckpt_path += ".gz"
+
+    completed: Set[Tuple[int, int]] = set()
+    if args.resume is not None:
+        completed = index_checkpoint(args.resume)
+        print(f"Resuming from {args.resume}: {len(completed)} episodes already completed")
+        if not args.resume.endswith(".json"):
+            # keep appending to the interrupted run's checkpoint
+            ckpt_path = args.resume
+            file_str = results_path_for_checkpoint(args.resume)
 
     if not os.path.exists(args.log_dir):
         os.makedirs(args.log_dir)
 
     results = run(
         args=args,
-        ckpt_path=file_str
+        ckpt_path=ckpt_path,
+        completed=completed,
     )
+    if args.queue is not None and args.queue_role == "worker":
+        # the coordinator merges every worker's shard into the final results
+        print(f"Worker finished {len(results)} episodes")
+        return
+    if args.resume is not None:
+        if ckpt_path == args.resume:
+            results = merge_results(load_checkpoint(ckpt_path))
+        else:
+            results = merge_results(load_checkpoint(args.resume), results)
 
     display_metrics(results)
+    display_supervision_profile(results)
+    display_verdict_cache_stats(results)
 
     with open(file_str, "w") as f:
         json.dump([result.model_dump() for result in results], f, indent=2)
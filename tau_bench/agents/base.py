@@ -1,6 +1,7 @@
 # Copyright Sierra
 
 import abc
+import asyncio
 from typing import Optional
 from tau_bench.envs.base import Env
 from tau_bench.types import SolveResult
@@ -12,3 +13,8 @@ class Agent(abc.ABC):
         self, env: Env, task_index: Optional[int] = None, max_num_steps: int = 30
     ) -> SolveResult:
         raise NotImplementedError
+
+    async def solve_async(
+        self, env: Env, task_index: Optional[int] = None, max_num_steps: int = 30
+    ) -> SolveResult:
+        return await asyncio.to_thread(self.solve, env, task_index, max_num_steps)
@@ -1,12 +1,14 @@
 # Copyright Sierra
 
 import json
-from litellm import completion
+from tau_bench.rate_limit import acompletion, completion
 
 from tau_bench.agents.base import Agent
 from tau_bench.envs.base import Env
 from tau_bench.types import (
     Action,
+    EnvResetResponse,
+    EnvResponse,
     SolveResult,
     RESPOND_ACTION_NAME,
     RESPOND_ACTION_FIELD_NAME,
@@ -43,6 +45,20 @@ class ChatReActAgent(Agent):
             messages=messages,
             temperature=self.temperature,
         )
+        return self.parse_next_step(res)
+
+    async def generate_next_step_async(
+        self, messages: List[Dict[str, Any]]
+    ) -> Tuple[Dict[str, Any], Action, float]:
+        res = await acompletion(
+            model=self.model,
+            custom_llm_provider=self.provider,
+            messages=messages,
+            temperature=self.temperature,
+        )
+        return self.parse_next_step(res)
+
+    def parse_next_step(self, res: Any) -> Tuple[Dict[str, Any], Action, float]:
         message = res.choices[0].message
         action_str = message.content.split("Action:")[-1].strip()
         try:
@@ -61,35 +77,68 @@ class ChatReActAgent(Agent):
     def solve(
         self, env: Env, task_index: Optional[int] = None, max_num_steps: int = 30
     ) -> SolveResult:
-        response = env.reset(task_index=task_index)
-        reward = 0.0
-        messages: List[Dict[str, Any]] = [
-            {"role": "system", "content": self.prompt},
-            {"role": "user", "content": response.observation},
-        ]
-        total_cost = 0.0
-        info = {}
+        conversation = _Conversation(self, env.reset(task_index=task_index))
         for _ in range(max_num_steps):
-            message, action, cost = self.generate_next_step(messages)
-            response = env.step(action)
-            obs = response.observation
-            reward = response.reward
-            info = {**info, **response.info.model_dump()}
-            if action.name != RESPOND_ACTION_NAME:
-                obs = "API output: " + obs
-            messages.extend(
-                [
-                    message,
-                    {"role": "user", "content": obs},
-                ]
+            message, action, cost = self.generate_next_step(conversation.messages)
+            if conversation.add_step(message, action, cost, env.step(action)):
+                break
+        return conversation.result()
+
+    async def solve_async(
+        self, env: Env, task_index: Optional[int] = None, max_num_steps: int = 30
+    ) -> SolveResult:
+        conversation = _Conversation(self, await env.reset_async(task_index=task_index))
+        for _ in range(max_num_steps):
+            message, action, cost = await self.generate_next_step_async(
+                conversation.messages
             )
-            total_cost += cost
-            if response.done:
+            if conversation.add_step(message, action, cost, await env.step_async(action)):
                 break
+        return conversation.result()
+
+
+class _Conversation(object):
+    """
+    The state `ChatReActAgent.solve` and `solve_async` share: everything
+    but the model and env calls, which are the only places they differ.
+    """
+
+    def __init__(self, agent: ChatReActAgent, env_reset_res: EnvResetResponse) -> None:
+        self.total_cost = 0.0
+        self.reward = 0.0
+        self.info: Dict[str, Any] = {}
+        self.messages: List[Dict[str, Any]] = [
+            {"role": "system", "content": agent.prompt},
+            {"role": "user", "content": env_reset_res.observation},
+        ]
+
+    def add_step(
+        self,
+        message: Dict[str, Any],
+        action: Action,
+        cost: float,
+        env_response: EnvResponse,
+    ) -> bool:
+        """Record `message`, its `action` and the env's response; True if the episode is done."""
+        obs = env_response.observation
+        self.reward = env_response.reward
+        self.info = {**self.info, **env_response.info.model_dump()}
+        if action.name != RESPOND_ACTION_NAME:
+            obs = "API output: " + obs
+        self.messages.extend(
+            [
+                message,
+                {"role": "user", "content": obs},
+            ]
+        )
+        self.total_cost += cost
+        return env_response.done
+
+    def result(self) -> SolveResult:
         return SolveResult(
-            messages=messages,
-            reward=reward,
-            info=info,
+            messages=self.messages,
+            reward=self.reward,
+            info=self.info,
         )
 
 
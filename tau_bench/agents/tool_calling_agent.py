@@ -1,12 +1,18 @@
 # Copyright Sierra
 
 import json
-from litellm import completion
+from tau_bench.rate_limit import acompletion, completion
 from typing import List, Optional, Dict, Any
 
 from tau_bench.agents.base import Agent
 from tau_bench.envs.base import Env
-from tau_bench.types import SolveResult, Action, RESPOND_ACTION_NAME
+from tau_bench.types import (
+    SolveResult,
+    Action,
+    EnvResetResponse,
+    EnvResponse,
+    RESPOND_ACTION_NAME,
+)
 from entropy_labs.supervision.config import supervision_config
 
 
@@ -28,63 +34,97 @@ class ToolCallingAgent(Agent):
     def solve(
         self, env: Env, task_index: Optional[int] = None, max_num_steps: int = 30
     ) -> SolveResult:
-        total_cost = 0.0
-        env_reset_res = env.reset(task_index=task_index)
-        obs = env_reset_res.observation
-        info = env_reset_res.info.model_dump()
-        reward = 0.0
-        messages: List[Dict[str, Any]] = [
-            {"role": "system", "content": self.wiki},
-            {"role": "user", "content": obs},
-        ]
-        supervision_context = supervision_config.get_all_runs()[0].supervision_context
-        supervision_context.update_messages(messages)
+        conversation = _Conversation(self, env.reset(task_index=task_index))
+        for _ in range(max_num_steps):
+            action = conversation.add_completion(completion(**conversation.request()))
+            if conversation.add_step(action, env.step(action)):
+                break
+        return conversation.result()
+
+    async def solve_async(
+        self, env: Env, task_index: Optional[int] = None, max_num_steps: int = 30
+    ) -> SolveResult:
+        conversation = _Conversation(self, await env.reset_async(task_index=task_index))
         for _ in range(max_num_steps):
-            res = completion(
-                messages=messages,
-                model=self.model,
-                custom_llm_provider=self.provider,
-                tools=self.tools_info,
-                temperature=self.temperature,
+            action = conversation.add_completion(
+                await acompletion(**conversation.request())
             )
-            next_message = res.choices[0].message.model_dump()
-            total_cost += res._hidden_params["response_cost"]
-            action = message_to_action(next_message)
-            supervision_context = supervision_config.get_all_runs()[0].supervision_context
-            supervision_context.update_messages(messages)
-            env_response = env.step(action)
-            reward = env_response.reward
-            info = {**info, **env_response.info.model_dump()}
-            if action.name != RESPOND_ACTION_NAME:
-                next_message["tool_calls"] = next_message["tool_calls"][:1]
-                messages.extend(
-                    [
-                        next_message,
-                        {
-                            "role": "tool",
-                            "tool_call_id": next_message["tool_calls"][0]["id"],
-                            "name": next_message["tool_calls"][0]["function"]["name"],
-                            "content": env_response.observation,
-                        },
-                    ]
-                )
-            else:
-                messages.extend(
-                    [
-                        next_message,
-                        {"role": "user", "content": env_response.observation},
-                    ]
-                )
-            supervision_context = supervision_config.get_all_runs()[0].supervision_context
-            supervision_context.update_messages(messages)
-
-            if env_response.done:
+            if conversation.add_step(action, await env.step_async(action)):
                 break
+        return conversation.result()
+
+
+class _Conversation(object):
+    """
+    The state `ToolCallingAgent.solve` and `solve_async` share: everything
+    but the model and env calls, which are the only places they differ.
+    """
+
+    def __init__(self, agent: ToolCallingAgent, env_reset_res: EnvResetResponse) -> None:
+        self.agent = agent
+        self.total_cost = 0.0
+        self.reward = 0.0
+        self.info = env_reset_res.info.model_dump()
+        self.messages: List[Dict[str, Any]] = [
+            {"role": "system", "content": agent.wiki},
+            {"role": "user", "content": env_reset_res.observation},
+        ]
+        self.next_message: Dict[str, Any] = {}
+        self.update_supervision_context()
+
+    def update_supervision_context(self) -> None:
+        supervision_context = supervision_config.get_all_runs()[0].supervision_context
+        supervision_context.update_messages(self.messages)
+
+    def request(self) -> Dict[str, Any]:
+        return dict(
+            messages=self.messages,
+            model=self.agent.model,
+            custom_llm_provider=self.agent.provider,
+            tools=self.agent.tools_info,
+            temperature=self.agent.temperature,
+        )
+
+    def add_completion(self, res: Any) -> Action:
+        self.next_message = res.choices[0].message.model_dump()
+        self.total_cost += res._hidden_params["response_cost"]
+        self.update_supervision_context()
+        return message_to_action(self.next_message)
+
+    def add_step(self, action: Action, env_response: EnvResponse) -> bool:
+        """Record the env's response to `action`; True if the episode is done."""
+        next_message = self.next_message
+        self.reward = env_response.reward
+        self.info = {**self.info, **env_response.info.model_dump()}
+        if action.name != RESPOND_ACTION_NAME:
+            next_message["tool_calls"] = next_message["tool_calls"][:1]
+            self.messages.extend(
+                [
+                    next_message,
+                    {
+                        "role": "tool",
+                        "tool_call_id": next_message["tool_calls"][0]["id"],
+                        "name": next_message["tool_calls"][0]["function"]["name"],
+                        "content": env_response.observation,
+                    },
+                ]
+            )
+        else:
+            self.messages.extend(
+                [
+                    next_message,
+                    {"role": "user", "content": env_response.observation},
+                ]
+            )
+        self.update_supervision_context()
+        return env_response.done
+
+    def result(self) -> SolveResult:
         return SolveResult(
-            reward=reward,
-            info=info,
-            messages=messages,
-            total_cost=total_cost,
+            reward=self.reward,
+            info=self.info,
+            messages=self.messages,
+            total_cost=self.total_cost,
         )
 
 
@@ -1,6 +1,6 @@
 # Copyright Sierra
 
-from typing import Optional, Union
+from typing import List, Optional, Union
 from tau_bench.envs.base import Env
 from tau_bench.envs.user import UserStrategy
 
@@ -12,6 +12,7 @@ def get_env(
     task_split: str,
     user_provider: Optional[str] = None,
     task_index: Optional[int] = None,
+    extra_tools: Optional[List[str]] = None,
 ) -> Env:
     if env_name == "retail":
         from tau_bench.envs.retail import MockRetailDomainEnv
@@ -22,6 +23,7 @@ def get_env(
             task_split=task_split,
             user_provider=user_provider,
             task_index=task_index,
+            extra_tools=extra_tools,
         )
     elif env_name == "airline":
         from tau_bench.envs.airline import MockAirlineDomainEnv
@@ -32,6 +34,7 @@ def get_env(
             task_split=task_split,
             user_provider=user_provider,
             task_index=task_index,
+            extra_tools=extra_tools,
         )
     else:
         raise ValueError(f"Unknown environment: {env_name}")
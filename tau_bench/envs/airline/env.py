@@ -2,12 +2,15 @@
 
 from tau_bench.envs.airline.data import load_data
 from tau_bench.envs.airline.rules import RULES
-from tau_bench.envs.airline.tools import ALL_TOOLS
+from tau_bench.envs.airline.tools import ALL_TOOLS, OPTIONAL_TOOLS
 from tau_bench.envs.airline.wiki import WIKI
-from tau_bench.envs.base import Env
-from typing import Optional, Union
+from tau_bench.envs.base import Env, with_extra_tools
+from typing import List, Optional, Union
 from tau_bench.envs.user import UserStrategy
 
+# ends the conversation; it never changes the data
+TERMINATE_TOOLS = ["transfer_to_human_agents"]
+
 
 class MockAirlineDomainEnv(Env):
     def __init__(
@@ -17,6 +20,7 @@ class MockAirlineDomainEnv(Env):
         user_provider: Optional[str] = None,
         task_split: str = "test",
         task_index: Optional[int] = None,
+        extra_tools: Optional[List[str]] = None,
     ):
         match task_split:
             case "test":
@@ -25,7 +29,7 @@ class MockAirlineDomainEnv(Env):
                 raise ValueError(f"Unknown task split: {task_split}")
         super().__init__(
             data_load_func=load_data,
-            tools=ALL_TOOLS,
+            tools=with_extra_tools(ALL_TOOLS, OPTIONAL_TOOLS, extra_tools),
             tasks=tasks,
             wiki=WIKI,
             rules=RULES,
@@ -34,4 +38,4 @@ class MockAirlineDomainEnv(Env):
             user_provider=user_provider,
             task_index=task_index,
         )
-        self.terminate_tools = ["transfer_to_human_agents"]
+        self.terminate_tools = list(TERMINATE_TOOLS)
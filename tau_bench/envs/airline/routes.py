@@ -0,0 +1,62 @@
+# Copyright Sierra
+
+from typing import Any, Dict, List, Mapping
+
+from tau_bench.envs.snapshot import TableIndex, find_all, peek
+
+# Route indexes over the flights table, built once per snapshot and shared
+# by every episode (see `TableIndex`). Flight numbers come back in table
+# order, so searches return results in the same order as a full scan.
+FLIGHTS_BY_ORIGIN = TableIndex(lambda flight: flight["origin"])
+FLIGHTS_BY_DESTINATION = TableIndex(lambda flight: flight["destination"])
+FLIGHTS_BY_ROUTE = TableIndex(lambda flight: (flight["origin"], flight["destination"]))
+
+
+def flights_from(flights: Mapping[str, Any], origin: str) -> List[str]:
+    return find_all(flights, FLIGHTS_BY_ORIGIN, origin)
+
+
+def flights_to(flights: Mapping[str, Any], destination: str) -> List[str]:
+    return find_all(flights, FLIGHTS_BY_DESTINATION, destination)
+
+
+def flights_between(flights: Mapping[str, Any], origin: str, destination: str) -> List[str]:
+    return find_all(flights, FLIGHTS_BY_ROUTE, (origin, destination))
+
+
+class ConnectionTable(object):
+    """
+    Onward legs keyed by hub airport, for one search: `table[hub]` is the
+    flights from `hub` to `destination`. Each hub is looked up in the route
+    index at most once, however many inbound flights reach it.
+    """
+
+    def __init__(self, flights: Mapping[str, Any], destination: str) -> None:
+        self.flights = flights
+        self.destination = destination
+        self.legs: Dict[str, List[str]] = {}
+
+    def __getitem__(self, hub: str) -> List[str]:
+        if hub not in self.legs:
+            self.legs[hub] = flights_between(self.flights, hub, self.destination)
+        return self.legs[hub]
+
+
+def airports_reaching(flights: Mapping[str, Any], destination: str, max_legs: int) -> Dict[str, int]:
+    """
+    The airports from which `destination` can be reached in at most
+    `max_legs` flights, mapped to the fewest flights needed, ignoring dates.
+    Searches use it to drop partial itineraries that cannot arrive in time.
+    """
+    legs_needed = {destination: 0}
+    frontier = [destination]
+    for legs in range(1, max_legs + 1):
+        next_frontier = []
+        for airport in frontier:
+            for flight_number in flights_to(flights, airport):
+                origin = peek(flights, flight_number)["origin"]
+                if origin not in legs_needed:
+                    legs_needed[origin] = legs
+                    next_frontier.append(origin)
+        frontier = next_frontier
+    return legs_needed
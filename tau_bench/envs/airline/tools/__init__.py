@@ -7,6 +7,7 @@ from .get_reservation_details import GetReservationDetails
 from .get_user_details import GetUserDetails
 from .list_all_airports import ListAllAirports
 from .search_direct_flight import SearchDirectFlight
+from .search_multistop_flight import SearchMultistopFlight
 from .search_onestop_flight import SearchOnestopFlight
 from .send_certificate import SendCertificate
 from .think import Think
@@ -31,3 +32,10 @@ ALL_TOOLS = [
     UpdateReservationFlights,
     UpdateReservationPassengers,
 ]
+
+# not part of the benchmark's tool set: adding one changes what the agent can
+# do, so results are only comparable between runs with the same extra tools
+# (see `--extra-tools`)
+OPTIONAL_TOOLS = [
+    SearchMultistopFlight,
+]
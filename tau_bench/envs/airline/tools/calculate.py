@@ -5,6 +5,8 @@ from tau_bench.envs.tool import Tool
 
 
 class Calculate(Tool):
+    read_only = True
+
     @staticmethod
     def invoke(data: Dict[str, Any], expression: str) -> str:
         if not all(char in "0123456789+-*/(). " for char in expression):
@@ -6,6 +6,9 @@ from tau_bench.envs.tool import Tool
 
 
 class ListAllAirports(Tool):
+    read_only = True
+    supervision = "read"
+
     @staticmethod
     def invoke(data: Dict[str, Any]) -> str:
         airports = [
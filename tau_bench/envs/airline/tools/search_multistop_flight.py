@@ -0,0 +1,146 @@
+# Copyright Sierra
+
+import json
+from datetime import date as Date, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+from tau_bench.envs.airline.routes import airports_reaching, flights_from
+from tau_bench.envs.snapshot import peek
+from tau_bench.envs.tool import Tool
+
+MAX_STOPS = 3
+MAX_RESULTS = 50
+CABINS = ["basic_economy", "economy", "business"]
+
+
+class SearchMultistopFlight(Tool):
+    read_only = True
+    supervision = "read"
+
+    @staticmethod
+    def invoke(
+        data: Dict[str, Any],
+        origin: str,
+        destination: str,
+        date: str,
+        max_stops: int = 2,
+        cabin: Optional[str] = None,
+        passengers: int = 1,
+        max_price: Optional[int] = None,
+    ) -> str:
+        if not 0 <= max_stops <= MAX_STOPS:
+            return f"Error: max_stops must be between 0 and {MAX_STOPS}"
+        if cabin is not None and cabin not in CABINS:
+            return f"Error: invalid cabin {cabin}"
+        if max_price is not None and cabin is None:
+            return "Error: max_price requires a cabin"
+        try:
+            Date.fromisoformat(date)
+        except ValueError:
+            return f"Error: invalid date {date}"
+        flights = data["flights"]
+        # airport -> fewest flights still needed to get to destination
+        legs_needed = airports_reaching(flights, destination, max_stops + 1)
+        if origin not in legs_needed:
+            return json.dumps([])
+
+        results: List[List[Dict[str, Any]]] = []
+        # breadth-first over the time-expanded network, one flight at a time:
+        # a partial itinerary is at an airport on a date after some arrival
+        # time, and the next flight must leave that airport then
+        frontier: List[Tuple[str, str, Optional[str], List[Dict[str, Any]], Set[str], int]] = [
+            (origin, date, None, [], {origin}, 0)
+        ]
+        for num_legs in range(1, max_stops + 2):
+            next_frontier = []
+            for airport, leg_date, arrival, legs, visited, price in frontier:
+                for flight_number in flights_from(flights, airport):
+                    flight = peek(flights, flight_number)
+                    next_airport = flight["destination"]
+                    if next_airport in visited:
+                        continue
+                    if num_legs + legs_needed.get(next_airport, MAX_STOPS + 2) > max_stops + 1:
+                        continue
+                    if arrival is not None and arrival > flight["scheduled_departure_time_est"]:
+                        continue
+                    if leg_date not in flight["dates"]:
+                        continue
+                    flight_date_data = flight["dates"][leg_date]
+                    if flight_date_data["status"] != "available":
+                        continue
+                    leg_price = price
+                    if cabin is not None:
+                        if flight_date_data["available_seats"][cabin] < passengers:
+                            continue
+                        leg_price += flight_date_data["prices"][cabin]
+                        if max_price is not None and leg_price > max_price:
+                            continue
+                    leg = {k: v for k, v in flight.items() if k != "dates"}
+                    leg.update(flight_date_data)
+                    leg["date"] = leg_date
+                    if next_airport == destination:
+                        results.append(legs + [leg])
+                        continue
+                    next_date = leg_date
+                    if "+1" in flight["scheduled_arrival_time_est"]:
+                        next_date = (Date.fromisoformat(leg_date) + timedelta(days=1)).isoformat()
+                    next_frontier.append(
+                        (
+                            next_airport,
+                            next_date,
+                            flight["scheduled_arrival_time_est"],
+                            legs + [leg],
+                            visited | {next_airport},
+                            leg_price,
+                        )
+                    )
+            # fewest stops first, so once there are enough results longer
+            # itineraries need not be searched
+            if len(results) >= MAX_RESULTS:
+                break
+            frontier = next_frontier
+        return json.dumps(results[:MAX_RESULTS])
+
+    @staticmethod
+    def get_info() -> Dict[str, Any]:
+        return {
+            "type": "function",
+            "function": {
+                "name": "search_multistop_flight",
+                "description": f"Search itineraries between two cities departing on a specific date, with up to a given number of stops. Each itinerary is a list of flights, each with the date it departs; connecting flights leave the stop airport after the previous flight arrives. Returns at most {MAX_RESULTS} itineraries, fewest stops first.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "origin": {
+                            "type": "string",
+                            "description": "The origin city airport in three letters, such as 'JFK'.",
+                        },
+                        "destination": {
+                            "type": "string",
+                            "description": "The destination city airport in three letters, such as 'LAX'.",
+                        },
+                        "date": {
+                            "type": "string",
+                            "description": "The date of the first flight in the format 'YYYY-MM-DD', such as '2024-05-01'.",
+                        },
+                        "max_stops": {
+                            "type": "integer",
+                            "description": f"The maximum number of stops, between 0 and {MAX_STOPS}. Defaults to 2.",
+                        },
+                        "cabin": {
+                            "type": "string",
+                            "enum": CABINS,
+                            "description": "Only return itineraries with enough seats in this cabin on every flight.",
+                        },
+                        "passengers": {
+                            "type": "integer",
+                            "description": "The number of seats needed in the cabin on every flight. Defaults to 1.",
+                        },
+                        "max_price": {
+                            "type": "integer",
+                            "description": "The maximum total price per passenger in the cabin, summed over the flights. Requires cabin.",
+                        },
+                    },
+                    "required": ["origin", "destination", "date"],
+                },
+            },
+        }
@@ -2,47 +2,50 @@
 
 import json
 from typing import Any, Dict
+from tau_bench.envs.airline.routes import ConnectionTable, flights_from
+from tau_bench.envs.snapshot import peek
 from tau_bench.envs.tool import Tool
 
 
 class SearchOnestopFlight(Tool):
+    read_only = True
+
     @staticmethod
     def invoke(data: Dict[str, Any], origin: str, destination: str, date: str) -> str:
         flights = data["flights"]
         results = []
-        for flight1 in flights.values():
-            if flight1["origin"] == origin:
-                for flight2 in flights.values():
+        # join the flights out of origin with the legs from their destination
+        connections = ConnectionTable(flights, destination)
+        for flight1_number in flights_from(flights, origin):
+            flight1 = peek(flights, flight1_number)
+            for flight2_number in connections[flight1["destination"]]:
+                flight2 = peek(flights, flight2_number)
+                date2 = (
+                    f"2024-05-{int(date[-2:])+1}"
+                    if "+1" in flight1["scheduled_arrival_time_est"]
+                    else date
+                )
+                if (
+                    flight1["scheduled_arrival_time_est"]
+                    > flight2["scheduled_departure_time_est"]
+                ):
+                    continue
+                if date in flight1["dates"] and date2 in flight2["dates"]:
                     if (
-                        flight2["destination"] == destination
-                        and flight1["destination"] == flight2["origin"]
+                        flight1["dates"][date]["status"] == "available"
+                        and flight2["dates"][date2]["status"] == "available"
                     ):
-                        date2 = (
-                            f"2024-05-{int(date[-2:])+1}"
-                            if "+1" in flight1["scheduled_arrival_time_est"]
-                            else date
-                        )
-                        if (
-                            flight1["scheduled_arrival_time_est"]
-                            > flight2["scheduled_departure_time_est"]
-                        ):
-                            continue
-                        if date in flight1["dates"] and date2 in flight2["dates"]:
-                            if (
-                                flight1["dates"][date]["status"] == "available"
-                                and flight2["dates"][date2]["status"] == "available"
-                            ):
-                                result1 = {
-                                    k: v for k, v in flight1.items() if k != "dates"
-                                }
-                                result1.update(flight1["dates"][date])
-                                result1["date"] = date
-                                result2 = {
-                                    k: v for k, v in flight2.items() if k != "dates"
-                                }
-                                result2.update(flight2["dates"][date])
-                                result2["date"] = date2
-                                results.append([result1, result2])
+                        result1 = {
+                            k: v for k, v in flight1.items() if k != "dates"
+                        }
+                        result1.update(flight1["dates"][date])
+                        result1["date"] = date
+                        result2 = {
+                            k: v for k, v in flight2.items() if k != "dates"
+                        }
+                        result2.update(flight2["dates"][date])
+                        result2["date"] = date2
+                        results.append([result1, result2])
         return json.dumps(results)
 
     @staticmethod
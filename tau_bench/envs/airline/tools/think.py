@@ -5,6 +5,9 @@ from tau_bench.envs.tool import Tool
 
 
 class Think(Tool):
+    read_only = True
+    supervision = "read"
+
     @staticmethod
     def invoke(data: Dict[str, Any], thought: str) -> str:
         return ""
@@ -5,6 +5,8 @@ from tau_bench.envs.tool import Tool
 
 
 class TransferToHumanAgents(Tool):
+    read_only = True
+
     @staticmethod
     def invoke(
         data: Dict[str, Any],
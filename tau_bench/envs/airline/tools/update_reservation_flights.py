@@ -3,6 +3,7 @@
 import json
 from copy import deepcopy
 from typing import Any, Dict, List
+from tau_bench.envs.snapshot import peek
 from tau_bench.envs.tool import Tool
 
 
@@ -40,7 +41,7 @@ class UpdateReservationFlights(Tool):
             flight_number = flight["flight_number"]
             if flight_number not in data["flights"]:
                 return f"Error: flight {flight_number} not found"
-            flight_data = data["flights"][flight_number]
+            flight_data = peek(data["flights"], flight_number)
             if flight["date"] not in flight_data["dates"]:
                 return (
                     f"Error: flight {flight_number} not found on date {flight['date']}"
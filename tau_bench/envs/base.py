@@ -1,8 +1,12 @@
 # Copyright Sierra
 
 import random
-from hashlib import sha256
-from tau_bench.envs.tool import Tool
+import asyncio
+import inspect
+from tau_bench.envs.tool import Tool, instrumented
+from tau_bench.envs.hashing import ToHashable, Hashable, to_hashable, consistent_hash
+from tau_bench.envs.snapshot import EpisodeData, data_digest, load_snapshot
+from tau_bench.envs.gt_cache import GroundTruthHashCache
 from typing import Any, Callable, Dict, List, Type, Optional, Set, Union, Tuple
 
 from tau_bench.envs.user import load_user, UserStrategy
@@ -17,7 +21,8 @@ from tau_bench.types import (
     RewardActionInfo,
     RESPOND_ACTION_NAME,
 )
-from entropy_labs.supervision.decorators import supervise
+from tau_bench.envs.supervision import supervise
+from tau_bench.envs.supervision_mode import mode_gated
 from entropy_labs.supervision.supervisors import human_supervisor, llm_supervisor
 
 MULTIPLE_REQUESTS_SYSTEM_PROMPT = """
@@ -43,13 +48,13 @@ MULTIPLE_REQUESTS_INSTRUCTIONS = """
 - **Do not modify the agent's actions yourself.**
 """
 
-multiple_requests_supervisor = llm_supervisor(
+multiple_requests_supervisor = instrumented(llm_supervisor(
     system_prompt=MULTIPLE_REQUESTS_SYSTEM_PROMPT,
     instructions=MULTIPLE_REQUESTS_INSTRUCTIONS,
     supervisor_name="Multiple Requests Supervisor",
     description="Supervisor that checks all user requests have been solved.",
     include_context=True
-)
+))
 
 CORRECT_INFORMATION_PRESENTED_TO_USER_SYSTEM_PROMPT = """
 As an extremely skilled AI supervisor system for customer support, your goal is to verify that the customer support agent is providing accurate and complete information to the user. You need to ensure that all the user's requests have been addressed and that the information provided is correct.
@@ -78,13 +83,13 @@ OUTCOMES:
 - **Reject**: If any information is incorrect or requests are not fully addressed. Provide specific details on what is wrong.
 """
 
-correct_information_presented_to_user_supervisor = llm_supervisor(
+correct_information_presented_to_user_supervisor = instrumented(llm_supervisor(
     system_prompt=CORRECT_INFORMATION_PRESENTED_TO_USER_SYSTEM_PROMPT,
     instructions=CORRECT_INFORMATION_PRESENTED_TO_USER_INSTRUCTIONS,
     supervisor_name="Correct Information Presented To User Supervisor",
     description="Supervisor that checks if the agent is presenting correct information to the user.",
     include_context=True
-)
+))
 
 # Define a new supervisor for ambiguous item references
 AMBIGUOUS_ITEM_SYSTEM_PROMPT = """
@@ -112,51 +117,54 @@ AMBIGUOUS_ITEM_INSTRUCTIONS = """
 - **Do not modify the assistant's actions yourself.**
 """
 
-ambiguous_item_supervisor = llm_supervisor(
+ambiguous_item_supervisor = instrumented(llm_supervisor(
     system_prompt=AMBIGUOUS_ITEM_SYSTEM_PROMPT,
     instructions=AMBIGUOUS_ITEM_INSTRUCTIONS,
     supervisor_name="Ambiguous Item Supervisor",
     description="Supervisor that ensures assistants ask for clarification when multiple items match the user's description.",
     include_context=True
-)
+))
 
 
-ToHashable = Union[
-    str, int, float, Dict[str, "ToHashable"], List["ToHashable"], Set["ToHashable"]
+respond_supervisor_functions = [
+    # [human_supervisor()]
+    [correct_information_presented_to_user_supervisor],
+    [multiple_requests_supervisor],
+    [ambiguous_item_supervisor]
+     #, human_supervisor()]
 ]
-Hashable = Union[str, int, float, Tuple["Hashable"], Tuple[Tuple[str, "Hashable"]]]
-
-
-def to_hashable(item: ToHashable) -> Hashable:
-    if isinstance(item, dict):
-        return tuple((key, to_hashable(value)) for key, value in sorted(item.items()))
-    elif isinstance(item, list):
-        return tuple(to_hashable(element) for element in item)
-    elif isinstance(item, set):
-        return tuple(sorted(to_hashable(element) for element in item))
-    else:
-        return item
-
-@supervise(
-        supervision_functions=[
-            # [human_supervisor()]
-            [correct_information_presented_to_user_supervisor],
-            [multiple_requests_supervisor],
-            [ambiguous_item_supervisor]
-             #, human_supervisor()]
-        ],
+
+@mode_gated(supervise(
+        supervision_functions=respond_supervisor_functions,
         ignored_attributes=["self"]
-    )
+    ))
 def respond_to_user(self, content):
     """
     Responds to the user.
     """
     return self.user.step(content)
 
-def consistent_hash(
-    value: Hashable,
-) -> str:
-    return sha256(str(value).encode("utf-8")).hexdigest()
+@mode_gated(supervise(
+        supervision_functions=respond_supervisor_functions,
+        ignored_attributes=["self"]
+    ))
+async def respond_to_user_async(self, content):
+    """
+    Responds to the user.
+    """
+    return await self.user.step_async(content)
+
+def with_extra_tools(
+    tools: List[Type[Tool]],
+    optional_tools: List[Type[Tool]],
+    extra_tools: Optional[List[str]] = None,
+) -> List[Type[Tool]]:
+    """`tools` plus the tools of `optional_tools` named in `extra_tools`."""
+    by_name = {tool.get_info()["function"]["name"]: tool for tool in optional_tools}
+    for name in extra_tools or []:
+        if name not in by_name:
+            raise ValueError(f"Unknown extra tool {name}; this domain has {sorted(by_name)}")
+    return tools + [by_name[name] for name in extra_tools or []]
 
 
 class Env(object):
@@ -174,10 +182,13 @@ class Env(object):
     ) -> None:
         super().__init__()
         self.data_load_func = data_load_func
-        self.data = data_load_func()
+        self.data = self.load_data()
         self.tools_map: Dict[str, Type[Tool]] = {
             tool.get_info()["function"]["name"]: tool for tool in tools
         }
+        self.raw_tools_map: Dict[str, Callable[..., str]] = {
+            name: tool._raw_invoke for name, tool in self.tools_map.items()
+        }
         self.tools_info = [tool.get_info() for tool in tools]
         self.terminate_tools = []
         self.tasks = tasks
@@ -193,13 +204,26 @@ class Env(object):
         )
         self.actions: List[Action] = []
 
-    def reset(self, task_index: Optional[int] = None) -> EnvResetResponse:
+    def load_data(self) -> EpisodeData:
+        # the data files are parsed once per process; every episode gets a
+        # copy-on-write overlay of that snapshot
+        return EpisodeData(load_snapshot(self.data_load_func))
+
+    def restore(self, task_index: Optional[int] = None) -> None:
+        """
+        Put the env back in a fresh state for `task_index` without starting
+        the user simulator. This is O(1): the data is a new copy-on-write
+        overlay of the process-wide snapshot.
+        """
         if task_index is None:
             task_index = random.randint(0, len(self.tasks))
         self.task_index = task_index
-        self.data = self.data_load_func()
+        self.data = self.load_data()
         self.task = self.tasks[task_index]
         self.actions = []
+
+    def reset(self, task_index: Optional[int] = None) -> EnvResetResponse:
+        self.restore(task_index)
         initial_observation = self.user.reset(instruction=self.task.instruction)
         return EnvResetResponse(
             observation=initial_observation, info=EnvInfo(task=self.task, source="user")
@@ -243,11 +267,64 @@ class Env(object):
             reward = reward_res.reward
             info.reward_info = reward_res
             info.user_cost = self.user.get_total_cost()
+        info.tool_cache = self.data.tool_results.stats()
 
         return EnvResponse(observation=observation, reward=reward, done=done, info=info)
 
+    async def reset_async(self, task_index: Optional[int] = None) -> EnvResetResponse:
+        self.restore(task_index)
+        initial_observation = await self.user.reset_async(instruction=self.task.instruction)
+        return EnvResetResponse(
+            observation=initial_observation, info=EnvInfo(task=self.task, source="user")
+        )
+
+    async def step_async(self, action: Action) -> EnvResponse:
+        if action.name != RESPOND_ACTION_NAME:
+            # tool logic is cheap and tool supervisors are synchronous
+            return await asyncio.to_thread(self.step, action)
+        self.actions.append(action)
+
+        info = EnvInfo(task=self.task, source="user")
+        reward = 0
+        # the supervisors run on a worker thread; once they approve, the
+        # supervised function hands back the user's reply as a coroutine
+        observation = await asyncio.to_thread(
+            respond_to_user_async, self=self, content=action.kwargs["content"]
+        )
+        if inspect.isawaitable(observation):
+            observation = await observation
+        print(f"Responding to user: {observation}")
+        done = "###STOP###" in observation
+
+        if done:
+            reward_res = await asyncio.to_thread(self.calculate_reward)
+            reward = reward_res.reward
+            info.reward_info = reward_res
+            info.user_cost = self.user.get_total_cost()
+        info.tool_cache = self.data.tool_results.stats()
+
+        return EnvResponse(observation=observation, reward=reward, done=done, info=info)
+
+    def raw_step(self, data: EpisodeData, action: Action) -> str:
+        """
+        Run a tool action on `data` with the tool's undecorated
+        implementation: no supervision, logging, reward or `EnvInfo`.
+        """
+        try:
+            return self.raw_tools_map[action.name](data=data, **action.kwargs)
+        except Exception as e:
+            return f"Error: {e}"
+
+    def replay_actions(self, actions: List[Action]) -> EpisodeData:
+        """Replay tool actions on a scratch copy of the data, leaving `self.data` alone."""
+        data = self.load_data()
+        for action in actions:
+            if action.name in self.raw_tools_map and action.name not in self.terminate_tools:
+                self.raw_step(data, action)
+        return data
+
     def get_data_hash(self) -> str:
-        return consistent_hash(to_hashable(self.data))
+        return data_digest(self.data)
 
     def calculate_reward(self) -> RewardResult:
         data_hash = self.get_data_hash()
@@ -277,12 +354,13 @@ class Env(object):
             info = RewardOutputInfo(r_outputs=r_outputs, outputs=outputs)
         else:
             # check database change
-            # TODO: cache gt_data_hash in tasks.py (low priority)
-            self.data = self.data_load_func()
-            for action in self.task.actions:
-                if action.name not in self.terminate_tools:
-                    self.step(action)
-            gt_data_hash = self.get_data_hash()
+            gt_hash_cache = GroundTruthHashCache.for_data(
+                self.data_load_func, list(self.tools_map.values())
+            )
+            gt_data_hash = gt_hash_cache.get(self.task)
+            if gt_data_hash is None:
+                gt_data_hash = data_digest(self.replay_actions(self.task.actions))
+                gt_hash_cache.put(self.task, gt_data_hash)
             info = RewardActionInfo(
                 r_actions=data_hash == gt_data_hash, gt_data_hash=gt_data_hash
             )
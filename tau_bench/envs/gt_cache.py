@@ -0,0 +1,199 @@
+# Copyright Sierra
+
+import os
+import sys
+import json
+import inspect
+import threading
+from hashlib import sha256
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+from tau_bench.envs.tool import Tool
+from tau_bench.envs.snapshot import DataLoadFunc, EpisodeData, data_digest, load_snapshot
+from tau_bench.types import Task
+
+CACHE_DIR_ENV_VAR = "TAU_BENCH_CACHE_DIR"
+
+
+def default_cache_dir() -> Optional[str]:
+    # persisting hashes across runs is opt-in: without a directory the cache
+    # only lives as long as the process
+    return os.environ.get(CACHE_DIR_ENV_VAR) or None
+
+
+def task_key(task: Task) -> str:
+    # the ground-truth hash only depends on the task's actions, so tasks that
+    # share them (e.g. across splits) share an entry
+    actions = json.dumps([action.model_dump() for action in task.actions], sort_keys=True)
+    return sha256(actions.encode("utf-8")).hexdigest()
+
+
+_fingerprints: Dict[DataLoadFunc, str] = {}
+
+
+def data_fingerprint(data_load_func: DataLoadFunc) -> str:
+    """
+    Digest of the unmodified data. Any change to the data files (or to how
+    the data is hashed) gives a new fingerprint and so a new, empty cache.
+    """
+    if data_load_func not in _fingerprints:
+        _fingerprints[data_load_func] = data_digest(EpisodeData(load_snapshot(data_load_func)))
+    return _fingerprints[data_load_func]
+
+
+_tool_fingerprints: Dict[Tuple[Type[Tool], ...], str] = {}
+
+
+def _module_dependencies(module_names: Sequence[str]) -> List[str]:
+    """
+    The `tau_bench` modules in `module_names` and, transitively, those they
+    reference at module level (imported modules, functions and classes).
+    """
+    seen = set()
+    pending = list(module_names)
+    while len(pending) > 0:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        for value in vars(sys.modules[name]).values():
+            dependency = value.__name__ if inspect.ismodule(value) else getattr(value, "__module__", None)
+            if isinstance(dependency, str) and dependency.startswith("tau_bench.") and dependency in sys.modules:
+                pending.append(dependency)
+    return sorted(seen)
+
+
+def tools_fingerprint(tools: Sequence[Type[Tool]]) -> str:
+    """
+    Digest of the source of the modules defining `tools` (a domain's
+    `ALL_TOOLS`), of the helpers they use (e.g. `snapshot` or the airline
+    `routes`) and of the replay in this module. Changing how any tool
+    behaves, or which tools a domain has, gives a new fingerprint and so a
+    new, empty cache.
+    """
+    key = tuple(tools)
+    if key not in _tool_fingerprints:
+        digest = sha256()
+        for tool in sorted(tools, key=lambda tool: tool.get_info()["function"]["name"]):
+            digest.update(tool.get_info()["function"]["name"].encode("utf-8"))
+        modules = _module_dependencies([__name__] + [tool.__module__ for tool in tools])
+        for name in modules:
+            path = getattr(sys.modules[name], "__file__", None)
+            if path is None:
+                continue
+            digest.update(name.encode("utf-8"))
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        _tool_fingerprints[key] = digest.hexdigest()
+    return _tool_fingerprints[key]
+
+
+class GroundTruthHashCache(object):
+    """
+    Map from `task_key` to the data hash reached by replaying the task's
+    ground-truth actions, for one version of a domain's data and tools.
+
+    With a `path` the map is also kept on disk, so later runs reuse it.
+    Several processes may share a cache file: `save` merges what is on disk
+    before replacing it atomically, so concurrent writers never corrupt it
+    (at worst an entry is recomputed later).
+    """
+
+    def __init__(self, path: Optional[str]) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.hashes: Optional[Dict[str, str]] = None
+
+    @classmethod
+    def for_data(
+        cls,
+        data_load_func: DataLoadFunc,
+        tools: Sequence[Type[Tool]],
+        cache_dir: Optional[str] = None,
+    ) -> "GroundTruthHashCache":
+        """
+        The cache for a domain's data and tools. It is kept on disk under
+        `cache_dir` (default: `$TAU_BENCH_CACHE_DIR`) if one is given, and
+        only in memory otherwise.
+        """
+        name = f"gt_hashes-{data_fingerprint(data_load_func)[:16]}-{tools_fingerprint(tools)[:16]}.json"
+        cache_dir = cache_dir or default_cache_dir()
+        path = os.path.join(cache_dir, name) if cache_dir is not None else None
+        key = path if path is not None else name
+        with _caches_lock:
+            if key not in _caches:
+                _caches[key] = cls(path)
+            return _caches[key]
+
+    def _read(self) -> Dict[str, str]:
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _loaded(self) -> Dict[str, str]:
+        if self.hashes is None:
+            self.hashes = self._read()
+        return self.hashes
+
+    def get(self, task: Task) -> Optional[str]:
+        with self.lock:
+            return self._loaded().get(task_key(task))
+
+    def put(self, task: Task, gt_data_hash: str) -> None:
+        self.update({task_key(task): gt_data_hash})
+
+    def update(self, hashes: Dict[str, str]) -> None:
+        with self.lock:
+            self._loaded().update(hashes)
+            self._save()
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        merged = self._read()
+        merged.update(self.hashes)
+        self.hashes = merged
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(merged, f, indent=0, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self._loaded())
+
+
+# keyed by path, or by file name for in-memory caches
+_caches: Dict[str, GroundTruthHashCache] = {}
+_caches_lock = threading.Lock()
+
+
+def replay_ground_truth(
+    data_load_func: DataLoadFunc,
+    tools: List[Type[Tool]],
+    terminate_tools: List[str],
+    task: Task,
+) -> str:
+    """
+    Replay `task`'s actions with the tools' undecorated implementations and
+    return the resulting data hash, as `Env.replay_actions` does, without
+    having to build an env (and its user simulator).
+    """
+    tools_map: Dict[str, Callable[..., Any]] = {
+        tool.get_info()["function"]["name"]: tool._raw_invoke for tool in tools
+    }
+    data = EpisodeData(load_snapshot(data_load_func))
+    for action in task.actions:
+        if action.name in terminate_tools or action.name not in tools_map:
+            continue
+        try:
+            tools_map[action.name](data=data, **action.kwargs)
+        except Exception:
+            # Env.raw_step turns tool errors into observations
+            pass
+    return data_digest(data)
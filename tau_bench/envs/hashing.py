@@ -0,0 +1,70 @@
+# Copyright Sierra
+
+import threading
+from hashlib import sha256
+from collections.abc import Mapping
+from typing import Any, Dict, List, Set, Tuple, Union
+
+ToHashable = Union[
+    str, int, float, Dict[str, "ToHashable"], List["ToHashable"], Set["ToHashable"]
+]
+Hashable = Union[str, int, float, Tuple["Hashable"], Tuple[Tuple[str, "Hashable"]]]
+
+# table digests are sums of record digests modulo 2**256, so a record can be
+# swapped in or out of a digest without touching the rest of the table
+DIGEST_MODULUS = 1 << 256
+
+
+def to_hashable(item: ToHashable) -> Hashable:
+    if isinstance(item, Mapping):
+        return tuple((key, to_hashable(value)) for key, value in sorted(item.items()))
+    elif isinstance(item, list):
+        return tuple(to_hashable(element) for element in item)
+    elif isinstance(item, set):
+        return tuple(sorted(to_hashable(element) for element in item))
+    else:
+        return item
+
+
+def consistent_hash(
+    value: Hashable,
+) -> str:
+    return sha256(str(value).encode("utf-8")).hexdigest()
+
+
+def record_digest(key: str, record: Any) -> int:
+    digest = sha256(f"{key}\0{to_hashable(record)}".encode("utf-8")).digest()
+    return int.from_bytes(digest, "big")
+
+
+def table_digest(table: Mapping) -> int:
+    return sum(record_digest(key, record) for key, record in table.items()) % DIGEST_MODULUS
+
+
+class BaseTableDigest(object):
+    """The record digests of one (immutable) snapshot table, computed once."""
+
+    def __init__(self, table: Dict[str, Any]) -> None:
+        self.records = {key: record_digest(key, record) for key, record in table.items()}
+        self.total = sum(self.records.values()) % DIGEST_MODULUS
+
+
+# keyed by id(): snapshot tables live for the whole process
+_base_digests: Dict[int, BaseTableDigest] = {}
+_base_digests_lock = threading.Lock()
+
+
+def base_table_digest(table: Dict[str, Any]) -> BaseTableDigest:
+    digest = _base_digests.get(id(table))
+    if digest is not None:
+        return digest
+    with _base_digests_lock:
+        if id(table) not in _base_digests:
+            _base_digests[id(table)] = BaseTableDigest(table)
+        return _base_digests[id(table)]
+
+
+def combine_digests(table_digests: Dict[str, int]) -> str:
+    return sha256(
+        "".join(f"{name}\0{digest:064x}\n" for name, digest in sorted(table_digests.items())).encode("utf-8")
+    ).hexdigest()
@@ -0,0 +1,99 @@
+# Copyright Sierra
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from tau_bench.envs import get_env
+from tau_bench.envs.base import Env
+from tau_bench.envs.user import UserStrategy
+
+# (env name, task split, user strategy)
+EnvKey = Tuple[str, str, str]
+
+
+class EnvPool(object):
+    """
+    A bounded pool of envs, keyed by `(env name, task split, user strategy)`.
+
+    `checkout` hands out an idle env restored to the requested task (see
+    `Env.restore`), building a new one only while fewer than
+    `max_envs_per_key` exist for that key; past that it waits for one to be
+    returned with `checkin`. Envs are therefore built once per concurrent
+    slot rather than once per episode.
+    """
+
+    def __init__(
+        self,
+        user_model: str,
+        user_provider: Optional[str] = None,
+        max_envs_per_key: int = 1,
+        extra_tools: Optional[List[str]] = None,
+    ) -> None:
+        self.user_model = user_model
+        self.user_provider = user_provider
+        self.extra_tools = extra_tools
+        self.max_envs_per_key = max(1, max_envs_per_key)
+        self.condition = threading.Condition()
+        self.idle: Dict[EnvKey, List[Env]] = {}
+        self.num_envs: Dict[EnvKey, int] = {}
+        self.keys: Dict[int, EnvKey] = {}
+
+    def checkout(
+        self,
+        env_name: str,
+        task_split: str,
+        user_strategy: Union[str, UserStrategy],
+        task_index: Optional[int] = None,
+    ) -> Env:
+        key = (env_name, task_split, UserStrategy(user_strategy).value)
+        with self.condition:
+            while True:
+                idle = self.idle.setdefault(key, [])
+                if len(idle) > 0:
+                    env = idle.pop()
+                    break
+                if self.num_envs.get(key, 0) < self.max_envs_per_key:
+                    self.num_envs[key] = self.num_envs.get(key, 0) + 1
+                    env = None
+                    break
+                self.condition.wait()
+        if env is None:
+            try:
+                env = get_env(
+                    env_name,
+                    user_strategy=user_strategy,
+                    user_model=self.user_model,
+                    task_split=task_split,
+                    user_provider=self.user_provider,
+                    task_index=task_index,
+                    extra_tools=self.extra_tools,
+                )
+            except Exception:
+                with self.condition:
+                    self.num_envs[key] -= 1
+                    self.condition.notify()
+                raise
+            with self.condition:
+                self.keys[id(env)] = key
+        env.restore(task_index)
+        return env
+
+    def checkin(self, env: Env) -> None:
+        with self.condition:
+            self.idle[self.keys[id(env)]].append(env)
+            self.condition.notify()
+
+    @contextmanager
+    def env(
+        self,
+        env_name: str,
+        task_split: str,
+        user_strategy: Union[str, UserStrategy],
+        task_index: Optional[int] = None,
+    ) -> Iterator[Env]:
+        env = self.checkout(env_name, task_split, user_strategy, task_index)
+        try:
+            yield env
+        finally:
+            self.checkin(env)
@@ -0,0 +1,117 @@
+# Copyright Sierra
+
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from tau_bench.envs.supervision_profile import active_profile, tool_name
+
+# arguments naming a record, and the table it must exist in
+ID_TABLES = {
+    "order_id": "orders",
+    "user_id": "users",
+    "product_id": "products",
+    "reservation_id": "reservations",
+}
+
+JSON_TYPES: Dict[str, Tuple[type, ...]] = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,),
+}
+
+Precheck = Callable[[Tuple[Any, ...], Dict[str, Any]], bool]
+
+
+def schema_errors(schema: Dict[str, Any], value: Any, path: str = "arguments") -> Optional[str]:
+    """The first way `value` fails the (JSON) `schema` of a tool's parameters, or None."""
+    expected = schema.get("type")
+    if expected in JSON_TYPES:
+        if not isinstance(value, JSON_TYPES[expected]) or (
+            isinstance(value, bool) and expected in ("integer", "number")
+        ):
+            return f"{path} should be of type {expected}"
+    if "enum" in schema and value not in schema["enum"]:
+        return f"{path} should be one of {schema['enum']}"
+    if expected == "object":
+        properties = schema.get("properties", {})
+        for key in schema.get("required", []):
+            if key not in value:
+                return f"{path}.{key} is required"
+        for key, item in value.items():
+            if key not in properties:
+                return f"{path}.{key} is not a parameter"
+            error = schema_errors(properties[key], item, f"{path}.{key}")
+            if error is not None:
+                return error
+    if expected == "array" and "items" in schema:
+        for idx, item in enumerate(value):
+            error = schema_errors(schema["items"], item, f"{path}[{idx}]")
+            if error is not None:
+                return error
+    return None
+
+
+def missing_ids(data: Any, kwargs: Dict[str, Any]) -> Optional[str]:
+    """The first ID argument that names no record in `data`, or None."""
+    for key, table in ID_TABLES.items():
+        if key in kwargs and table in data and kwargs[key] not in data[table]:
+            return f"{key} {kwargs[key]} not found"
+    return None
+
+
+def read_precheck(info: Dict[str, Any]) -> Precheck:
+    """
+    Deterministic checks for a read-only tool described by `info` (its
+    `get_info()`): the arguments match the parameter schema, and every ID
+    argument exists in the data. A call that passes needs no LLM
+    supervisor; one that does not is left to them, since they can explain
+    what is wrong.
+    """
+    parameters = info["function"]["parameters"]
+
+    def precheck(tool_args: Tuple[Any, ...], tool_kwargs: Dict[str, Any]) -> bool:
+        if len(tool_args) > 0 or "data" not in tool_kwargs:
+            return False
+        data = tool_kwargs["data"]
+        arguments = {k: v for k, v in tool_kwargs.items() if k != "data"}
+        return schema_errors(parameters, arguments) is None and missing_ids(data, arguments) is None
+
+    return precheck
+
+
+def prechecked(
+    supervision: Callable[[Callable[..., Any]], Callable[..., Any]],
+    precheck: Precheck,
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    `supervision` (e.g. `supervise(...)`) behind `precheck`, a deterministic
+    first tier: calls it accepts run straight away, without the supervisors.
+    """
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        supervised = supervision(func)
+
+        @wraps(supervised)
+        def wrapper(*tool_args, **tool_kwargs):
+            started_at = time.perf_counter()
+            approved = precheck(tool_args, tool_kwargs)
+            profile = active_profile()
+            if profile is not None:
+                profile.record(
+                    "Pre-check",
+                    tool_name(func),
+                    "approve" if approved else "escalate",
+                    time.perf_counter() - started_at,
+                )
+            if approved:
+                print(f"Pre-check approved {func.__qualname__}")
+                return func(*tool_args, **tool_kwargs)
+            return supervised(*tool_args, **tool_kwargs)
+
+        return wrapper
+
+    return decorator
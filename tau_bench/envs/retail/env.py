@@ -1,13 +1,16 @@
 # Copyright Sierra
 
-from tau_bench.envs.base import Env
+from tau_bench.envs.base import Env, with_extra_tools
 from tau_bench.envs.retail.data import load_data
 from tau_bench.envs.retail.rules import RULES
-from tau_bench.envs.retail.tools import ALL_TOOLS
+from tau_bench.envs.retail.tools import ALL_TOOLS, OPTIONAL_TOOLS
 from tau_bench.envs.retail.wiki import WIKI
-from typing import Optional, Union
+from typing import List, Optional, Union
 from tau_bench.envs.user import UserStrategy
 
+# ends the conversation; it never changes the data
+TERMINATE_TOOLS = ["transfer_to_human_agents"]
+
 
 class MockRetailDomainEnv(Env):
     def __init__(
@@ -17,6 +20,7 @@ class MockRetailDomainEnv(Env):
         user_provider: Optional[str] = None,
         task_split: str = "test",
         task_index: Optional[int] = None,
+        extra_tools: Optional[List[str]] = None,
     ):
         match task_split:
             case "test":
@@ -29,7 +33,7 @@ class MockRetailDomainEnv(Env):
                 raise ValueError(f"Unknown task split: {task_split}")
         super().__init__(
             data_load_func=load_data,
-            tools=ALL_TOOLS,
+            tools=with_extra_tools(ALL_TOOLS, OPTIONAL_TOOLS, extra_tools),
             tasks=tasks,
             wiki=WIKI,
             rules=RULES,
@@ -38,4 +42,4 @@ class MockRetailDomainEnv(Env):
             user_provider=user_provider,
             task_index=task_index,
         )
-        self.terminate_tools = ["transfer_to_human_agents"]
+        self.terminate_tools = list(TERMINATE_TOOLS)
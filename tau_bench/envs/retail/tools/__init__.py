@@ -36,3 +36,6 @@ ALL_TOOLS = [
     Think,
     TransferToHumanAgents,
 ]
+
+# see airline's OPTIONAL_TOOLS
+OPTIONAL_TOOLS = []
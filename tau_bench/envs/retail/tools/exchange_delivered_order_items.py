@@ -3,6 +3,7 @@
 import json
 from typing import Any, Dict, List
 
+from tau_bench.envs.snapshot import peek
 from tau_bench.envs.tool import Tool
 
 
@@ -38,14 +39,15 @@ class ExchangeDeliveredOrderItems(Tool):
         for item_id, new_item_id in zip(item_ids, new_item_ids):
             item = [item for item in order["items"] if item["item_id"] == item_id][0]
             product_id = item["product_id"]
+            variants = peek(products, product_id)["variants"]
             if not (
-                new_item_id in products[product_id]["variants"]
-                and products[product_id]["variants"][new_item_id]["available"]
+                new_item_id in variants
+                and variants[new_item_id]["available"]
             ):
                 return f"Error: new item {new_item_id} not found or available"
 
             old_price = item["price"]
-            new_price = products[product_id]["variants"][new_item_id]["price"]
+            new_price = variants[new_item_id]["price"]
             diff_price += new_price - old_price
 
         diff_price = round(diff_price, 2)
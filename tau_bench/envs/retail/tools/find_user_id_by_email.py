@@ -2,15 +2,20 @@
 
 from typing import Any, Dict
 from tau_bench.envs.tool import Tool
+from tau_bench.envs.snapshot import TableIndex, find_first
+
+USERS_BY_EMAIL = TableIndex(lambda profile: profile["email"].lower())
 
 
 class FindUserIdByEmail(Tool):
+    read_only = True
+    supervision = "read"
+
     @staticmethod
     def invoke(data: Dict[str, Any], email: str) -> str:
-        users = data["users"]
-        for user_id, profile in users.items():
-            if profile["email"].lower() == email.lower():
-                return user_id
+        user_id = find_first(data["users"], USERS_BY_EMAIL, email.lower())
+        if user_id is not None:
+            return user_id
         return "Error: user not found"
 
     @staticmethod
@@ -2,19 +2,30 @@
 
 from typing import Any, Dict
 from tau_bench.envs.tool import Tool
+from tau_bench.envs.snapshot import TableIndex, find_first
+
+USERS_BY_NAME_ZIP = TableIndex(
+    lambda profile: (
+        profile["name"]["first_name"].lower(),
+        profile["name"]["last_name"].lower(),
+        profile["address"]["zip"],
+    )
+)
 
 
 class FindUserIdByNameZip(Tool):
+    read_only = True
+    supervision = "read"
+
     @staticmethod
     def invoke(data: Dict[str, Any], first_name: str, last_name: str, zip: str) -> str:
-        users = data["users"]
-        for user_id, profile in users.items():
-            if (
-                profile["name"]["first_name"].lower() == first_name.lower()
-                and profile["name"]["last_name"].lower() == last_name.lower()
-                and profile["address"]["zip"] == zip
-            ):
-                return user_id
+        user_id = find_first(
+            data["users"],
+            USERS_BY_NAME_ZIP,
+            (first_name.lower(), last_name.lower(), zip),
+        )
+        if user_id is not None:
+            return user_id
         return "Error: user not found"
 
     @staticmethod
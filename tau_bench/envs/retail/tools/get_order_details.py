@@ -1,16 +1,19 @@
 # Copyright Sierra
 
-import json
 from typing import Any, Dict
+from tau_bench.envs.snapshot import dumps_record
 from tau_bench.envs.tool import Tool
 
 
 class GetOrderDetails(Tool):
+    read_only = True
+    supervision = "read"
+
     @staticmethod
     def invoke(data: Dict[str, Any], order_id: str) -> str:
         orders = data["orders"]
         if order_id in orders:
-            return json.dumps(orders[order_id])
+            return dumps_record(orders, order_id)
         return "Error: order not found"
 
     @staticmethod
@@ -1,16 +1,19 @@
 # Copyright Sierra
 
-import json
 from typing import Any, Dict
+from tau_bench.envs.snapshot import dumps_record
 from tau_bench.envs.tool import Tool
 
 
 class GetProductDetails(Tool):
+    read_only = True
+    supervision = "read"
+
     @staticmethod
     def invoke(data: Dict[str, Any], product_id: str) -> str:
         products = data["products"]
         if product_id in products:
-            return json.dumps(products[product_id])
+            return dumps_record(products, product_id)
         return "Error: product not found"
 
     @staticmethod
@@ -2,6 +2,7 @@
 
 import json
 from typing import Any, Dict, List
+from tau_bench.envs.snapshot import copy_record, peek
 from tau_bench.envs.tool import Tool
 
 
@@ -37,14 +38,15 @@ class ModifyPendingOrderItems(Tool):
         for item_id, new_item_id in zip(item_ids, new_item_ids):
             item = [item for item in order["items"] if item["item_id"] == item_id][0]
             product_id = item["product_id"]
+            variants = peek(products, product_id)["variants"]
             if not (
-                new_item_id in products[product_id]["variants"]
-                and products[product_id]["variants"][new_item_id]["available"]
+                new_item_id in variants
+                and variants[new_item_id]["available"]
             ):
                 return f"Error: new item {new_item_id} not found or available"
 
             old_price = item["price"]
-            new_price = products[product_id]["variants"][new_item_id]["price"]
+            new_price = variants[new_item_id]["price"]
             diff_price += new_price - old_price
 
         # Check if the payment method exists
@@ -75,12 +77,10 @@ class ModifyPendingOrderItems(Tool):
         for item_id, new_item_id in zip(item_ids, new_item_ids):
             item = [item for item in order["items"] if item["item_id"] == item_id][0]
             item["item_id"] = new_item_id
-            item["price"] = products[item["product_id"]]["variants"][new_item_id][
-                "price"
-            ]
-            item["options"] = products[item["product_id"]]["variants"][new_item_id][
-                "options"
-            ]
+            variant = peek(products, item["product_id"])["variants"][new_item_id]
+            item["price"] = variant["price"]
+            # the order gets its own copy; the product record is shared
+            item["options"] = copy_record(variant["options"])
         order["status"] = "pending (item modified)"
 
         return json.dumps(order)
@@ -0,0 +1,420 @@
+# Copyright Sierra
+
+import json
+import threading
+from functools import wraps
+from collections.abc import ItemsView, MutableMapping, ValuesView
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Mapping, Optional, Set, Tuple
+
+from tau_bench.envs.hashing import (
+    DIGEST_MODULUS,
+    base_table_digest,
+    combine_digests,
+    record_digest,
+    table_digest,
+)
+from tau_bench.envs.tool_cache import ToolResultCache
+
+DataLoadFunc = Callable[[], Dict[str, Any]]
+
+_snapshots: Dict[DataLoadFunc, Dict[str, Dict[str, Any]]] = {}
+_snapshots_lock = threading.Lock()
+
+
+def load_snapshot(data_load_func: DataLoadFunc) -> Dict[str, Dict[str, Any]]:
+    """
+    Return the data produced by `data_load_func`, loading it only once per
+    process. The snapshot is shared by every env in the process and must
+    never be mutated; episodes see it through an `EpisodeData` overlay.
+    """
+    snapshot = _snapshots.get(data_load_func)
+    if snapshot is not None:
+        return snapshot
+    with _snapshots_lock:
+        if data_load_func not in _snapshots:
+            _snapshots[data_load_func] = data_load_func()
+        return _snapshots[data_load_func]
+
+
+def copy_record(value: Any) -> Any:
+    # records are plain JSON, so this is a much cheaper deepcopy
+    if isinstance(value, dict):
+        return {k: copy_record(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [copy_record(v) for v in value]
+    return value
+
+
+class TableIndex(object):
+    """
+    A secondary index over snapshot tables: `key_func(record)` -> the keys
+    of the records with that value, in table order. The index of a base
+    table is built on first use and shared read-only by every episode;
+    `CowTable.find` reconciles it with the episode's overlay.
+    """
+
+    def __init__(self, key_func: Callable[[Any], Hashable]) -> None:
+        self.key_func = key_func
+        self.lock = threading.Lock()
+        # keyed by id(): snapshot tables live for the whole process
+        self.built: Dict[int, Dict[Hashable, List[str]]] = {}
+
+    def for_base(self, base: Dict[str, Any]) -> Dict[Hashable, List[str]]:
+        index = self.built.get(id(base))
+        if index is not None:
+            return index
+        with self.lock:
+            if id(base) not in self.built:
+                index = {}
+                for record_key, record in base.items():
+                    index.setdefault(self.key_func(record), []).append(record_key)
+                self.built[id(base)] = index
+            return self.built[id(base)]
+
+
+_positions: Dict[int, Dict[str, int]] = {}
+_positions_lock = threading.Lock()
+
+
+def _base_positions(base: Dict[str, Any]) -> Dict[str, int]:
+    positions = _positions.get(id(base))
+    if positions is not None:
+        return positions
+    with _positions_lock:
+        if id(base) not in _positions:
+            _positions[id(base)] = {key: position for position, key in enumerate(base)}
+        return _positions[id(base)]
+
+
+_serialized: Dict[int, Dict[str, str]] = {}
+_serialized_lock = threading.Lock()
+
+
+def _base_serialized(base: Dict[str, Any]) -> Dict[str, str]:
+    serialized = _serialized.get(id(base))
+    if serialized is not None:
+        return serialized
+    with _serialized_lock:
+        if id(base) not in _serialized:
+            _serialized[id(base)] = {}
+        return _serialized[id(base)]
+
+
+def find_first(table: Mapping[str, Any], index: TableIndex, value: Hashable) -> Optional[str]:
+    """
+    The key of the first record (in table order) with `index.key_func(record)
+    == value`, or None. Uses the index for copy-on-write tables and falls
+    back to a scan for plain dicts.
+    """
+    if isinstance(table, CowTable):
+        return table.find(index, value)
+    for record_key, record in table.items():
+        if index.key_func(record) == value:
+            return record_key
+    return None
+
+
+def find_all(table: Mapping[str, Any], index: TableIndex, value: Hashable) -> List[str]:
+    """Like `find_first`, but the keys of every matching record, in table order."""
+    if isinstance(table, CowTable):
+        return table.find_all(index, value)
+    return [
+        record_key
+        for record_key, record in table.items()
+        if index.key_func(record) == value
+    ]
+
+
+def peek(table: Mapping[str, Any], key: str) -> Any:
+    """Read a record without copying it into the overlay. Must not be mutated."""
+    if isinstance(table, CowTable):
+        return table.peek(key)
+    return table[key]
+
+
+def dumps_record(table: Mapping[str, Any], key: str) -> str:
+    """
+    `json.dumps(table[key])`. For copy-on-write tables, records that are
+    still the shared base records are encoded once per process and the
+    string is reused; records in the overlay may have been written to and
+    are encoded afresh.
+    """
+    if isinstance(table, CowTable):
+        return table.dumps(key)
+    return json.dumps(table[key])
+
+
+class _TableItems(ItemsView):
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        return self._mapping.iter_items()
+
+
+class _TableValues(ValuesView):
+    def __iter__(self) -> Iterator[Any]:
+        return (value for _, value in self._mapping.iter_items())
+
+
+class CowTable(MutableMapping):
+    """
+    A copy-on-write view of one table (e.g. `orders`) of a base snapshot.
+
+    Looking a record up by key copies it into the overlay, so tools can
+    mutate what they get back exactly as they would with a plain dict.
+    Iterating with `items()` or `values()` does not copy: records that were
+    not already looked up are the shared base records and must be treated
+    as read-only (tools only scan tables to search them).
+    """
+
+    def __init__(self, base: Dict[str, Any]) -> None:
+        self.base = base
+        self.overlay: Dict[str, Any] = {}
+        self.deleted: Set[str] = set()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.overlay:
+            return self.overlay[key]
+        if key in self.deleted or key not in self.base:
+            raise KeyError(key)
+        record = self.overlay[key] = copy_record(self.base[key])
+        return record
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.overlay[key] = value
+        self.deleted.discard(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self.overlay.pop(key, None)
+        if key in self.base:
+            self.deleted.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.overlay or (key in self.base and key not in self.deleted)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.base:
+            if key not in self.deleted:
+                yield key
+        for key in self.overlay:
+            if key not in self.base:
+                yield key
+
+    def __len__(self) -> int:
+        num_added = sum(1 for key in self.overlay if key not in self.base)
+        return len(self.base) - len(self.deleted) + num_added
+
+    def iter_items(self) -> Iterator[Tuple[str, Any]]:
+        for key in self:
+            yield key, self.overlay[key] if key in self.overlay else self.base[key]
+
+    def items(self) -> ItemsView:
+        return _TableItems(self)
+
+    def values(self) -> ValuesView:
+        return _TableValues(self)
+
+    def find(self, index: TableIndex, value: Hashable) -> Optional[str]:
+        """
+        `find_first` for this table. Base records come from the shared index;
+        records in the overlay (which may have been modified, e.g. a user's
+        zip code) are checked directly, so the cost is O(1) plus the number
+        of records this episode has touched.
+        """
+        positions = _base_positions(self.base)
+        best_key: Optional[str] = None
+        best_position = len(positions) + len(self.overlay)
+        for record_key in index.for_base(self.base).get(value, ()):
+            if record_key not in self.deleted and record_key not in self.overlay:
+                best_key, best_position = record_key, positions[record_key]
+                break
+        for offset, (record_key, record) in enumerate(self.overlay.items()):
+            position = positions.get(record_key, len(positions) + offset)
+            if position < best_position and index.key_func(record) == value:
+                best_key, best_position = record_key, position
+        return best_key
+
+    def find_all(self, index: TableIndex, value: Hashable) -> List[str]:
+        positions = _base_positions(self.base)
+        matches = [
+            (positions[record_key], record_key)
+            for record_key in index.for_base(self.base).get(value, ())
+            if record_key not in self.deleted and record_key not in self.overlay
+        ]
+        touched = False
+        for offset, (record_key, record) in enumerate(self.overlay.items()):
+            if index.key_func(record) == value:
+                matches.append((positions.get(record_key, len(positions) + offset), record_key))
+                touched = True
+        if touched:
+            matches.sort()
+        return [record_key for _, record_key in matches]
+
+    def peek(self, key: str) -> Any:
+        if key in self.overlay:
+            return self.overlay[key]
+        if key in self.deleted:
+            raise KeyError(key)
+        return self.base[key]
+
+    def dumps(self, key: str) -> str:
+        if key in self.overlay:
+            return json.dumps(self.overlay[key])
+        if key in self.deleted or key not in self.base:
+            raise KeyError(key)
+        serialized = _base_serialized(self.base)
+        if key not in serialized:
+            # racing threads encode the same record to the same string
+            serialized[key] = json.dumps(self.base[key])
+        return serialized[key]
+
+    def savepoint(self) -> "CowTable":
+        """A copy of this table that can be written to without affecting it."""
+        table = CowTable(self.base)
+        table.overlay = {key: copy_record(record) for key, record in self.overlay.items()}
+        table.deleted = set(self.deleted)
+        return table
+
+    def digest(self) -> int:
+        """
+        The table digest, equal to `table_digest(self)`. Only records in the
+        overlay (the ones this episode looked up, inserted or deleted) are
+        hashed; the rest come from the snapshot's cached record digests.
+        """
+        base = base_table_digest(self.base)
+        total = base.total
+        for key in self.deleted:
+            total -= base.records[key]
+        for key, record in self.overlay.items():
+            if key in base.records:
+                total -= base.records[key]
+            total += record_digest(key, record)
+        return total % DIGEST_MODULUS
+
+    def __repr__(self) -> str:
+        return f"CowTable({len(self)} records, {len(self.overlay)} copied)"
+
+
+class ReadOnlyTable(CowTable):
+    """
+    A view of a `CowTable` for read-only tools. Looking a record up returns
+    the shared record (the base record, or the episode's copy if it has one)
+    instead of copying it into the overlay, and the view cannot be written
+    to, so a pure read leaves the episode's overlay untouched.
+    """
+
+    def __init__(self, table: CowTable) -> None:
+        self.base = table.base
+        self.overlay = table.overlay
+        self.deleted = table.deleted
+
+    def __getitem__(self, key: str) -> Any:
+        return self.peek(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        raise TypeError("Read-only tools cannot write to the data")
+
+    def __delitem__(self, key: str) -> None:
+        raise TypeError("Read-only tools cannot write to the data")
+
+    def __repr__(self) -> str:
+        return f"ReadOnlyTable({len(self)} records, {len(self.overlay)} copied)"
+
+
+class EpisodeData(MutableMapping):
+    """
+    The data one episode reads and writes: a `CowTable` per table of the
+    base snapshot. Creating one is O(1) in the size of the data, and it only
+    holds the records the episode has touched, plus the episode's memoized
+    read-only tool results (see `ToolResultCache`).
+    """
+
+    def __init__(self, base: Dict[str, Dict[str, Any]]) -> None:
+        self.base = base
+        self.tables: Dict[str, Any] = {name: CowTable(table) for name, table in base.items()}
+        self.tool_results = ToolResultCache()
+        # the `tool_results` version this data was copied at, for savepoints
+        self.parent_version: Optional[int] = None
+
+    def savepoint(self) -> "EpisodeData":
+        """
+        A copy of the data to run a tool on speculatively (see `Speculation`):
+        copying costs only the records this episode has touched. Hand it to
+        `commit` to keep what the tool wrote, or drop it to roll back.
+        """
+        data = EpisodeData(self.base)
+        data.tables = {
+            name: table.savepoint() if isinstance(table, CowTable) else copy_record(table)
+            for name, table in self.tables.items()
+        }
+        data.parent_version = self.tool_results.version
+        return data
+
+    def read_view(self) -> "ReadOnlyData":
+        return ReadOnlyData(self)
+
+    def commit(self, savepoint: "EpisodeData") -> None:
+        if savepoint.parent_version != self.tool_results.version:
+            raise RuntimeError("The data was written to after the savepoint was taken")
+        self.tables = savepoint.tables
+        self.tool_results.bump()
+
+    def __getitem__(self, name: str) -> Any:
+        return self.tables[name]
+
+    def __setitem__(self, name: str, table: Any) -> None:
+        self.tables[name] = table
+
+    def __delitem__(self, name: str) -> None:
+        del self.tables[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.tables)
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def __repr__(self) -> str:
+        return f"EpisodeData({self.tables!r})"
+
+
+class ReadOnlyData(Mapping):
+    """`EpisodeData` as read-only tools see it: every table is a `ReadOnlyTable`."""
+
+    def __init__(self, data: EpisodeData) -> None:
+        self.tables = {
+            name: ReadOnlyTable(table) if isinstance(table, CowTable) else table
+            for name, table in data.tables.items()
+        }
+        self.tool_results = data.tool_results
+
+    def __getitem__(self, name: str) -> Any:
+        return self.tables[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.tables)
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+
+def read_through_view(invoke: Callable[..., str]) -> Callable[..., str]:
+    """Hand `invoke` a `ReadOnlyData` view of the episode's data, so its reads never copy."""
+
+    @wraps(invoke)
+    def wrapper(data: Any, **kwargs: Any) -> str:
+        if isinstance(data, EpisodeData):
+            data = data.read_view()
+        return invoke(data=data, **kwargs)
+
+    return wrapper
+
+
+def data_digest(data: Mapping[str, Any]) -> str:
+    """A digest of the whole database: the table digests, hashed together."""
+    return combine_digests(
+        {
+            name: table.digest() if isinstance(table, CowTable) else table_digest(table)
+            for name, table in data.items()
+        }
+    )
@@ -0,0 +1,150 @@
+# Copyright Sierra
+
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_speculative_execution = False
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def set_speculative_execution(enabled: bool, max_concurrent_calls: int = 1) -> None:
+    """
+    Turn speculative execution on or off. Each episode in flight runs at
+    most one tool at a time, so `max_concurrent_calls` (`--max-concurrency`)
+    runs can be in flight at once; they get a pool of their own.
+    """
+    global _speculative_execution, _executor
+    with _executor_lock:
+        _speculative_execution = enabled
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = None
+        if enabled:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, max_concurrent_calls), thread_name_prefix="speculation"
+            )
+
+
+def speculative_execution() -> bool:
+    return _speculative_execution
+
+
+class Speculation(object):
+    """
+    A write tool running on a savepoint of its `data` (see
+    `EpisodeData.savepoint`) while the supervisors decide whether it may run
+    at all. `commit` keeps what it wrote and returns its result, as if it
+    had run on `data` once approved; `rollback` drops the savepoint, leaving
+    `data` as it was.
+
+    The supervisors always get to decide: a run that fails (e.g. returns an
+    "Error: ..." string) is only reported if the call is approved, exactly
+    as the tool would have failed had it run afterwards.
+    """
+
+    def __init__(
+        self,
+        func: Callable[..., Any],
+        tool_args: Tuple[Any, ...],
+        tool_kwargs: Dict[str, Any],
+        executor: Executor,
+    ) -> None:
+        self.tool_args = tool_args
+        self.tool_kwargs = tool_kwargs
+        self.committed = False
+        self.data = tool_kwargs["data"]
+        self.savepoint = self.data.savepoint()
+        self.future: Future = executor.submit(func, *tool_args, **{**tool_kwargs, "data": self.savepoint})
+
+    @classmethod
+    def start(
+        cls,
+        func: Callable[..., Any],
+        tool_args: Tuple[Any, ...],
+        tool_kwargs: Dict[str, Any],
+    ) -> Optional["Speculation"]:
+        """A `Speculation` of the call, or None if it is off or the data cannot be savepointed."""
+        with _executor_lock:
+            executor = _executor
+        if executor is None or not hasattr(tool_kwargs.get("data"), "savepoint"):
+            return None
+        return cls(func, tool_args, tool_kwargs, executor)
+
+    def matches(self, tool_args: Tuple[Any, ...], tool_kwargs: Dict[str, Any]) -> bool:
+        """Whether a call with these arguments is the call being run (`data` by identity)."""
+        if len(tool_args) != len(self.tool_args) or tool_kwargs.keys() != self.tool_kwargs.keys():
+            return False
+        pairs = list(zip(tool_args, self.tool_args)) + [(v, self.tool_kwargs[k]) for k, v in tool_kwargs.items()]
+        return all(a is b or (not hasattr(a, "savepoint") and a == b) for a, b in pairs)
+
+    def stale(self) -> bool:
+        """Whether something else wrote to `data` since the savepoint, so it cannot be committed."""
+        return self.savepoint.parent_version != self.data.tool_results.version
+
+    def commit(self) -> Any:
+        # an exception is raised after its partial writes are kept, like a
+        # tool that fails on `data` itself
+        exception = self.future.exception()
+        self.data.commit(self.savepoint)
+        self.committed = True
+        if exception is not None:
+            raise exception
+        return self.future.result()
+
+    def rollback(self) -> None:
+        # a run that has started is waited for, so it never outlives its call
+        if not self.future.cancel():
+            wait([self.future])
+
+
+_running: ContextVar[Optional[Speculation]] = ContextVar("speculation", default=None)
+
+
+def speculative(
+    supervision: Callable[[Callable[..., Any]], Callable[..., Any]],
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    `supervision` (e.g. `supervise(...)`) with the function started as a
+    `Speculation` while it runs, if speculative execution is on. When the
+    supervision runs the function with the arguments it was called with,
+    the speculation is committed instead. If it runs it with modified
+    arguments, or the savepoint has gone stale, the function runs on the
+    data as usual; either way, and if it does not run it at all, the
+    speculation is rolled back.
+    """
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(func)
+        def approved(*tool_args, **tool_kwargs):
+            speculation = _running.get()
+            if (
+                speculation is not None
+                and not speculation.committed
+                and speculation.matches(tool_args, tool_kwargs)
+            ):
+                if not speculation.stale():
+                    return speculation.commit()
+            return func(*tool_args, **tool_kwargs)
+
+        supervised = supervision(approved)
+
+        @wraps(supervised)
+        def wrapper(*tool_args, **tool_kwargs):
+            speculation = Speculation.start(func, tool_args, tool_kwargs)
+            if speculation is None:
+                return supervised(*tool_args, **tool_kwargs)
+            token = _running.set(speculation)
+            try:
+                return supervised(*tool_args, **tool_kwargs)
+            finally:
+                _running.reset(token)
+                if not speculation.committed:
+                    speculation.rollback()
+
+        return wrapper
+
+    return decorator
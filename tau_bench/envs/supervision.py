@@ -0,0 +1,392 @@
+# Copyright Sierra
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from entropy_labs.api.sentinel_api_client_helper import (
+    create_tool_request_group,
+    get_supervisor_chains_for_tool,
+    send_supervision_request,
+    send_supervision_result,
+)
+from entropy_labs.mocking.policies import MockPolicy
+from entropy_labs.sentinel_api_client.sentinel_api_client.models.arguments import Arguments
+from entropy_labs.sentinel_api_client.sentinel_api_client.models.supervisor_type import SupervisorType
+from entropy_labs.sentinel_api_client.sentinel_api_client.models.tool_request import ToolRequest
+from entropy_labs.supervision import decorators
+from entropy_labs.supervision.config import (
+    SupervisionDecision,
+    SupervisionDecisionType,
+    supervision_config,
+)
+
+FEEDBACK_NOTE = "This is not a message from the user but from a supervisor system that is helping the agent to improve its behavior."
+
+# the supervisor chains of a function, or a zero-argument function that
+# builds them when the function is registered
+SupervisionFunctions = Union[List[List[Callable]], Callable[[], List[List[Callable]]]]
+
+_unregistered: List[Tuple[Callable[..., Any], Optional[SupervisionFunctions], Optional[List[str]]]] = []
+_registration_lock = threading.Lock()
+# the most chains any registered function has
+_max_chains = 1
+
+
+def register_supervised_functions() -> None:
+    """
+    Hand the functions decorated with `supervise` so far to
+    `supervision_config`, building the chains of those given a factory.
+    `create_run` reads what is registered, so call this before it; each
+    function is only registered once.
+    """
+    with _registration_lock:
+        max_chains = _max_chains
+        while len(_unregistered) > 0:
+            func, supervision_functions, ignored_attributes = _unregistered.pop(0)
+            if callable(supervision_functions):
+                supervision_functions = supervision_functions()
+            max_chains = max(max_chains, len(supervision_functions or []))
+            supervision_config.register_pending_supervised_function(
+                func, supervision_functions, ignored_attributes
+            )
+    if max_chains > _max_chains:
+        _resize_executor(max_chains=max_chains)
+
+
+_max_concurrent_calls = 1
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _resize_executor(max_calls: Optional[int] = None, max_chains: Optional[int] = None) -> None:
+    global _max_concurrent_calls, _max_chains, _executor
+    with _executor_lock:
+        _max_concurrent_calls = max_calls or _max_concurrent_calls
+        _max_chains = max_chains or _max_chains
+        if _executor is not None:
+            # chains already submitted finish on the old pool
+            _executor.shutdown(wait=False)
+            _executor = None
+
+
+def set_max_concurrent_calls(max_calls: int) -> None:
+    """
+    Size the chain pool for `max_calls` supervised calls in flight at once
+    (one per episode, so `--max-concurrency`), each running all its chains.
+    """
+    _resize_executor(max_calls=max(1, max_calls))
+
+
+def supervision_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_max_concurrent_calls * _max_chains, thread_name_prefix="supervision"
+            )
+        return _executor
+
+
+def serialize_arguments(tool_args: Tuple[Any, ...], tool_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """The arguments of a call as sent to the API; values JSON cannot hold are sent as strings."""
+    arguments = {f"arg_{idx}": arg for idx, arg in enumerate(tool_args)}
+    arguments.update(tool_kwargs)
+    return {
+        key: value if isinstance(value, (str, int, float, bool, dict, list)) else str(value)
+        for key, value in arguments.items()
+    }
+
+
+def call_supervisor(
+    supervisor_func: Callable[..., Any],
+    func: Callable[..., Any],
+    supervision_context: Any,
+    supervision_request_id: Any,
+    ignored_attributes: List[str],
+    tool_args: Tuple[Any, ...],
+    tool_kwargs: Dict[str, Any],
+) -> SupervisionDecision:
+    kwargs = dict(
+        supervision_context=supervision_context,
+        supervision_request_id=supervision_request_id,
+        ignored_attributes=ignored_attributes,
+        tool_args=tool_args,
+        tool_kwargs=tool_kwargs,
+        decision=None,
+    )
+    if asyncio.iscoroutinefunction(supervisor_func):
+        return asyncio.run(supervisor_func(func, **kwargs))
+    return supervisor_func(func, **kwargs)
+
+
+class ChainOutcome(object):
+    """
+    The result of running one supervisor chain. `decision` is the decision
+    the chain contributes to the combined verdict (approve, modify, or a
+    trailing escalate); `stops` ends the call with `message` instead of
+    running the function (reject, terminate, unknown decision, or a missing
+    local supervisor, which gives None).
+    """
+
+    def __init__(
+        self,
+        decision: Optional[SupervisionDecision] = None,
+        stops: bool = False,
+        message: Optional[str] = None,
+    ) -> None:
+        self.decision = decision
+        self.stops = stops
+        self.message = message
+
+
+def _explain(decisions: List[SupervisionDecision]) -> str:
+    return " ".join(f"Decision: {d.decision}, Explanation: {d.explanation}" for d in decisions)
+
+
+def run_chain(
+    supervisor_chain: Any,
+    func: Callable[..., Any],
+    context: Dict[str, Any],
+    cancelled: threading.Event,
+) -> ChainOutcome:
+    """
+    Run the supervisors of one chain in order, as `entropy_labs`' `supervise`
+    does: a supervisor that escalates hands over to the next one in the
+    chain. Stops early, without a decision, once `cancelled` is set.
+    """
+    supervision_context = context["supervision_context"]
+    supervisors = supervisor_chain.supervisors
+    chain_decisions: List[SupervisionDecision] = []
+    for position_in_chain, supervisor in enumerate(supervisors):
+        if cancelled.is_set():
+            return ChainOutcome()
+        supervision_request_id = send_supervision_request(
+            supervisor_chain_id=supervisor_chain.chain_id,
+            supervisor_id=supervisor.id,
+            request_group_id=context["tool_request_group"].id,
+            position_in_chain=position_in_chain,
+        )
+        supervisor_func = supervision_context.get_supervisor_by_id(supervisor.id)
+        if supervisor_func is None:
+            print(f"No local supervisor function found for ID {supervisor.id}. Skipping.")
+            return ChainOutcome(stops=True)
+        decision = call_supervisor(
+            supervisor_func,
+            func,
+            supervision_context,
+            supervision_request_id,
+            context["ignored_attributes"],
+            context["tool_args"],
+            context["tool_kwargs"],
+        )
+        chain_decisions.append(decision)
+        print(f"Supervisor decision: {decision.decision}")
+        if supervisor.type != SupervisorType.HUMAN_SUPERVISOR:
+            send_supervision_result(
+                supervision_request_id=supervision_request_id,
+                request_group_id=context["tool_request_group"].id,
+                tool_id=context["tool_id"],
+                supervisor_id=supervisor.id,
+                decision=decision,
+                client=context["client"],
+                tool_request=context["tool_request"],
+                tool_args=context["tool_args"],
+                tool_kwargs=context["tool_kwargs"],
+            )
+        if decision.decision in [SupervisionDecisionType.APPROVE, SupervisionDecisionType.MODIFY]:
+            return ChainOutcome(decision=decision)
+        elif decision.decision == SupervisionDecisionType.REJECT:
+            return ChainOutcome(
+                stops=True,
+                message=(
+                    f"The agent requested to execute {func.__qualname__} but it was rejected. "
+                    f"Explanation: {decision.explanation}. "
+                    f"Chain Explanations: {_explain(chain_decisions)}\n"
+                    f"{FEEDBACK_NOTE} You should try different action using the feedback!"
+                ),
+            )
+        elif decision.decision == SupervisionDecisionType.ESCALATE:
+            # an escalation at the end of the chain counts against the call
+            if position_in_chain == len(supervisors) - 1:
+                return ChainOutcome(decision=decision)
+            continue
+        elif decision.decision == SupervisionDecisionType.TERMINATE:
+            return ChainOutcome(
+                stops=True,
+                message=(
+                    f"Execution of {func.__qualname__} should be terminated. "
+                    f"Explanation: {decision.explanation}. "
+                    f"Chain Explanations: {_explain(chain_decisions)}\n"
+                    f"{FEEDBACK_NOTE} You should try different action using the feedback!"
+                ),
+            )
+        else:
+            print(f"Unknown decision: {decision.decision}. Cancelling execution.")
+            return ChainOutcome(
+                stops=True,
+                message=(
+                    f"Execution of {func.__qualname__} was cancelled due to an unknown supervision decision. "
+                    f"Chain Explanations: {_explain(chain_decisions)}\n"
+                    f"{FEEDBACK_NOTE} You should try different action using the feedback!"
+                ),
+            )
+    return ChainOutcome()
+
+
+def run_chains(
+    supervisors_chains: List[Any],
+    func: Callable[..., Any],
+    context: Dict[str, Any],
+) -> List[ChainOutcome]:
+    """
+    Run independent supervisor chains concurrently, with the verdict running
+    them in turn would give. If some chain stops the call (e.g. a
+    rejection), only the outcome of the first such chain in chain order is
+    returned, once every chain before it has finished without stopping;
+    the chains after it are cancelled (those not started never run, running
+    ones skip their remaining supervisors). Otherwise the outcomes of all
+    the chains come back in chain order.
+    """
+    if len(supervisors_chains) == 1:
+        return [run_chain(supervisors_chains[0], func, context, threading.Event())]
+    executor = supervision_executor()
+    cancelled = [threading.Event() for _ in supervisors_chains]
+    futures: Dict[Future, int] = {}
+    for idx, chain in enumerate(supervisors_chains):
+        # chains see the caller's context variables (e.g. its profile)
+        run = contextvars.copy_context().run
+        futures[executor.submit(run, run_chain, chain, func, context, cancelled[idx])] = idx
+    outcomes: List[Optional[ChainOutcome]] = [None] * len(futures)
+    first_stop = len(futures)
+    pending = set(futures)
+    try:
+        while True:
+            # only the chains before the first stop can change the verdict
+            needed = {future for future in pending if futures[future] < first_stop}
+            if len(needed) == 0:
+                break
+            done, _ = wait(needed, return_when=FIRST_COMPLETED)
+            pending -= done
+            for future in done:
+                idx = futures[future]
+                outcomes[idx] = future.result()
+                if outcomes[idx].stops and idx < first_stop:
+                    first_stop = idx
+                    for event in cancelled[idx + 1:]:
+                        event.set()
+    finally:
+        # in-flight LLM calls cannot be interrupted; their results are dropped
+        for event in cancelled:
+            event.set()
+        for future in pending:
+            future.cancel()
+    if first_stop < len(futures):
+        return [outcomes[first_stop]]
+    return outcomes
+
+
+def supervise(
+    mock_policy: Optional[MockPolicy] = None,
+    mock_responses: Optional[List[Any]] = None,
+    supervision_functions: Optional[SupervisionFunctions] = None,
+    ignored_attributes: Optional[List[str]] = None,
+):
+    """
+    A drop-in for `entropy_labs.supervision.decorators.supervise` that runs
+    the supervisor chains of a call concurrently (see `run_chains`), so a
+    supervised call waits for its slowest chain rather than for all of them
+    in turn. Reporting to the API and how decisions are combined are
+    unchanged, and mocked calls are left to `entropy_labs`. Functions are
+    registered by `register_supervised_functions` rather than when they are
+    decorated, and `supervision_functions` may be a factory of the chains.
+    """
+
+    def decorator(func):
+        with _registration_lock:
+            _unregistered.append((func, supervision_functions, ignored_attributes))
+        mocked: List[Callable[..., Any]] = []
+
+        @wraps(func)
+        def wrapper(*tool_args, **tool_kwargs):
+            effective_mock_policy = (
+                supervision_config.global_mock_policy
+                if supervision_config.override_local_policy
+                else (mock_policy or supervision_config.global_mock_policy)
+            )
+            if effective_mock_policy != MockPolicy.NO_MOCK:
+                if len(mocked) == 0:
+                    mocked.append(decorators.supervise(mock_policy, mock_responses)(func))
+                return mocked[0](*tool_args, **tool_kwargs)
+
+            supervision_context = supervision_config.get_all_runs()[0].supervision_context
+            client = supervision_config.client
+
+            print(f"\n--- Supervision ---")
+            print(f"Function Name: {func.__qualname__}")
+            print(f"Arguments: {tool_args}, {tool_kwargs.keys()}")
+
+            entry = supervision_context.get_supervised_function_entry(func.__qualname__)
+            if not entry:
+                raise Exception(f"Tool ID for function {func.__name__} not found in the registry.")
+            tool_id = entry["tool_id"]
+            entry_ignored_attributes = entry["ignored_attributes"]
+
+            tool_requests = [
+                ToolRequest(
+                    tool_id=tool_id,
+                    message=supervision_context.get_api_messages()[-1],
+                    arguments=Arguments.from_dict(serialize_arguments(tool_args, tool_kwargs)),
+                    task_state=supervision_context.to_task_state(),
+                )
+            ]
+            tool_request_group = create_tool_request_group(tool_id, tool_requests, client)
+            supervisors_chains = get_supervisor_chains_for_tool(tool_id, client)
+            if not supervisors_chains:
+                print(f"No supervisors found for function {func.__name__}. Executing function.")
+                return func(*tool_args, **tool_kwargs)
+
+            context = {
+                "supervision_context": supervision_context,
+                "client": client,
+                "tool_id": tool_id,
+                "tool_request": tool_request_group.tool_requests[0],
+                "tool_request_group": tool_request_group,
+                "ignored_attributes": entry_ignored_attributes,
+                "tool_args": tool_args,
+                "tool_kwargs": tool_kwargs,
+            }
+            outcomes = run_chains(supervisors_chains, func, context)
+            if len(outcomes) == 1 and outcomes[0].stops:
+                return outcomes[0].message
+            all_decisions = [outcome.decision for outcome in outcomes if outcome.decision is not None]
+
+            if all(decision.decision in [SupervisionDecisionType.APPROVE, SupervisionDecisionType.MODIFY] for decision in all_decisions):
+                print("All decisions approved or modified.")
+                final_kwargs = tool_kwargs.copy()
+                # the first modification, in chain order, applies
+                for decision in all_decisions:
+                    if decision.decision == SupervisionDecisionType.MODIFY and decision.modified:
+                        if decision.modified.tool_kwargs:
+                            for key, value in decision.modified.tool_kwargs.items():
+                                if entry_ignored_attributes and key in entry_ignored_attributes:
+                                    continue
+                                final_kwargs[key] = value
+                        break
+                return func(*tool_args, **final_kwargs)
+            explanations = " ".join(
+                f"Supervisor {idx}: Decision: {d.decision}, Explanation: {d.explanation} \n"
+                for idx, d in enumerate(all_decisions)
+            )
+            return (
+                f"The agent requested to execute a function but it was rejected by some supervisors.\n"
+                f"Chain Explanations: \n{explanations}\n"
+                f"{FEEDBACK_NOTE} You should try something else!"
+            )
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,42 @@
+# Copyright Sierra
+
+from functools import wraps
+from typing import Any, Callable
+
+# "read-only" only supervises the tools that cannot change the data
+SUPERVISION_MODES = ["off", "read-only", "full"]
+_supervision_mode = "full"
+
+Decorator = Callable[[Callable[..., Any]], Callable[..., Any]]
+
+
+def set_supervision_mode(mode: str) -> None:
+    global _supervision_mode
+    if mode not in SUPERVISION_MODES:
+        raise ValueError(f"Unknown supervision mode: {mode}")
+    _supervision_mode = mode
+
+
+def supervision_mode() -> str:
+    return _supervision_mode
+
+
+def mode_gated(supervision: Decorator, read_only: bool = False) -> Decorator:
+    """
+    `supervision` (e.g. `supervise(...)`) applied only while the supervision
+    mode covers the function: never with "off", and with "read-only" only
+    for `read_only` functions. Otherwise the function runs unsupervised.
+    """
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        supervised = supervision(func)
+
+        @wraps(supervised)
+        def wrapper(*args, **kwargs):
+            if _supervision_mode == "off" or (_supervision_mode == "read-only" and not read_only):
+                return func(*args, **kwargs)
+            return supervised(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
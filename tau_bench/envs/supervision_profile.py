@@ -0,0 +1,240 @@
+# Copyright Sierra
+
+import asyncio
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from entropy_labs.supervision import supervisors as entropy_supervisors
+
+from tau_bench.rate_limit import add_usage_observer, limit_openai_client
+
+# latencies are kept as a histogram of log-spaced buckets, which summaries
+# of any number of episodes can be merged into: bucket `i` holds the
+# latencies up to LATENCY_BASE * LATENCY_GROWTH ** i seconds (about 19%
+# wider than the one before it)
+LATENCY_BASE = 0.001
+LATENCY_GROWTH = 2 ** 0.25
+
+
+def latency_bucket(latency: float) -> int:
+    if latency <= LATENCY_BASE:
+        return 0
+    return math.ceil(math.log(latency / LATENCY_BASE, LATENCY_GROWTH))
+
+
+def histogram_percentile(histogram: Dict[int, int], q: float) -> Optional[float]:
+    """The upper bound of the bucket holding the nearest-rank `q`th percentile."""
+    count = sum(histogram.values())
+    if count == 0:
+        return None
+    rank = max(1, math.ceil(q / 100 * count))
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= rank:
+            return LATENCY_BASE * LATENCY_GROWTH ** bucket
+    return None
+
+
+class SupervisorProfile(object):
+    """What one supervisor did: calls, decisions, latency and LLM tokens."""
+
+    def __init__(self) -> None:
+        self.invocations = 0
+        self.cached = 0
+        self.decisions: Dict[str, int] = {}
+        self.latency_total = 0.0
+        self.latency_histogram: Dict[int, int] = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.tokens_by_tool: Dict[str, int] = {}
+
+    def record(
+        self,
+        tool: str,
+        decision: str,
+        latency: float,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cached: bool,
+    ) -> None:
+        self.invocations += 1
+        self.cached += int(cached)
+        self.decisions[decision] = self.decisions.get(decision, 0) + 1
+        self.latency_total += latency
+        bucket = latency_bucket(latency)
+        self.latency_histogram[bucket] = self.latency_histogram.get(bucket, 0) + 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.tokens_by_tool[tool] = self.tokens_by_tool.get(tool, 0) + prompt_tokens + completion_tokens
+
+    def merge(self, summary: Dict[str, Any]) -> None:
+        self.invocations += summary["invocations"]
+        self.cached += summary["cached"]
+        for decision, count in summary["decisions"].items():
+            self.decisions[decision] = self.decisions.get(decision, 0) + count
+        self.latency_total += summary["latency_total"]
+        for bucket, count in summary["latency_histogram"].items():
+            # JSON object keys are strings
+            self.latency_histogram[int(bucket)] = self.latency_histogram.get(int(bucket), 0) + count
+        self.prompt_tokens += summary["prompt_tokens"]
+        self.completion_tokens += summary["completion_tokens"]
+        for tool, tokens in summary["tokens_by_tool"].items():
+            self.tokens_by_tool[tool] = self.tokens_by_tool.get(tool, 0) + tokens
+
+    def summary(self) -> Dict[str, Any]:
+        invocations = max(1, self.invocations)
+        return {
+            "invocations": self.invocations,
+            "cached": self.cached,
+            "decisions": dict(self.decisions),
+            "approve_rate": self.decisions.get("approve", 0) / invocations,
+            "reject_rate": self.decisions.get("reject", 0) / invocations,
+            "latency_total": self.latency_total,
+            "latency_p50": histogram_percentile(self.latency_histogram, 50),
+            "latency_p95": histogram_percentile(self.latency_histogram, 95),
+            "latency_histogram": {str(bucket): count for bucket, count in sorted(self.latency_histogram.items())},
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "tokens_by_tool": dict(self.tokens_by_tool),
+        }
+
+
+class SupervisionProfile(object):
+    """
+    Supervisor activity during one episode, by supervisor name. The
+    summaries of several episodes can be merged into a run-wide profile.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.supervisors: Dict[str, SupervisorProfile] = {}
+
+    def record(
+        self,
+        supervisor: str,
+        tool: str,
+        decision: str,
+        latency: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached: bool = False,
+    ) -> None:
+        # chains of one call are recorded from several threads
+        with self.lock:
+            self.supervisors.setdefault(supervisor, SupervisorProfile()).record(
+                tool, decision, latency, prompt_tokens, completion_tokens, cached
+            )
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            return {name: profile.summary() for name, profile in sorted(self.supervisors.items())}
+
+    @classmethod
+    def merged(cls, summaries: Iterable[Dict[str, Dict[str, Any]]]) -> "SupervisionProfile":
+        profile = cls()
+        for summary in summaries:
+            for name, supervisor_summary in summary.items():
+                profile.supervisors.setdefault(name, SupervisorProfile()).merge(supervisor_summary)
+        return profile
+
+
+_active_profile: ContextVar[Optional[SupervisionProfile]] = ContextVar(
+    "supervision_profile", default=None
+)
+
+
+def active_profile() -> Optional[SupervisionProfile]:
+    return _active_profile.get()
+
+
+@contextmanager
+def profiling(profile: SupervisionProfile) -> Iterator[SupervisionProfile]:
+    """
+    Record the supervision of everything run in this context (including
+    `asyncio.to_thread` calls and supervisor chains, which copy it) into
+    `profile`. The LLM supervisors' tokens are counted from the usage their
+    OpenAI client reports, so the client is routed through the rate limiter
+    (see `limit_openai_client`), which reports it.
+    """
+    limit_openai_client(entropy_supervisors.client, provider="openai")
+    token = _active_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _active_profile.reset(token)
+
+
+def tool_name(func: Callable[..., Any]) -> str:
+    # "GetOrderDetails.invoke" -> "GetOrderDetails"
+    return func.__qualname__.split(".")[0]
+
+
+# what the supervisor running on this thread did: the tokens of its LLM
+# calls, and whether its decision came from the verdict cache
+_calls = threading.local()
+
+
+@contextmanager
+def recording_call() -> Iterator[Dict[str, Any]]:
+    call = {"prompt_tokens": 0, "completion_tokens": 0, "cached": False}
+    previous = getattr(_calls, "call", None)
+    _calls.call = call
+    try:
+        yield call
+    finally:
+        _calls.call = previous
+
+
+def mark_cached() -> None:
+    call = getattr(_calls, "call", None)
+    if call is not None:
+        call["cached"] = True
+
+
+def _count_usage(usage: Any) -> None:
+    call = getattr(_calls, "call", None)
+    if call is None or usage is None:
+        return
+    call["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+    call["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
+
+add_usage_observer(_count_usage)
+
+
+def profiled_supervisor(supervisor: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    `supervisor`, recording each decision it makes into the active profile.
+    Registration reads the name, description, attributes and source of the
+    wrapped supervisor. Supervisors that are coroutine functions (a human
+    supervisor) are returned as they are.
+    """
+    if asyncio.iscoroutinefunction(supervisor):
+        return supervisor
+
+    @wraps(supervisor)
+    def wrapper(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        profile = active_profile()
+        if profile is None:
+            return supervisor(func, *args, **kwargs)
+        started_at = time.perf_counter()
+        with recording_call() as call:
+            decision = supervisor(func, *args, **kwargs)
+        profile.record(
+            wrapper.__name__,
+            tool_name(func),
+            str(getattr(decision.decision, "value", decision.decision)),
+            time.perf_counter() - started_at,
+            prompt_tokens=call["prompt_tokens"],
+            completion_tokens=call["completion_tokens"],
+            cached=call["cached"],
+        )
+        return decision
+
+    return wrapper
@@ -1,8 +1,15 @@
 import abc
 from typing import Any
-from functools import wraps
-from entropy_labs.supervision.decorators import supervise
+from functools import lru_cache, partial
+from tau_bench.envs.supervision import supervise
 from entropy_labs.supervision.supervisors import human_supervisor, llm_supervisor
+from tau_bench.envs.precheck import prechecked, read_precheck
+from tau_bench.envs.snapshot import read_through_view
+from tau_bench.envs.speculation import speculative
+from tau_bench.envs.supervision_mode import mode_gated
+from tau_bench.envs.supervision_profile import profiled_supervisor
+from tau_bench.envs.tool_cache import bump_on_write, memoize_read
+from tau_bench.envs.verdict_cache import cached_supervisor
 
 retail_rules = [
     "You are a customer service representative for an online retail company. You are chatting with a customer, and you can call tools or respond to the user.",
@@ -18,11 +25,14 @@ airline_rules = []
 
 
 airline_policy_path = "tau_bench/envs/airline/wiki.md"
-airline_policy = open(airline_policy_path, "r").read()
+retail_policy_path = "tau_bench/envs/retail/wiki.md"
 
 
-retail_policy_path = "tau_bench/envs/retail/wiki.md"
-retail_policy = open(retail_policy_path, "r").read()
+@lru_cache(maxsize=None)
+def load_policy(environment: str) -> str:
+    policy_path = retail_policy_path if environment == "retail" else airline_policy_path
+    with open(policy_path, "r") as f:
+        return f.read()
 
 ID_VALIDATION_SYSTEM_PROMPT = """
 As an extremely skilled AI supervisor system specialized in overseeing customer support agents, your role is to ensure that the assistant properly validates and handles user-provided IDs (e.g., product IDs, item IDs, order IDs), especially when there's a strong indication that an ID corresponds to a different entity.
@@ -74,12 +84,18 @@ id_validation_supervisor = llm_supervisor(
 )
 
 
+def instrumented(supervisor):
+    # decisions are reused for retried actions, and every one is profiled
+    return profiled_supervisor(cached_supervisor(supervisor))
+
+
+@lru_cache(maxsize=None)
 def create_supervisors(environment: str):
+    # built once per domain and shared by all of its tools
+    agent_policy = load_policy(environment)
     if environment == "retail":
-        agent_policy = retail_policy
         agent_rules = retail_rules
     else:
-        agent_policy = airline_policy
         agent_rules = airline_rules
 
     CORRECT_TOOL_CALL_ARGUMENTS_SYSTEM_PROMPT = """
@@ -217,29 +233,29 @@ def create_supervisors(environment: str):
     """
 
     # Create supervisors with updated prompts
-    correct_tool_call_arguments_supervisor = llm_supervisor(
+    correct_tool_call_arguments_supervisor = instrumented(llm_supervisor(
         system_prompt=CORRECT_TOOL_CALL_ARGUMENTS_SYSTEM_PROMPT,
         instructions=CORRECT_TOOL_CALL_ARGUMENTS_INSTRUCTIONS,
         supervisor_name="Correct Tool Call Arguments Supervisor",
         description="Supervisor that reviews the arguments passed to the tool call and decides whether they are correct or not.",
         include_context=True
-    )
+    ))
 
-    agent_policy_supervisor = llm_supervisor(
+    agent_policy_supervisor = instrumented(llm_supervisor(
         system_prompt=AGENT_POLICY_SYSTEM_PROMPT,
         instructions=AGENT_POLICY_INSTRUCTIONS,
         supervisor_name="Agent Policy Supervisor",
         description="Supervisor that reviews the agent's actions and decides whether they are following the agent's policy.",
         include_context=True
-    )
+    ))
 
-    goal_following_supervisor = llm_supervisor(
+    goal_following_supervisor = instrumented(llm_supervisor(
         system_prompt=GOAL_FOLLOWING_SYSTEM_PROMPT,
         instructions=GOAL_FOLLOWING_INSTRUCTIONS,
         supervisor_name="Goal Following Supervisor",
         description="Supervisor that reviews the agent's actions and decides whether they are following the user's goal.",
         include_context=True
-    )
+    ))
 
     # Assemble supervisor functions
     action_supervisor_functions = [
@@ -255,6 +271,17 @@ def create_supervisors(environment: str):
     return action_supervisor_functions, read_supervisor_functions
 
 
+def action_supervisors(environment: str):
+    return create_supervisors(environment)[0]
+
+
+def read_supervisors(environment: str):
+    return create_supervisors(environment)[1]
+
+
+SUPERVISION_KINDS = ("read", "action")
+
+
 class Tool(abc.ABC):
     @classmethod
     def __init_subclass__(cls, **kwargs):
@@ -262,6 +289,8 @@ class Tool(abc.ABC):
         # Set the docstring of the invoke method using get_info()
         
         if 'invoke' in cls.__dict__:
+            if cls.supervision not in SUPERVISION_KINDS:
+                raise ValueError(f"{cls.__name__}.supervision must be one of {SUPERVISION_KINDS}")
             # if class name is Think, then ignore
             
             # Retrieve info from get_info()
@@ -271,24 +300,49 @@ class Tool(abc.ABC):
                 # description = info.get('function', {}).get('description', '')
                 if info:
                     cls.invoke.__doc__ = info
-            action_supervisor_functions, read_supervisor_functions = create_supervisors(cls.__module__.split(".")[2])
-            if cls.__name__ == "Think" or cls.__name__.startswith("Get") or cls.__name__.startswith("List") or cls.__name__.startswith("Find"):
-                cls.invoke = staticmethod(supervise(supervision_functions=read_supervisor_functions,
-                                                    ignored_attributes=['data'])(cls.invoke))
-                return
-            
+            # the undecorated implementation, for replaying actions without
+            # supervision (e.g. ground-truth replay in Env.calculate_reward)
+            cls._raw_invoke = cls.__dict__["invoke"]
+            # the chains are built when a run registers its tools, so
+            # importing a domain's tools neither reads its wiki nor builds
+            # its supervisors
+            environment = cls.__module__.split(".")[2]
+            if cls.read_only:
+                # results are memoized per episode until a write tool runs,
+                # and the tool reads through a view that never copies
+                # records into the episode's overlay
+                invoke = memoize_read(info["function"]["name"], read_through_view(cls.invoke))
+            else:
+                invoke = bump_on_write(cls.invoke)
+            if cls.supervision == "read":
+                supervision = supervise(supervision_functions=partial(read_supervisors, environment),
+                                        ignored_attributes=['data'])
+                # calls that pass the deterministic pre-check skip the LLM
+                # supervisor
+                supervision = prechecked(supervision, read_precheck(info))
+            else:
+                supervision = supervise(supervision_functions=partial(action_supervisors, environment),
+                                        ignored_attributes=['data'])
+                if not cls.read_only:
+                    # may run on a savepoint while the supervisors deliberate
+                    supervision = speculative(supervision)
             # Wrap the invoke method of any subclass with supervise
-            cls.invoke = staticmethod(
-                supervise(
-                    supervision_functions=action_supervisor_functions, 
-                    ignored_attributes=['data']
-                )(cls.invoke)
-            )
+            cls.invoke = staticmethod(mode_gated(supervision, read_only=cls.read_only)(invoke))
 
     @staticmethod
     def invoke(*args, **kwargs):
         raise NotImplementedError
 
+    _raw_invoke = invoke
+    # Tools declare what they do rather than it being guessed from their
+    # name. `read_only` tools never write to the data: their results are
+    # memoized, they do not invalidate other tools' memoized results and
+    # they are never run speculatively. `supervision` picks the supervisor
+    # chains: "read" (one chain, behind a deterministic pre-check) or
+    # "action" (every chain).
+    read_only = False
+    supervision = "action"
+
     @staticmethod
     def get_info() -> dict[str, Any]:
         raise NotImplementedError
@@ -0,0 +1,66 @@
+# Copyright Sierra
+
+import json
+from functools import wraps
+from typing import Any, Callable, Dict, Tuple
+
+
+class ToolResultCache(object):
+    """
+    One episode's memo of read-only tool results, keyed by `(data version,
+    tool name, arguments)`. Tools that may write bump the version, so a
+    result is only reused while the data it was computed from is unchanged.
+    """
+
+    def __init__(self) -> None:
+        self.version = 0
+        self.results: Dict[Tuple[int, str, str], str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def bump(self) -> None:
+        self.version += 1
+        # entries for older versions can never be hit again
+        self.results.clear()
+
+    def call(self, tool_name: str, kwargs: Dict[str, Any], invoke: Callable[[], str]) -> str:
+        # arguments come from JSON, so this tells apart e.g. 1 and True
+        key = (self.version, tool_name, json.dumps(kwargs, sort_keys=True, default=repr))
+        if key in self.results:
+            self.hits += 1
+            return self.results[key]
+        self.misses += 1
+        # errors raised by the tool propagate and are not cached
+        result = self.results[key] = invoke()
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "data_version": self.version}
+
+
+def memoize_read(tool_name: str, invoke: Callable[..., str]) -> Callable[..., str]:
+    """Serve `invoke` from the `ToolResultCache` of the data it is called on."""
+
+    @wraps(invoke)
+    def wrapper(data: Any, **kwargs: Any) -> str:
+        cache = getattr(data, "tool_results", None)
+        if cache is None:
+            return invoke(data=data, **kwargs)
+        return cache.call(tool_name, kwargs, lambda: invoke(data=data, **kwargs))
+
+    return wrapper
+
+
+def bump_on_write(invoke: Callable[..., str]) -> Callable[..., str]:
+    """Invalidate the memoized reads of the data `invoke` may write to."""
+
+    @wraps(invoke)
+    def wrapper(data: Any, **kwargs: Any) -> str:
+        try:
+            return invoke(data=data, **kwargs)
+        finally:
+            cache = getattr(data, "tool_results", None)
+            if cache is not None:
+                cache.bump()
+
+    return wrapper
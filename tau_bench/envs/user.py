@@ -2,7 +2,8 @@
 
 import abc
 import enum
-from litellm import completion
+import asyncio
+from tau_bench.rate_limit import acompletion, completion
 
 from typing import Optional, List, Dict, Any, Union
 
@@ -22,6 +23,12 @@ class BaseUserSimulationEnv(abc.ABC):
     def get_total_cost(self) -> float:
         raise NotImplementedError
 
+    async def reset_async(self, instruction: Optional[str] = None) -> str:
+        return await asyncio.to_thread(self.reset, instruction)
+
+    async def step_async(self, content: str) -> str:
+        return await asyncio.to_thread(self.step, content)
+
 
 class HumanUserSimulationEnv(BaseUserSimulationEnv):
     def reset(self, instruction: str) -> str:
@@ -41,7 +48,6 @@ class LLMUserSimulationEnv(BaseUserSimulationEnv):
         self.model = model
         self.provider = provider
         self.total_cost = 0.0
-        self.reset()
 
     def generate_next_message(self, messages: List[Dict[str, Any]]) -> str:
         res = completion(
@@ -52,6 +58,15 @@ class LLMUserSimulationEnv(BaseUserSimulationEnv):
         self.total_cost = res._hidden_params["response_cost"]
         return message.content
 
+    async def generate_next_message_async(self, messages: List[Dict[str, Any]]) -> str:
+        res = await acompletion(
+            model=self.model, custom_llm_provider=self.provider, messages=messages
+        )
+        message = res.choices[0].message
+        self.messages.append(message.model_dump())
+        self.total_cost = res._hidden_params["response_cost"]
+        return message.content
+
     def build_system_prompt(self, instruction: Optional[str]) -> str:
         instruction_display = (
             ("\n\nInstruction: " + instruction + "\n")
@@ -81,15 +96,25 @@ Rules:
         self.messages.append({"role": "user", "content": content})
         return self.generate_next_message(self.messages)
 
+    async def reset_async(self, instruction: Optional[str] = None) -> str:
+        self.messages = [
+            {
+                "role": "system",
+                "content": self.build_system_prompt(instruction=instruction),
+            },
+            {"role": "user", "content": "Hi! How can I help you today?"},
+        ]
+        return await self.generate_next_message_async(self.messages)
+
+    async def step_async(self, content: str) -> str:
+        self.messages.append({"role": "user", "content": content})
+        return await self.generate_next_message_async(self.messages)
+
     def get_total_cost(self) -> float:
         return self.total_cost
 
 
 class ReactUserSimulationEnv(LLMUserSimulationEnv):
-    def __init__(self, model: str, provider: str) -> None:
-        super().__init__(model=model, provider=provider)
-        self.reset()
-
     def build_system_prompt(self, instruction: Optional[str]) -> str:
         instruction_display = (
             ("\n\nInstruction: " + instruction + "\n")
@@ -123,6 +148,15 @@ User Response:
         self.total_cost = res._hidden_params["response_cost"]
         return self.parse_response(message.content)
 
+    async def generate_next_message_async(self, messages: List[Dict[str, Any]]) -> str:
+        res = await acompletion(
+            model=self.model, custom_llm_provider=self.provider, messages=messages
+        )
+        message = res.choices[0].message
+        self.messages.append(message.model_dump())
+        self.total_cost = res._hidden_params["response_cost"]
+        return self.parse_response(message.content)
+
     def reset(self, instruction: Optional[str] = None) -> str:
         self.messages = [
             {
@@ -155,10 +189,8 @@ User Response:
 
 class VerifyUserSimulationEnv(LLMUserSimulationEnv):
     def __init__(self, model: str, provider: str, max_attempts: int = 3) -> None:
-        self.model = model
-        self.provider = provider
+        super().__init__(model=model, provider=provider)
         self.max_attempts = max_attempts
-        self.reset()
 
     def generate_next_message(self, messages: List[Dict[str, Any]]) -> str:
         attempts = 0
@@ -176,6 +208,10 @@ class VerifyUserSimulationEnv(LLMUserSimulationEnv):
         assert cur_message is not None
         return cur_message.content
 
+    async def generate_next_message_async(self, messages: List[Dict[str, Any]]) -> str:
+        # verification calls are synchronous
+        return await asyncio.to_thread(self.generate_next_message, messages)
+
     def reset(self, instruction: Optional[str] = None) -> str:
         self.messages = [
             {
@@ -269,10 +305,8 @@ Response:
 
 class ReflectionUserSimulationEnv(LLMUserSimulationEnv):
     def __init__(self, model: str, provider: str, max_attempts: int = 2) -> None:
-        self.model = model
-        self.provider = provider
+        super().__init__(model=model, provider=provider)
         self.max_attempts = max_attempts
-        self.reset()
 
     def generate_next_message(self, messages: List[Dict[str, Any]]) -> str:
         cur_messages = messages.copy()
@@ -291,6 +325,10 @@ class ReflectionUserSimulationEnv(LLMUserSimulationEnv):
             attempts += 1
         return initial_response
 
+    async def generate_next_message_async(self, messages: List[Dict[str, Any]]) -> str:
+        # verification and reflection calls are synchronous
+        return await asyncio.to_thread(self.generate_next_message, messages)
+
     def reset(self, instruction: Optional[str] = None) -> str:
         self.messages = [
             {
@@ -0,0 +1,211 @@
+# Copyright Sierra
+
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from hashlib import sha256
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from entropy_labs.supervision.config import SupervisionDecisionType
+
+from tau_bench.envs.supervision_profile import mark_cached
+
+# every rejection the agent sees carries this sentence (see supervision.py
+# and entropy_labs' supervise)
+FEEDBACK_MARKER = "This is not a message from the user but from a supervisor system"
+
+# the explanation of the decision llm_supervisor falls back to when the
+# model cannot be asked
+SUPERVISOR_ERROR_PREFIX = "Error during LLM supervision"
+
+VerdictKey = Tuple[str, str, str]
+
+
+def _is_feedback(message: Dict[str, Any]) -> bool:
+    content = message.get("content")
+    return isinstance(content, str) and FEEDBACK_MARKER in content
+
+
+def is_verdict(decision: Any) -> bool:
+    """
+    Whether `decision` is the supervisor's judgement of the action, rather
+    than an escalation or the fallback of a failed call, which asking again
+    may turn into a verdict.
+    """
+    if getattr(decision, "decision", None) == SupervisionDecisionType.ESCALATE:
+        return False
+    explanation = getattr(decision, "explanation", None)
+    return not (isinstance(explanation, str) and explanation.startswith(SUPERVISOR_ERROR_PREFIX))
+
+
+def conversation_digest(messages: List[Dict[str, Any]]) -> str:
+    """
+    A rolling digest of the conversation a supervisor reviews, leaving out
+    rejected rounds (an agent message answered by supervisor feedback).
+    Retrying a rejected action therefore meets the same digest as the
+    first attempt, while anything the user or a tool actually said changes it.
+    """
+    digest = sha256()
+    for idx, message in enumerate(messages):
+        if _is_feedback(message):
+            continue
+        if idx + 1 < len(messages) and _is_feedback(messages[idx + 1]):
+            continue
+        # tool call ids change on every attempt and carry no meaning
+        content = {k: v for k, v in message.items() if k not in ("tool_call_id", "id")}
+        if isinstance(content.get("tool_calls"), list):
+            content["tool_calls"] = [
+                {k: v for k, v in call.items() if k != "id"} if isinstance(call, dict) else call
+                for call in content["tool_calls"]
+            ]
+        digest = sha256(digest.digest() + json.dumps(content, sort_keys=True, default=repr).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def action_digest(
+    func_name: str,
+    tool_args: Iterable[Any],
+    tool_kwargs: Dict[str, Any],
+    ignored_attributes: Iterable[str],
+) -> str:
+    ignored = set(ignored_attributes or [])
+    arguments = {
+        "args": list(tool_args),
+        "kwargs": {k: v for k, v in tool_kwargs.items() if k not in ignored},
+    }
+    return f"{func_name}:{json.dumps(arguments, sort_keys=True, default=repr)}"
+
+
+class VerdictCache(object):
+    """
+    A bounded LRU cache of supervisor decisions, keyed by `(supervisor
+    name, action and arguments, conversation digest)`. A cache serves one
+    episode (see `caching`), so trials never share decisions.
+
+    The supervisor prompts ask to approve an action that keeps being
+    rejected for the same reason, so a cached decision is only reused
+    `max_reuses` times; after that the supervisor runs again and sees the
+    repeated attempts in its context.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_reuses: int = 2) -> None:
+        self.max_entries = max_entries
+        self.max_reuses = max_reuses
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[VerdictKey, List[Any]]" = OrderedDict()
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, supervisor_name: str, outcome: str) -> None:
+        counts = self.counts.setdefault(supervisor_name, {"hits": 0, "misses": 0})
+        counts[outcome] += 1
+
+    def get(self, key: VerdictKey) -> Optional[Any]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] >= self.max_reuses:
+                self.entries.pop(key, None)
+                self._count(key[0], "misses")
+                return None
+            entry[1] += 1
+            self.entries.move_to_end(key)
+            self._count(key[0], "hits")
+            return entry[0]
+
+    def put(self, key: VerdictKey, decision: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = [decision, 0]
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self.lock:
+            stats = {}
+            for name, counts in sorted(self.counts.items()):
+                total = counts["hits"] + counts["misses"]
+                stats[name] = {**counts, "hit_rate": counts["hits"] / total if total else 0.0}
+            return stats
+
+    @staticmethod
+    def merged_stats(all_stats: Iterable[Dict[str, Dict[str, float]]]) -> Dict[str, Dict[str, float]]:
+        """The `stats` of several caches (e.g. one per episode) added up."""
+        cache = VerdictCache()
+        for stats in all_stats:
+            for name, counts in stats.items():
+                cache.counts.setdefault(name, {"hits": 0, "misses": 0})
+                cache.counts[name]["hits"] += counts["hits"]
+                cache.counts[name]["misses"] += counts["misses"]
+        return cache.stats()
+
+
+_active_cache: ContextVar[Optional[VerdictCache]] = ContextVar("verdict_cache", default=None)
+
+
+def active_verdict_cache() -> Optional[VerdictCache]:
+    return _active_cache.get()
+
+
+@contextmanager
+def caching(cache: VerdictCache) -> Iterator[VerdictCache]:
+    """
+    Reuse supervisor decisions through `cache` for everything run in this
+    context (including `asyncio.to_thread` calls and supervisor chains,
+    which copy it). Decisions are not cached outside such a context.
+    """
+    token = _active_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _active_cache.reset(token)
+
+
+def cached_supervisor(supervisor: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    `supervisor`, reusing its decisions through the active verdict cache.
+    Registration reads the name, description, attributes and source of the
+    wrapped supervisor. Only verdicts are cached (see `is_verdict`).
+    Supervisors that are coroutine functions (a human supervisor) are
+    always asked, so they are returned as they are.
+    """
+    if asyncio.iscoroutinefunction(supervisor):
+        return supervisor
+
+    @wraps(supervisor)
+    def wrapper(
+        func: Callable[..., Any],
+        supervision_context: Any,
+        ignored_attributes: List[str],
+        tool_args: Tuple[Any, ...],
+        tool_kwargs: Dict[str, Any],
+        **kwargs: Any,
+    ) -> Any:
+        cache = active_verdict_cache()
+        if cache is not None:
+            key = (
+                wrapper.__name__,
+                action_digest(func.__qualname__, tool_args, tool_kwargs, ignored_attributes),
+                conversation_digest(supervision_context.openai_messages),
+            )
+            decision = cache.get(key)
+            if decision is not None:
+                mark_cached()
+                return decision
+        decision = supervisor(
+            func,
+            supervision_context=supervision_context,
+            ignored_attributes=ignored_attributes,
+            tool_args=tool_args,
+            tool_kwargs=tool_kwargs,
+            **kwargs,
+        )
+        if cache is not None and is_verdict(decision):
+            cache.put(key, decision)
+        return decision
+
+    return wrapper
@@ -0,0 +1,259 @@
+# Copyright Sierra
+
+import json
+import time
+import asyncio
+import functools
+import threading
+import litellm
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# rough size of a completion when the request does not set max_tokens; the
+# tokens-per-minute budget is corrected with the real usage once it is known
+DEFAULT_COMPLETION_TOKENS = 512
+CHARS_PER_TOKEN = 4
+
+
+class TokenBucket(object):
+    """
+    A bucket of `capacity` units that refills continuously at `capacity` per
+    minute.
+
+    `reserve` always succeeds: it takes the units immediately (the level may
+    go negative) and returns how long the caller has to wait before using
+    them. Callers are therefore served in the order they reserved.
+    """
+
+    def __init__(self, capacity: float) -> None:
+        self.capacity = capacity
+        self.rate = capacity / 60.0
+        self.level = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # a single request larger than the bucket could otherwise never run
+        self.level -= min(amount, self.capacity)
+        if self.level >= 0:
+            return 0.0
+        return -self.level / self.rate
+
+    def adjust(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter(object):
+    """Requests-per-minute and tokens-per-minute budgets for one provider and model."""
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ) -> None:
+        self.lock = threading.Lock()
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def reserve(self, num_tokens: int) -> float:
+        with self.lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self.requests is not None:
+                wait = max(wait, self.requests.reserve(1, now))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.reserve(num_tokens, now))
+            return wait
+
+    def acquire(self, num_tokens: int) -> None:
+        wait = self.reserve(num_tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, num_tokens: int) -> None:
+        wait = self.reserve(num_tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def record_usage(self, estimated_tokens: int, used_tokens: int) -> None:
+        """Give back (or take) the difference between the estimate and the actual usage."""
+        if self.tokens is None:
+            return
+        with self.lock:
+            self.tokens.adjust(estimated_tokens - used_tokens, time.monotonic())
+
+
+# (provider, model) -> (requests per minute, tokens per minute); model None
+# sets the default for every model of the provider
+_limits: Dict[Tuple[str, Optional[str]], Tuple[Optional[float], Optional[float]]] = {}
+_limiters: Dict[Tuple[str, str], Optional[RateLimiter]] = {}
+_limiters_lock = threading.Lock()
+
+
+def set_rate_limit(
+    provider: str,
+    model: Optional[str] = None,
+    requests_per_minute: Optional[float] = None,
+    tokens_per_minute: Optional[float] = None,
+) -> None:
+    with _limiters_lock:
+        _limits[(provider, model)] = (requests_per_minute, tokens_per_minute)
+        _limiters.clear()
+
+
+def get_rate_limiter(provider: Optional[str], model: str) -> Optional[RateLimiter]:
+    """
+    Return the limiter shared by every caller of `model` on `provider`, or
+    None if no limit is configured for it.
+    """
+    if provider is None:
+        provider, model = _split_model(model)
+    key = (provider, model)
+    with _limiters_lock:
+        if key not in _limiters:
+            limit = _limits.get(key) or _limits.get((provider, None))
+            _limiters[key] = RateLimiter(*limit) if limit is not None and any(limit) else None
+        return _limiters[key]
+
+
+def _split_model(model: str) -> Tuple[str, str]:
+    # litellm style "provider/model"; bare model names are assumed to be OpenAI's
+    if "/" in model:
+        provider, model = model.split("/", 1)
+        return provider, model
+    return "openai", model
+
+
+def estimate_tokens(
+    messages: List[Dict[str, Any]],
+    tools: Optional[List[Dict[str, Any]]] = None,
+    max_tokens: Optional[int] = None,
+) -> int:
+    prompt_chars = sum(len(json.dumps(m, default=str)) for m in messages)
+    if tools:
+        prompt_chars += len(json.dumps(tools, default=str))
+    return prompt_chars // CHARS_PER_TOKEN + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+def _used_tokens(res: Any, default: int) -> int:
+    usage = getattr(res, "usage", None)
+    total_tokens = getattr(usage, "total_tokens", None)
+    return total_tokens if isinstance(total_tokens, int) else default
+
+
+def _estimate_request(kwargs: Dict[str, Any]) -> int:
+    return estimate_tokens(
+        kwargs.get("messages", []),
+        tools=kwargs.get("tools") or kwargs.get("functions"),
+        max_tokens=kwargs.get("max_tokens"),
+    )
+
+
+# called with (latency in seconds, exception or None) after every LLM call
+CallObserver = Callable[[float, Optional[BaseException]], None]
+
+_call_observers: List[CallObserver] = []
+
+
+def add_call_observer(observer: CallObserver) -> None:
+    _call_observers.append(observer)
+
+
+def remove_call_observer(observer: CallObserver) -> None:
+    if observer in _call_observers:
+        _call_observers.remove(observer)
+
+
+def _notify(started_at: float, error: Optional[BaseException]) -> None:
+    latency = time.monotonic() - started_at
+    for observer in list(_call_observers):
+        observer(latency, error)
+
+
+# called with the `usage` of every successful LLM response (None if absent)
+UsageObserver = Callable[[Any], None]
+
+_usage_observers: List[UsageObserver] = []
+
+
+def add_usage_observer(observer: UsageObserver) -> None:
+    _usage_observers.append(observer)
+
+
+def _notify_usage(res: Any) -> None:
+    usage = getattr(res, "usage", None)
+    for observer in list(_usage_observers):
+        observer(usage)
+
+
+class _CallAccounting(object):
+    """
+    The bookkeeping around one LLM call, shared by the sync and async
+    paths: the token estimate to reserve before it, and, once it returns or
+    raises in the `with` block, the observers and the usage correction.
+    """
+
+    def __init__(self, limiter: Optional[RateLimiter], kwargs: Dict[str, Any]) -> None:
+        self.limiter = limiter
+        self.estimated_tokens = _estimate_request(kwargs)
+
+    def __enter__(self) -> "_CallAccounting":
+        self.started_at = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Optional[BaseException], tb: Any) -> None:
+        if isinstance(exc, Exception):
+            _notify(self.started_at, exc)
+
+    def done(self, res: Any) -> Any:
+        _notify(self.started_at, None)
+        _notify_usage(res)
+        if self.limiter is not None:
+            self.limiter.record_usage(self.estimated_tokens, _used_tokens(res, self.estimated_tokens))
+        return res
+
+
+def _call(limiter: Optional[RateLimiter], create: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    accounting = _CallAccounting(limiter, kwargs)
+    if limiter is not None:
+        limiter.acquire(accounting.estimated_tokens)
+    with accounting:
+        return accounting.done(create(*args, **kwargs))
+
+
+def completion(**kwargs: Any) -> Any:
+    """`litellm.completion`, after waiting for the provider's rate limit."""
+    limiter = get_rate_limiter(kwargs.get("custom_llm_provider"), kwargs["model"])
+    return _call(limiter, litellm.completion, **kwargs)
+
+
+async def acompletion(**kwargs: Any) -> Any:
+    """`litellm.acompletion`, after waiting for the provider's rate limit."""
+    limiter = get_rate_limiter(kwargs.get("custom_llm_provider"), kwargs["model"])
+    accounting = _CallAccounting(limiter, kwargs)
+    if limiter is not None:
+        await limiter.acquire_async(accounting.estimated_tokens)
+    with accounting:
+        return accounting.done(await litellm.acompletion(**kwargs))
+
+
+def limit_openai_client(client: Any, provider: str = "openai") -> None:
+    """
+    Route an OpenAI client's chat completions through the rate limiter, for
+    libraries (such as the entropy_labs LLM supervisors) that call the
+    OpenAI SDK directly instead of going through litellm.
+    """
+    create = client.chat.completions.create
+    if getattr(create, "rate_limited", False):
+        return
+
+    @functools.wraps(create)
+    def _create(*args: Any, **kwargs: Any) -> Any:
+        return _call(get_rate_limiter(provider, kwargs["model"]), create, *args, **kwargs)
+
+    _create.rate_limited = True
+    client.chat.completions.create = _create
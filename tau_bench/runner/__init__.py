@@ -0,0 +1 @@
+# Copyright Sierra
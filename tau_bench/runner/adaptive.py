@@ -0,0 +1,141 @@
+# Copyright Sierra
+
+import time
+import asyncio
+import threading
+import openai
+from typing import Optional
+
+from tau_bench.types import EnvRunResult
+
+# errors that mean the provider is overloaded, rather than that the request
+# itself was bad (litellm's exceptions subclass these)
+CONGESTION_ERRORS = (openai.RateLimitError, openai.APITimeoutError, TimeoutError)
+
+
+class AdaptiveConcurrency(object):
+    """
+    Additive-increase / multiplicative-decrease control of the number of
+    episodes in flight, between `min_concurrency` and `max_concurrency`.
+
+    The controller watches every LLM call (see `tau_bench.rate_limit`). The
+    limit grows by `increase` for each episode that finishes while calls are
+    healthy, i.e. no rate-limit or timeout errors in the last `cooldown`
+    seconds and a short-term average latency within `latency_tolerance`
+    times the long-term average. A
+    rate-limit error or timeout multiplies the limit by `backoff`, at most
+    once per `cooldown` seconds so that the burst of errors from one
+    overload only counts once.
+
+    Episode runners wrap each episode in `acquire`/`release` (or the async
+    variants); lowering the limit never interrupts running episodes, it only
+    delays new ones.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        initial_concurrency: Optional[int] = None,
+        increase: float = 1.0,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        cooldown: float = 30.0,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.limit = float(
+            min(max_concurrency, max(self.min_concurrency, initial_concurrency or self.min_concurrency))
+        )
+        self.increase = increase
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.condition = threading.Condition()
+        self.started_at = time.monotonic()
+        self.last_backoff_at = float("-inf")
+        self.last_congestion_at = float("-inf")
+        self.latency_ewma: Optional[float] = None
+        self.baseline_latency: Optional[float] = None
+        self.num_completed = 0
+        self.num_succeeded = 0
+        self.num_congestion_errors = 0
+
+    @property
+    def concurrency(self) -> int:
+        return int(self.limit)
+
+    def acquire(self) -> None:
+        with self.condition:
+            while self.in_flight >= self.concurrency:
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, result: Optional[EnvRunResult] = None) -> None:
+        with self.condition:
+            self.in_flight -= 1
+            self._on_episode(result)
+            self.condition.notify_all()
+
+    async def acquire_async(self, condition: asyncio.Condition) -> None:
+        # the event loop's own condition: waiting on `self.condition` would
+        # block the loop
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < self.concurrency)
+            self.in_flight += 1
+
+    async def release_async(
+        self, condition: asyncio.Condition, result: Optional[EnvRunResult] = None
+    ) -> None:
+        async with condition:
+            with self.condition:
+                self.in_flight -= 1
+                self._on_episode(result)
+            condition.notify_all()
+
+    def _on_episode(self, result: Optional[EnvRunResult]) -> None:
+        self.num_completed += 1
+        if result is None or "error" in result.info:
+            return
+        self.num_succeeded += 1
+        if time.monotonic() - self.last_congestion_at < self.cooldown:
+            return
+        if not self._latency_is_healthy():
+            return
+        self.limit = min(float(self.max_concurrency), self.limit + self.increase)
+
+    def _latency_is_healthy(self) -> bool:
+        if self.latency_ewma is None:
+            return True
+        return self.latency_ewma <= self.latency_tolerance * self.baseline_latency
+
+    def observe_call(self, latency: float, error: Optional[BaseException]) -> None:
+        """Record one LLM call; registered with `tau_bench.rate_limit.add_call_observer`."""
+        with self.condition:
+            if isinstance(error, CONGESTION_ERRORS):
+                self.num_congestion_errors += 1
+                now = time.monotonic()
+                self.last_congestion_at = now
+                if now - self.last_backoff_at >= self.cooldown:
+                    self.limit = max(float(self.min_concurrency), self.limit * self.backoff)
+                    self.last_backoff_at = now
+                return
+            if error is not None:
+                return
+            if self.latency_ewma is None:
+                self.latency_ewma = self.baseline_latency = latency
+                return
+            self.latency_ewma = 0.9 * self.latency_ewma + 0.1 * latency
+            self.baseline_latency = 0.99 * self.baseline_latency + 0.01 * latency
+
+    def goodput(self) -> float:
+        """Episodes completed without an error, per minute."""
+        elapsed = time.monotonic() - self.started_at
+        return self.num_succeeded * 60.0 / elapsed if elapsed > 0 else 0.0
+
+    def status(self) -> str:
+        return (
+            f"concurrency={self.concurrency} in_flight={self.in_flight} "
+            f"goodput={self.goodput():.2f}/min congestion_errors={self.num_congestion_errors}"
+        )
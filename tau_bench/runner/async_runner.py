@@ -0,0 +1,62 @@
+# Copyright Sierra
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, List, Optional
+
+from tau_bench.types import EnvRunResult
+from tau_bench.runner.adaptive import AdaptiveConcurrency
+from tau_bench.runner.scheduler import WorkItem
+
+
+async def run_work_queue_async(
+    work: List[WorkItem],
+    run_item: Callable[[WorkItem], Awaitable[EnvRunResult]],
+    max_concurrency: int,
+    on_result: Optional[Callable[[EnvRunResult], None]] = None,
+    max_threads: Optional[int] = None,
+    controller: Optional[AdaptiveConcurrency] = None,
+) -> List[EnvRunResult]:
+    """
+    Run every work item on the current event loop, with at most
+    `max_concurrency` episodes in flight.
+
+    Only the agent's model calls are coroutines. Episodes still hold a
+    thread while they run synchronous code (env steps, so tool calls and
+    their supervisors, and reward computation) via `asyncio.to_thread`; the
+    loop's default executor is sized by `max_threads` so that it does not
+    become the bottleneck at high concurrency. The progress line reports
+    how many threads the process is running.
+
+    With a `controller`, the number of episodes in flight follows its
+    adaptive limit instead, with `max_concurrency` as the ceiling.
+    """
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(
+        ThreadPoolExecutor(max_workers=max_threads or max_concurrency)
+    )
+    semaphore = asyncio.Semaphore(max_concurrency)
+    condition = asyncio.Condition()
+    num_done = 0
+
+    async def _run(item: WorkItem) -> EnvRunResult:
+        nonlocal num_done
+        if controller is None:
+            async with semaphore:
+                result = await run_item(item)
+        else:
+            await controller.acquire_async(condition)
+            result = None
+            try:
+                result = await run_item(item)
+            finally:
+                await controller.release_async(condition, result)
+        num_done += 1
+        status = "" if controller is None else f" {controller.status()}"
+        print(f"[{num_done}/{len(work)}] threads={threading.active_count()}{status}")
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    return list(await asyncio.gather(*(_run(item) for item in work)))
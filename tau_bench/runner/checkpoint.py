@@ -0,0 +1,185 @@
+# Copyright Sierra
+
+import os
+import gzip
+import json
+import zlib
+import threading
+from pydantic import BaseModel
+from typing import IO, Dict, Iterable, Iterator, List, Set, Tuple
+
+from tau_bench.types import EnvRunResult
+
+
+class CheckpointKey(BaseModel):
+    task_id: int
+    trial: int
+
+
+def is_compressed(path: str) -> bool:
+    return path.endswith(".gz")
+
+
+def _ends_mid_line(path: str) -> bool:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return False
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def _complete_gzip_length(path: str, chunk_size: int = 1 << 16) -> int:
+    """The length of the leading run of complete gzip members in `path`."""
+    end = 0
+    offset = 0
+    decompressor = None
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return end
+            while chunk:
+                if decompressor is None:
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                try:
+                    decompressor.decompress(chunk)
+                except zlib.error:
+                    return end
+                if not decompressor.eof:
+                    offset += len(chunk)
+                    break
+                offset += len(chunk) - len(decompressor.unused_data)
+                end = offset
+                chunk = decompressor.unused_data
+                decompressor = None
+
+
+def open_checkpoint(path: str, mode: str) -> IO[str]:
+    if is_compressed(path):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class CheckpointWriter(object):
+    """
+    Append-only JSONL sink for episode results.
+
+    Each result is written as a single line, so the cost of checkpointing an
+    episode does not depend on how many episodes came before it. Writes are
+    flushed and fsynced every `fsync_every` results and on `close()`. Paths
+    ending in `.gz` are gzip-compressed; every reopen appends a new gzip
+    member, which `iter_checkpoint` reads transparently, after cutting off a
+    member left torn by a crashed run.
+    """
+
+    def __init__(self, path: str, fsync_every: int = 16) -> None:
+        self.path = path
+        self.fsync_every = max(1, fsync_every)
+        self.lock = threading.Lock()
+        self.num_unsynced = 0
+        self.num_written = 0
+        if not is_compressed(path) and _ends_mid_line(path):
+            # terminate a line left half-written by a crashed run so the next
+            # record starts on its own line
+            with open(path, "a") as f:
+                f.write("\n")
+        if is_compressed(path) and os.path.exists(path):
+            # a member torn by a crashed run would hide every member after it
+            length = _complete_gzip_length(path)
+            if length < os.path.getsize(path):
+                os.truncate(path, length)
+        self.file = open_checkpoint(path, "a")
+
+    def write(self, result: EnvRunResult) -> None:
+        line = result.model_dump_json() + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.num_written += 1
+            self.num_unsynced += 1
+            if self.num_unsynced >= self.fsync_every:
+                self._sync()
+
+    def _sync(self) -> None:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.num_unsynced = 0
+
+    def close(self) -> None:
+        with self.lock:
+            if self.file.closed:
+                return
+            self._sync()
+            self.file.close()
+
+    def __enter__(self) -> "CheckpointWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def iter_checkpoint(path: str) -> Iterator[EnvRunResult]:
+    """
+    Stream results back from a checkpoint written by `CheckpointWriter`.
+
+    A run that was killed mid-write can leave a truncated final line (or a
+    truncated gzip member); that trailing record is skipped.
+    """
+    with open_checkpoint(path, "r") as f:
+        try:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield EnvRunResult.model_validate_json(line)
+                except ValueError:
+                    # a line cut short by a crashed run
+                    continue
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            return
+
+
+def load_checkpoint(path: str) -> List[EnvRunResult]:
+    if path.endswith(".json"):
+        # legacy checkpoints: a single JSON array of results
+        with open(path, "r") as f:
+            return [EnvRunResult.model_validate(r) for r in json.load(f)]
+    return list(iter_checkpoint(path))
+
+
+def index_checkpoint(path: str) -> Set[Tuple[int, int]]:
+    """
+    Return the `(task_id, trial)` pairs already recorded in a checkpoint.
+
+    Lines are validated against `CheckpointKey` only, so trajectories are
+    never materialized and the checkpoint is never held in memory.
+    """
+    if path.endswith(".json"):
+        return {(r.task_id, r.trial) for r in load_checkpoint(path)}
+    index: Set[Tuple[int, int]] = set()
+    with open_checkpoint(path, "r") as f:
+        try:
+            for line in f:
+                if not line.endswith("\n") or not line.strip():
+                    continue
+                try:
+                    key = CheckpointKey.model_validate_json(line)
+                except ValueError:
+                    continue
+                index.add((key.task_id, key.trial))
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            pass
+    return index
+
+
+def merge_results(*groups: Iterable[EnvRunResult]) -> List[EnvRunResult]:
+    """Concatenate result groups, keeping the last result for each `(task_id, trial)`."""
+    merged: Dict[Tuple[int, int], EnvRunResult] = {}
+    for group in groups:
+        for result in group:
+            merged.pop((result.task_id, result.trial), None)
+            merged[(result.task_id, result.trial)] = result
+    return list(merged.values())
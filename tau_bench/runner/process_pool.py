@@ -0,0 +1,129 @@
+# Copyright Sierra
+
+import queue
+import traceback
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from tau_bench.types import EnvRunResult
+from tau_bench.runner.scheduler import WorkItem
+
+# builds the per-worker episode runner; called once in each worker process
+EpisodeRunnerFactory = Callable[[], Callable[[WorkItem], EnvRunResult]]
+
+_DONE = "done"
+_RESULT = "result"
+_FAILED = "failed"
+
+
+def shard_work(work: List[WorkItem], num_shards: int) -> List[List[WorkItem]]:
+    # round-robin keeps each shard's share of long episodes even when the
+    # queue is ordered longest-first
+    return [work[k::num_shards] for k in range(num_shards)]
+
+
+def _worker_main(
+    worker_id: int,
+    shard: List[WorkItem],
+    make_runner: EpisodeRunnerFactory,
+    num_threads: int,
+    results_queue: multiprocessing.Queue,
+) -> None:
+    try:
+        run_item = make_runner()
+    except Exception:
+        # only a worker that cannot be set up fails as a whole
+        results_queue.put((_FAILED, worker_id, traceback.format_exc()))
+        return
+
+    def _run(item: WorkItem) -> None:
+        trial, idx = item
+        try:
+            result = run_item(item)
+        except Exception as e:
+            # like a failed episode on the thread runner: the shard goes on
+            result = EnvRunResult(
+                task_id=idx,
+                reward=0.0,
+                info={"error": str(e), "traceback": traceback.format_exc()},
+                traj=[],
+                trial=trial,
+            )
+        # JSON is much cheaper to pickle across the pipe than the model
+        results_queue.put((_RESULT, worker_id, result.model_dump_json()))
+
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        list(executor.map(_run, shard))
+    results_queue.put((_DONE, worker_id, None))
+
+
+def run_work_queue_sharded(
+    work: List[WorkItem],
+    make_runner: EpisodeRunnerFactory,
+    num_workers: int,
+    threads_per_worker: int = 1,
+    on_result: Optional[Callable[[EnvRunResult], None]] = None,
+    poll_interval: float = 5.0,
+) -> List[EnvRunResult]:
+    """
+    Shard the work items across `num_workers` processes.
+
+    Every worker calls `make_runner()` once to build its environment, tool
+    registry and agent, then runs its shard on `threads_per_worker` threads.
+    Results are streamed back to this process as they finish and handed to
+    `on_result` (e.g. the checkpoint writer), so only the parent touches the
+    checkpoint.
+    """
+    ctx = multiprocessing.get_context()
+    results_queue = ctx.Queue()
+    shards = [shard for shard in shard_work(work, num_workers) if len(shard) > 0]
+    workers = [
+        ctx.Process(
+            target=_worker_main,
+            args=(worker_id, shard, make_runner, threads_per_worker, results_queue),
+            daemon=True,
+        )
+        for worker_id, shard in enumerate(shards)
+    ]
+    for worker in workers:
+        worker.start()
+
+    results: List[EnvRunResult] = []
+    running = set(range(len(workers)))
+
+    def _handle(kind: str, worker_id: int, payload: Optional[str]) -> None:
+        if kind == _RESULT:
+            result = EnvRunResult.model_validate_json(payload)
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+            print(
+                f"[{len(results)}/{len(work)}] worker={worker_id}",
+                f"task_id={result.task_id} trial={result.trial} reward={result.reward}",
+            )
+            return
+        if kind == _FAILED:
+            print(f"Worker {worker_id} failed:\n{payload}")
+        running.discard(worker_id)
+
+    while running:
+        try:
+            _handle(*results_queue.get(timeout=poll_interval))
+        except queue.Empty:
+            for worker_id in list(running):
+                if not workers[worker_id].is_alive():
+                    print(
+                        f"Worker {worker_id} exited with code {workers[worker_id].exitcode}"
+                    )
+                    running.discard(worker_id)
+    # anything a crashed worker flushed before dying
+    while True:
+        try:
+            _handle(*results_queue.get_nowait())
+        except queue.Empty:
+            break
+
+    for worker in workers:
+        worker.join()
+    return results
@@ -0,0 +1,50 @@
+# Copyright Sierra
+
+import random
+from typing import Iterable, List, Optional, Set, Tuple
+
+from tau_bench.types import Task
+
+# (trial, task_id)
+WorkItem = Tuple[int, int]
+
+SCHEDULE_ORDERS = ["fifo", "longest-first"]
+
+
+def expected_episode_cost(task: Task) -> float:
+    # every ground-truth action is at least one agent turn (plus its supervision
+    # and user replies), so it is the best cheap proxy for episode length
+    return len(task.actions) + len(task.outputs) + len(task.instruction) / 1000
+
+
+def build_work_queue(
+    task_ids: Iterable[int],
+    num_trials: int,
+    tasks: List[Task],
+    completed: Optional[Set[Tuple[int, int]]] = None,
+    shuffle: bool = False,
+    order: str = "fifo",
+) -> List[WorkItem]:
+    """
+    Flatten trials x tasks into a single list of `(trial, task_id)` pairs.
+
+    Pairs already present in `completed` (keyed `(task_id, trial)`, as in a
+    checkpoint index) are skipped. With `order="longest-first"` the pairs are
+    sorted by `expected_episode_cost` so the slowest episodes start first and
+    the tail of the run is made of short ones.
+    """
+    if order not in SCHEDULE_ORDERS:
+        raise ValueError(f"Unknown schedule order: {order}")
+    work: List[WorkItem] = []
+    for trial in range(num_trials):
+        idxs = [
+            idx
+            for idx in task_ids
+            if completed is None or (idx, trial) not in completed
+        ]
+        if shuffle:
+            random.shuffle(idxs)
+        work.extend((trial, idx) for idx in idxs)
+    if order == "longest-first":
+        work.sort(key=lambda item: expected_episode_cost(tasks[item[1]]), reverse=True)
+    return work
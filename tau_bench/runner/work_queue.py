@@ -0,0 +1,222 @@
+# Copyright Sierra
+
+import os
+import glob
+import time
+import sqlite3
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from tau_bench.types import EnvRunResult
+from tau_bench.runner.checkpoint import CheckpointWriter, iter_checkpoint, merge_results
+from tau_bench.runner.scheduler import WorkItem
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def shard_path(queue_path: str, worker_id: str) -> str:
+    return f"{os.path.splitext(queue_path)[0]}.shard-{worker_id}.ckpt.jsonl"
+
+
+def shard_paths(queue_path: str) -> List[str]:
+    return sorted(glob.glob(f"{glob.escape(os.path.splitext(queue_path)[0])}.shard-*.ckpt.jsonl"))
+
+
+def merge_shards(queue_path: str) -> List[EnvRunResult]:
+    return merge_results(*(iter_checkpoint(path) for path in shard_paths(queue_path)))
+
+
+class WorkQueue(object):
+    """
+    A queue of `(trial, task_id)` pairs in a SQLite file that several
+    processes, possibly on different machines sharing a filesystem, can
+    drain together.
+
+    Workers claim one pair at a time under a lease of `lease_seconds`, which
+    they keep alive with `heartbeat`. A lease that is not renewed in time
+    (the worker died) is handed to the next worker that calls `claim`.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 600.0) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS episodes (
+                    task_id INTEGER NOT NULL,
+                    trial INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    worker_id TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (task_id, trial)
+                )
+                """
+            )
+
+    def _connect(self) -> "_Transaction":
+        # rollback journal rather than WAL: WAL needs shared memory, which
+        # network filesystems do not provide
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout = 60000")
+        return _Transaction(conn)
+
+    def enqueue(self, work: Iterable[WorkItem]) -> int:
+        """Add pairs in order; pairs already in the queue keep their state."""
+        with self._connect() as conn:
+            (offset,) = conn.execute("SELECT COUNT(*) FROM episodes").fetchone()
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO episodes (task_id, trial, position, status) VALUES (?, ?, ?, ?)",
+                [
+                    (idx, trial, offset + position, PENDING)
+                    for position, (trial, idx) in enumerate(work)
+                ],
+            )
+            return cursor.rowcount
+
+    def claim(self, worker_id: str) -> Optional[WorkItem]:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE episodes SET status = ?, worker_id = NULL WHERE status = ? AND lease_expires < ?",
+                (PENDING, LEASED, now),
+            )
+            row = conn.execute(
+                "SELECT task_id, trial FROM episodes WHERE status = ? ORDER BY position LIMIT 1",
+                (PENDING,),
+            ).fetchone()
+            if row is None:
+                return None
+            idx, trial = row
+            conn.execute(
+                "UPDATE episodes SET status = ?, worker_id = ?, lease_expires = ?, attempts = attempts + 1 WHERE task_id = ? AND trial = ?",
+                (LEASED, worker_id, now + self.lease_seconds, idx, trial),
+            )
+            return (trial, idx)
+
+    def heartbeat(self, worker_id: str) -> None:
+        """Renew every lease held by `worker_id`."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE episodes SET lease_expires = ? WHERE status = ? AND worker_id = ?",
+                (time.time() + self.lease_seconds, LEASED, worker_id),
+            )
+
+    def complete(self, worker_id: str, item: WorkItem) -> bool:
+        """
+        Mark a pair done. Returns False, and leaves the pair alone, if
+        `worker_id` no longer holds a live lease on it: the lease expired and
+        the pair was (or will be) handed to another worker.
+        """
+        trial, idx = item
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE episodes SET status = ?, lease_expires = NULL WHERE task_id = ? AND trial = ? AND status = ? AND worker_id = ? AND lease_expires > ?",
+                (DONE, idx, trial, LEASED, worker_id, time.time()),
+            )
+            return cursor.rowcount == 1
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) FROM episodes GROUP BY status"
+            ).fetchall()
+        counts = {PENDING: 0, LEASED: 0, DONE: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def is_finished(self) -> bool:
+        counts = self.counts()
+        return counts[PENDING] == 0 and counts[LEASED] == 0
+
+
+class _Transaction(object):
+    """Runs the body of a `with` block as one `BEGIN IMMEDIATE` transaction."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, *exc) -> None:
+        try:
+            self.conn.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+        finally:
+            self.conn.close()
+
+
+def run_queue_worker(
+    work_queue: WorkQueue,
+    worker_id: str,
+    run_item: Callable[[WorkItem], EnvRunResult],
+    ckpt_writer: CheckpointWriter,
+    num_threads: int = 1,
+    poll_interval: float = 10.0,
+) -> List[EnvRunResult]:
+    """
+    Claim and run pairs from the queue on `num_threads` threads until the
+    queue is drained, writing results to this worker's shard.
+
+    Threads with nothing to claim keep polling while other workers still
+    hold leases, since those leases may expire and come back to the queue.
+    """
+    stop = threading.Event()
+    results: List[EnvRunResult] = []
+
+    def _heartbeat() -> None:
+        while not stop.wait(work_queue.lease_seconds / 3):
+            work_queue.heartbeat(worker_id)
+
+    def _drain() -> None:
+        while True:
+            item = work_queue.claim(worker_id)
+            if item is None:
+                if work_queue.is_finished():
+                    return
+                time.sleep(poll_interval)
+                continue
+            result = run_item(item)
+            # the shard is written before the lease is released, so a
+            # completed pair is never lost
+            ckpt_writer.write(result)
+            if not work_queue.complete(worker_id, item):
+                # another worker owns the pair now and will write it to its
+                # own shard; `merge_shards` keeps one result per pair
+                trial, idx = item
+                print(f"Lease on task_id={idx} trial={trial} was lost; not counting its result")
+                continue
+            results.append(result)
+
+    heartbeat = threading.Thread(target=_heartbeat, daemon=True)
+    heartbeat.start()
+    try:
+        with ThreadPoolExecutor(max_workers=num_threads) as executor:
+            for future in [executor.submit(_drain) for _ in range(num_threads)]:
+                future.result()
+    finally:
+        stop.set()
+    return results
+
+
+def wait_for_queue(work_queue: WorkQueue, poll_interval: float = 30.0) -> None:
+    while True:
+        counts = work_queue.counts()
+        print(
+            f"Queue {work_queue.path}: {counts[DONE]} done, "
+            f"{counts[LEASED]} running, {counts[PENDING]} pending"
+        )
+        if counts[PENDING] == 0 and counts[LEASED] == 0:
+            return
+        time.sleep(poll_interval)
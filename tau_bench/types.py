@@ -47,6 +47,8 @@ class EnvInfo(BaseModel):
     source: Optional[str] = None
     user_cost: Optional[float] = None
     reward_info: Optional[RewardResult] = None
+    # hits and misses of the episode's memoized read-only tool results
+    tool_cache: Optional[Dict[str, int]] = None
 
 
 class EnvResponse(BaseModel):
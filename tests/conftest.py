@@ -0,0 +1,9 @@
+# Copyright Sierra
+
+import os
+
+# entropy_labs builds an OpenAI client when it is imported, and litellm
+# fetches its model cost map unless told to use the bundled one; neither
+# sends a request during the tests
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
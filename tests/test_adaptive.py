@@ -0,0 +1,116 @@
+# Copyright Sierra
+
+import pytest
+
+from tau_bench.runner import adaptive
+from tau_bench.runner.adaptive import AdaptiveConcurrency
+from tau_bench.types import EnvRunResult
+
+
+class Clock(object):
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(adaptive.time, "monotonic", clock)
+    return clock
+
+
+def result(error: bool = False) -> EnvRunResult:
+    return EnvRunResult(
+        task_id=0, reward=1.0, info={"error": "boom"} if error else {}, traj=[], trial=0
+    )
+
+
+def finish_episode(controller: AdaptiveConcurrency, error: bool = False) -> None:
+    controller.acquire()
+    controller.release(result(error))
+
+
+def test_additive_increase_up_to_max(clock):
+    controller = AdaptiveConcurrency(max_concurrency=4, initial_concurrency=2)
+    finish_episode(controller)
+    assert controller.concurrency == 3
+    for _ in range(5):
+        finish_episode(controller)
+    assert controller.concurrency == 4
+
+
+def test_failed_episodes_do_not_increase(clock):
+    controller = AdaptiveConcurrency(max_concurrency=4, initial_concurrency=2)
+    finish_episode(controller, error=True)
+    controller.acquire()
+    controller.release(None)
+    assert controller.concurrency == 2
+    assert controller.num_completed == 2
+    assert controller.num_succeeded == 0
+
+
+def test_multiplicative_decrease_once_per_cooldown(clock):
+    controller = AdaptiveConcurrency(max_concurrency=16, initial_concurrency=16, cooldown=30)
+    controller.observe_call(1.0, TimeoutError())
+    assert controller.concurrency == 8
+    # the rest of the same burst does not back off again
+    clock.now += 10
+    controller.observe_call(1.0, TimeoutError())
+    assert controller.concurrency == 8
+    assert controller.num_congestion_errors == 2
+    clock.now += 30
+    controller.observe_call(1.0, TimeoutError())
+    assert controller.concurrency == 4
+
+
+def test_no_increase_during_cooldown(clock):
+    controller = AdaptiveConcurrency(max_concurrency=16, initial_concurrency=8, cooldown=30)
+    controller.observe_call(1.0, TimeoutError())
+    finish_episode(controller)
+    assert controller.concurrency == 4
+    clock.now += 31
+    finish_episode(controller)
+    assert controller.concurrency == 5
+
+
+def test_decrease_stops_at_min(clock):
+    controller = AdaptiveConcurrency(
+        max_concurrency=16, min_concurrency=3, initial_concurrency=4, cooldown=0
+    )
+    for _ in range(5):
+        controller.observe_call(1.0, TimeoutError())
+    assert controller.concurrency == 3
+
+
+def test_other_errors_are_ignored(clock):
+    controller = AdaptiveConcurrency(max_concurrency=16, initial_concurrency=8)
+    controller.observe_call(1.0, ValueError("bad request"))
+    assert controller.concurrency == 8
+    assert controller.latency_ewma is None
+
+
+def test_slow_calls_hold_the_limit(clock):
+    controller = AdaptiveConcurrency(
+        max_concurrency=16, initial_concurrency=8, latency_tolerance=2.0
+    )
+    controller.observe_call(1.0, None)
+    for _ in range(30):
+        controller.observe_call(10.0, None)
+    finish_episode(controller)
+    assert controller.concurrency == 8
+    for _ in range(100):
+        controller.observe_call(1.0, None)
+    finish_episode(controller)
+    assert controller.concurrency == 9
+
+
+def test_acquire_respects_the_limit(clock):
+    controller = AdaptiveConcurrency(max_concurrency=2, initial_concurrency=1)
+    controller.acquire()
+    assert controller.in_flight == 1
+    assert controller.in_flight >= controller.concurrency
+    controller.release(result())
+    assert controller.in_flight == 0
@@ -0,0 +1,80 @@
+# Copyright Sierra
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from tau_bench.agents import chat_react_agent
+from tau_bench.agents.chat_react_agent import ChatReActAgent
+from tau_bench.types import RESPOND_ACTION_NAME, EnvInfo, EnvResetResponse, EnvResponse, Task
+
+
+class Message(object):
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+    def model_dump(self):
+        return {"role": "assistant", "content": self.content}
+
+
+def response(content: str):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=Message(content))], _hidden_params={"response_cost": 0.5}
+    )
+
+
+REPLIES = [
+    "Thought:\nlook the user up\nAction:\n" + json.dumps({"name": "get_user", "arguments": {"id": "u"}}),
+    # not JSON, so it is sent to the user as it is
+    "Thought:\nanswer\nAction:\ndone",
+]
+
+
+class StubEnv(object):
+    def __init__(self) -> None:
+        self.actions = []
+        self.info = EnvInfo(task=Task(user_id="u", actions=[], instruction="", outputs=[]))
+
+    def reset(self, task_index=None):
+        return EnvResetResponse(observation="hello", info=self.info)
+
+    def step(self, action):
+        self.actions.append(action)
+        done = len(self.actions) == 2
+        return EnvResponse(observation=f"obs {len(self.actions)}", reward=float(done), done=done, info=self.info)
+
+    async def reset_async(self, task_index=None):
+        return self.reset(task_index)
+
+    async def step_async(self, action):
+        return self.step(action)
+
+
+@pytest.fixture
+def stub_model(monkeypatch):
+    replies = {"sync": iter(REPLIES), "async": iter(REPLIES)}
+
+    def completion(**kwargs):
+        return response(next(replies["sync"]))
+
+    async def acompletion(**kwargs):
+        return response(next(replies["async"]))
+
+    monkeypatch.setattr(chat_react_agent, "completion", completion)
+    monkeypatch.setattr(chat_react_agent, "acompletion", acompletion)
+
+
+def test_solve_and_solve_async_agree(stub_model):
+    agent = ChatReActAgent(tools_info=[], wiki="wiki", model="m", provider="p")
+    env, async_env = StubEnv(), StubEnv()
+    result = agent.solve(env)
+    async_result = asyncio.run(agent.solve_async(async_env))
+    assert result == async_result
+    assert env.actions == async_env.actions
+    assert [action.name for action in env.actions] == ["get_user", RESPOND_ACTION_NAME]
+    assert result.reward == 1.0
+    assert [m["role"] for m in result.messages] == ["system", "user", "assistant", "user", "assistant", "user"]
+    assert result.messages[3]["content"] == "API output: obs 1"
+    assert result.messages[5]["content"] == "obs 2"
@@ -0,0 +1,139 @@
+# Copyright Sierra
+
+import gzip
+import json
+
+from tau_bench.runner.checkpoint import (
+    CheckpointWriter,
+    index_checkpoint,
+    iter_checkpoint,
+    load_checkpoint,
+    merge_results,
+)
+from tau_bench.types import EnvRunResult
+
+
+def make_result(task_id: int, trial: int = 0, reward: float = 1.0) -> EnvRunResult:
+    return EnvRunResult(
+        task_id=task_id,
+        reward=reward,
+        info={"note": "x" * 50},
+        traj=[{"role": "user", "content": "hi"}],
+        trial=trial,
+    )
+
+
+def write_results(path: str, results) -> None:
+    with CheckpointWriter(path, fsync_every=2) as writer:
+        for result in results:
+            writer.write(result)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "run.ckpt.jsonl")
+    results = [make_result(idx, trial) for trial in range(2) for idx in range(3)]
+    write_results(path, results)
+    assert load_checkpoint(path) == results
+    assert index_checkpoint(path) == {(r.task_id, r.trial) for r in results}
+
+
+def test_round_trip_compressed_across_reopens(tmp_path):
+    path = str(tmp_path / "run.ckpt.jsonl.gz")
+    write_results(path, [make_result(0), make_result(1)])
+    # a resumed run appends a second gzip member
+    write_results(path, [make_result(2)])
+    assert [r.task_id for r in iter_checkpoint(path)] == [0, 1, 2]
+    assert index_checkpoint(path) == {(0, 0), (1, 0), (2, 0)}
+
+
+def test_truncated_final_record_is_skipped(tmp_path):
+    path = tmp_path / "run.ckpt.jsonl"
+    write_results(str(path), [make_result(0), make_result(1)])
+    line = make_result(2).model_dump_json()
+    with open(path, "a") as f:
+        f.write(line[: len(line) // 2])
+    assert [r.task_id for r in iter_checkpoint(str(path))] == [0, 1]
+    assert index_checkpoint(str(path)) == {(0, 0), (1, 0)}
+
+
+def test_writer_terminates_half_written_line(tmp_path):
+    path = tmp_path / "run.ckpt.jsonl"
+    write_results(str(path), [make_result(0)])
+    with open(path, "a") as f:
+        f.write('{"task_id": 1, "rew')
+    write_results(str(path), [make_result(2)])
+    # the torn record is dropped, the record written after it is intact
+    assert [r.task_id for r in iter_checkpoint(str(path))] == [0, 2]
+
+
+def test_truncated_gzip_member_is_skipped(tmp_path):
+    path = tmp_path / "run.ckpt.jsonl.gz"
+    write_results(str(path), [make_result(0), make_result(1)])
+    complete = path.read_bytes()
+    write_results(str(path), [make_result(2)])
+    data = path.read_bytes()
+    path.write_bytes(data[: len(complete) + (len(data) - len(complete)) // 2])
+    assert [r.task_id for r in iter_checkpoint(str(path))] == [0, 1]
+    assert index_checkpoint(str(path)) == {(0, 0), (1, 0)}
+
+
+def test_corrupt_line_in_the_middle_is_skipped(tmp_path):
+    path = tmp_path / "run.ckpt.jsonl"
+    with open(path, "w") as f:
+        f.write(make_result(0).model_dump_json() + "\n")
+        f.write("not json\n")
+        f.write(make_result(1).model_dump_json() + "\n")
+    assert [r.task_id for r in iter_checkpoint(str(path))] == [0, 1]
+    assert index_checkpoint(str(path)) == {(0, 0), (1, 0)}
+
+
+def test_legacy_json_checkpoint(tmp_path):
+    path = tmp_path / "results.json"
+    results = [make_result(0), make_result(1, trial=1)]
+    path.write_text(json.dumps([r.model_dump() for r in results]))
+    assert load_checkpoint(str(path)) == results
+    assert index_checkpoint(str(path)) == {(0, 0), (1, 1)}
+
+
+def test_merge_keeps_last_result_per_pair():
+    first = [make_result(0, reward=0.0), make_result(1, reward=0.0)]
+    second = [make_result(0, reward=1.0), make_result(0, trial=1)]
+    merged = merge_results(first, second)
+    assert {(r.task_id, r.trial): r.reward for r in merged} == {
+        (0, 0): 1.0,
+        (1, 0): 0.0,
+        (0, 1): 1.0,
+    }
+    assert len(merged) == 3
+
+
+def test_gzip_checkpoint_is_compressed(tmp_path):
+    path = tmp_path / "run.ckpt.jsonl.gz"
+    write_results(str(path), [make_result(0)])
+    with gzip.open(path, "rt") as f:
+        assert json.loads(f.readline())["task_id"] == 0
+
+
+def test_resume_after_torn_gzip_member(tmp_path):
+    path = tmp_path / "run.ckpt.jsonl.gz"
+    write_results(str(path), [make_result(0), make_result(1)])
+    complete = path.read_bytes()
+    write_results(str(path), [make_result(2)])
+    data = path.read_bytes()
+    path.write_bytes(data[: len(complete) + (len(data) - len(complete)) // 2])
+    # the resumed run drops the torn member instead of appending after it
+    write_results(str(path), [make_result(3)])
+    assert [r.task_id for r in iter_checkpoint(str(path))] == [0, 1, 3]
+    assert index_checkpoint(str(path)) == {(0, 0), (1, 0), (3, 0)}
+
+
+def test_reader_stops_at_torn_gzip_member(tmp_path):
+    path = tmp_path / "run.ckpt.jsonl.gz"
+    write_results(str(path), [make_result(0)])
+    complete = path.read_bytes()
+    write_results(str(path), [make_result(1)])
+    data = path.read_bytes()
+    torn = data[: len(complete) + (len(data) - len(complete)) // 2]
+    path.write_bytes(torn + gzip.compress((make_result(2).model_dump_json() + "\n").encode()))
+    assert [r.task_id for r in iter_checkpoint(str(path))] == [0]
+    assert index_checkpoint(str(path)) == {(0, 0)}
@@ -0,0 +1,58 @@
+# Copyright Sierra
+
+from typing import Any, Dict
+
+import pytest
+
+from tau_bench.envs.airline.data import load_data as load_airline_data
+from tau_bench.envs.airline.env import TERMINATE_TOOLS as AIRLINE_TERMINATE_TOOLS
+from tau_bench.envs.airline.tasks_test import TASKS as AIRLINE_TASKS_TEST
+from tau_bench.envs.airline.tools import ALL_TOOLS as AIRLINE_TOOLS
+from tau_bench.envs.gt_cache import replay_ground_truth
+from tau_bench.envs.retail.data import load_data as load_retail_data
+from tau_bench.envs.retail.env import TERMINATE_TOOLS as RETAIL_TERMINATE_TOOLS
+from tau_bench.envs.retail.tasks_dev import TASKS_DEV as RETAIL_TASKS_DEV
+from tau_bench.envs.retail.tasks_test import TASKS_TEST as RETAIL_TASKS_TEST
+from tau_bench.envs.retail.tasks_train import TASKS_TRAIN as RETAIL_TASKS_TRAIN
+from tau_bench.envs.retail.tools import ALL_TOOLS as RETAIL_TOOLS
+from tau_bench.envs.snapshot import copy_record, data_digest, load_snapshot
+
+DOMAINS = {
+    "retail": (
+        load_retail_data,
+        RETAIL_TOOLS,
+        RETAIL_TERMINATE_TOOLS,
+        RETAIL_TASKS_TEST + RETAIL_TASKS_TRAIN + RETAIL_TASKS_DEV,
+    ),
+    "airline": (
+        load_airline_data,
+        AIRLINE_TOOLS,
+        AIRLINE_TERMINATE_TOOLS,
+        AIRLINE_TASKS_TEST,
+    ),
+}
+
+
+def replay_on_plain_data(data_load_func, tools, terminate_tools, task) -> Dict[str, Any]:
+    """The ground-truth replay as it was done before `EpisodeData`: on a full copy."""
+    tools_map = {tool.get_info()["function"]["name"]: tool._raw_invoke for tool in tools}
+    data = copy_record(load_snapshot(data_load_func))
+    for action in task.actions:
+        if action.name in terminate_tools or action.name not in tools_map:
+            continue
+        try:
+            tools_map[action.name](data=data, **action.kwargs)
+        except Exception:
+            pass
+    return data
+
+
+@pytest.mark.parametrize("domain", sorted(DOMAINS))
+def test_replay_matches_plain_data(domain):
+    data_load_func, tools, terminate_tools, tasks = DOMAINS[domain]
+    mismatches = []
+    for idx, task in enumerate(tasks):
+        expected = data_digest(replay_on_plain_data(data_load_func, tools, terminate_tools, task))
+        if replay_ground_truth(data_load_func, tools, terminate_tools, task) != expected:
+            mismatches.append(idx)
+    assert mismatches == []
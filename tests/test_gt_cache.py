@@ -0,0 +1,82 @@
+# Copyright Sierra
+
+import os
+
+import pytest
+
+from tau_bench.envs.gt_cache import (
+    CACHE_DIR_ENV_VAR,
+    GroundTruthHashCache,
+    _module_dependencies,
+    replay_ground_truth,
+    task_key,
+    tools_fingerprint,
+)
+from tau_bench.envs.airline.tools import ALL_TOOLS as AIRLINE_TOOLS
+from tau_bench.envs.retail.data import load_data
+from tau_bench.envs.retail.env import TERMINATE_TOOLS
+from tau_bench.envs.retail.tasks_test import TASKS_TEST
+from tau_bench.envs.retail.tools import ALL_TOOLS
+from tau_bench.types import Action, Task
+
+TASK = TASKS_TEST[0]
+
+
+@pytest.fixture(autouse=True)
+def no_cache_dir(monkeypatch):
+    monkeypatch.delenv(CACHE_DIR_ENV_VAR, raising=False)
+
+
+def test_task_key_only_depends_on_actions():
+    same_actions = Task(user_id="other", actions=TASK.actions, instruction="", outputs=[])
+    other_actions = Task(user_id=TASK.user_id, actions=[Action(name="think", kwargs={})], instruction="", outputs=[])
+    assert task_key(same_actions) == task_key(TASK)
+    assert task_key(other_actions) != task_key(TASK)
+
+
+def test_tools_fingerprint_covers_the_tool_set():
+    assert tools_fingerprint(ALL_TOOLS) == tools_fingerprint(list(reversed(ALL_TOOLS)))
+    assert tools_fingerprint(ALL_TOOLS[:-1]) != tools_fingerprint(ALL_TOOLS)
+
+
+def test_tools_fingerprint_covers_the_helpers_of_the_tools():
+    modules = _module_dependencies([tool.__module__ for tool in AIRLINE_TOOLS])
+    assert {"tau_bench.envs.airline.routes", "tau_bench.envs.snapshot", "tau_bench.envs.tool"} <= set(modules)
+    assert all(module.startswith("tau_bench.") for module in modules)
+
+
+def test_cache_is_in_memory_by_default(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    cache = GroundTruthHashCache.for_data(load_data, ALL_TOOLS)
+    assert cache.path is None
+    cache.put(TASK, "hash")
+    assert cache.get(TASK) == "hash"
+    assert GroundTruthHashCache.for_data(load_data, ALL_TOOLS) is cache
+    assert os.listdir(tmp_path) == []
+
+
+def test_cache_persists_under_a_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv(CACHE_DIR_ENV_VAR, str(tmp_path))
+    cache = GroundTruthHashCache.for_data(load_data, ALL_TOOLS)
+    assert os.path.dirname(cache.path) == str(tmp_path)
+    cache.put(TASK, "hash")
+    # a fresh process reads it back
+    assert GroundTruthHashCache(cache.path).get(TASK) == "hash"
+    # other tools means another cache
+    other = GroundTruthHashCache.for_data(load_data, ALL_TOOLS[:-1])
+    assert other.path != cache.path
+    assert other.get(TASK) is None
+
+
+def test_concurrent_writers_merge(tmp_path):
+    path = str(tmp_path / "gt_hashes.json")
+    first, second = GroundTruthHashCache(path), GroundTruthHashCache(path)
+    first.get(TASK)
+    second.update({"b": "2"})
+    first.update({"a": "1"})
+    assert GroundTruthHashCache(path)._read() == {"a": "1", "b": "2"}
+
+
+def test_replay_ground_truth_is_deterministic():
+    first = replay_ground_truth(load_data, ALL_TOOLS, TERMINATE_TOOLS, TASK)
+    assert replay_ground_truth(load_data, ALL_TOOLS, TERMINATE_TOOLS, TASK) == first
@@ -0,0 +1,41 @@
+# Copyright Sierra
+
+from tau_bench.envs.hashing import (
+    base_table_digest,
+    combine_digests,
+    consistent_hash,
+    table_digest,
+    to_hashable,
+)
+
+TABLE = {f"k{idx}": {"value": idx, "tags": ["a", "b"]} for idx in range(10)}
+
+
+def test_to_hashable_ignores_key_order():
+    assert to_hashable({"a": 1, "b": [1, {"c": 2, "d": 3}]}) == to_hashable(
+        {"b": [1, {"d": 3, "c": 2}], "a": 1}
+    )
+    assert consistent_hash(to_hashable({"a": 1})) != consistent_hash(to_hashable({"a": 2}))
+
+
+def test_table_digest_ignores_record_order():
+    reordered = dict(reversed(list(TABLE.items())))
+    assert table_digest(reordered) == table_digest(TABLE)
+
+
+def test_table_digest_depends_on_keys_and_values():
+    renamed = {("x" if key == "k0" else key): record for key, record in TABLE.items()}
+    changed = {**TABLE, "k0": {"value": -1, "tags": ["a", "b"]}}
+    assert table_digest(renamed) != table_digest(TABLE)
+    assert table_digest(changed) != table_digest(TABLE)
+    assert table_digest({k: v for k, v in TABLE.items() if k != "k0"}) != table_digest(TABLE)
+
+
+def test_base_digest_matches_table_digest():
+    assert base_table_digest(TABLE).total == table_digest(TABLE)
+    assert base_table_digest(TABLE) is base_table_digest(TABLE)
+
+
+def test_combine_digests_is_keyed_by_table():
+    assert combine_digests({"a": 1, "b": 2}) == combine_digests({"b": 2, "a": 1})
+    assert combine_digests({"a": 1, "b": 2}) != combine_digests({"a": 2, "b": 1})
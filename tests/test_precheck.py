@@ -0,0 +1,43 @@
+# Copyright Sierra
+
+from tau_bench.envs.precheck import missing_ids, read_precheck, schema_errors
+from tau_bench.envs.retail.tools.get_order_details import GetOrderDetails
+
+DATA = {"orders": {"#W1": {}}, "users": {"u1": {}}}
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "count": {"type": "integer"},
+        "ratio": {"type": "number"},
+        "kind": {"type": "string", "enum": ["a", "b"]},
+        "items": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["count"],
+}
+
+
+def test_schema_errors():
+    assert schema_errors(SCHEMA, {"count": 1, "ratio": 1, "kind": "a", "items": ["x"]}) is None
+    assert schema_errors(SCHEMA, {}) == "arguments.count is required"
+    assert schema_errors(SCHEMA, {"count": True}) == "arguments.count should be of type integer"
+    assert schema_errors(SCHEMA, {"count": 1.5}) == "arguments.count should be of type integer"
+    assert schema_errors(SCHEMA, {"count": 1, "kind": "c"}).startswith("arguments.kind should be one of")
+    assert schema_errors(SCHEMA, {"count": 1, "items": [1]}) == "arguments.items[0] should be of type string"
+    assert schema_errors(SCHEMA, {"count": 1, "extra": 1}) == "arguments.extra is not a parameter"
+
+
+def test_missing_ids():
+    assert missing_ids(DATA, {"order_id": "#W1", "user_id": "u1"}) is None
+    assert missing_ids(DATA, {"order_id": "#W2"}) == "order_id #W2 not found"
+    # tables the domain does not have are not checked
+    assert missing_ids(DATA, {"reservation_id": "R1"}) is None
+
+
+def test_read_precheck():
+    precheck = read_precheck(GetOrderDetails.get_info())
+    assert precheck((), {"data": DATA, "order_id": "#W1"})
+    assert not precheck((), {"data": DATA, "order_id": "#W2"})
+    assert not precheck((), {"data": DATA, "order_id": 1})
+    assert not precheck((), {"data": DATA})
+    assert not precheck((DATA,), {"order_id": "#W1"})
@@ -0,0 +1,48 @@
+# Copyright Sierra
+
+from tau_bench.runner.process_pool import run_work_queue_sharded, shard_work
+from tau_bench.types import EnvRunResult
+
+
+def run_item(item):
+    trial, idx = item
+    if idx == 1:
+        raise ValueError("episode blew up")
+    return EnvRunResult(task_id=idx, reward=1.0, info={}, traj=[], trial=trial)
+
+
+def make_runner():
+    return run_item
+
+
+def make_broken_runner():
+    raise RuntimeError("no env")
+
+
+WORK = [(trial, idx) for trial in range(2) for idx in range(3)]
+
+
+def test_shards_are_round_robin():
+    assert shard_work(WORK, 2) == [WORK[0::2], WORK[1::2]]
+
+
+def test_failed_episode_does_not_fail_the_shard():
+    seen = []
+    results = run_work_queue_sharded(
+        WORK, make_runner, num_workers=2, threads_per_worker=2, on_result=seen.append
+    )
+    assert sorted((r.trial, r.task_id) for r in results) == sorted(WORK)
+    assert len(seen) == len(WORK)
+    for result in results:
+        if result.task_id == 1:
+            assert result.reward == 0.0
+            assert result.info["error"] == "episode blew up"
+            assert "ValueError" in result.info["traceback"]
+        else:
+            assert result.reward == 1.0
+
+
+def test_worker_setup_failure(capsys):
+    results = run_work_queue_sharded(WORK, make_broken_runner, num_workers=2)
+    assert results == []
+    assert capsys.readouterr().out.count("failed:") == 2
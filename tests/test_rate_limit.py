@@ -0,0 +1,125 @@
+# Copyright Sierra
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from tau_bench import rate_limit
+from tau_bench.rate_limit import RateLimiter, TokenBucket, get_rate_limiter, set_rate_limit
+
+
+@pytest.fixture(autouse=True)
+def fresh_limits(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_limits", {})
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+
+
+def test_bucket_starts_full():
+    bucket = TokenBucket(60)
+    now = bucket.updated_at
+    for _ in range(60):
+        assert bucket.reserve(1, now) == 0.0
+    # one unit per second
+    assert bucket.reserve(1, now) == pytest.approx(1.0)
+    assert bucket.reserve(1, now) == pytest.approx(2.0)
+
+
+def test_bucket_refills_continuously():
+    bucket = TokenBucket(60)
+    now = bucket.updated_at
+    bucket.reserve(60, now)
+    assert bucket.reserve(10, now + 5) == pytest.approx(5.0)
+    # the bucket never holds more than its capacity
+    bucket = TokenBucket(60)
+    bucket._refill(now + 3600)
+    assert bucket.level == 60
+
+
+def test_oversized_request_takes_the_whole_bucket():
+    bucket = TokenBucket(100)
+    now = bucket.updated_at
+    assert bucket.reserve(1000, now) == 0.0
+    assert bucket.level == 0
+    assert bucket.reserve(50, now) == pytest.approx(30.0)
+
+
+def test_adjust_gives_back_unused_tokens():
+    bucket = TokenBucket(60)
+    now = bucket.updated_at
+    bucket.reserve(60, now)
+    bucket.adjust(30, now)
+    assert bucket.reserve(30, now) == 0.0
+    bucket.adjust(1000, now)
+    assert bucket.level == 60
+
+
+def test_limiter_waits_for_the_scarcer_budget():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=60)
+    assert limiter.reserve(60) == 0.0
+    wait = limiter.reserve(30)
+    assert wait == pytest.approx(30.0, abs=0.1)
+    limiter.record_usage(estimated_tokens=30, used_tokens=0)
+    assert limiter.tokens.level == pytest.approx(0.0, abs=0.1)
+
+
+def test_model_limit_overrides_provider_default():
+    set_rate_limit("openai", None, requests_per_minute=100)
+    set_rate_limit("openai", "gpt-4o", requests_per_minute=10)
+    assert get_rate_limiter("openai", "gpt-4o").requests.capacity == 10
+    assert get_rate_limiter("openai", "gpt-4o-mini").requests.capacity == 100
+    assert get_rate_limiter("anthropic", "claude") is None
+    # litellm style model names carry the provider
+    assert get_rate_limiter(None, "openai/gpt-4o").requests.capacity == 10
+    assert get_rate_limiter(None, "gpt-4o") is get_rate_limiter("openai", "gpt-4o")
+
+
+def test_limiters_are_shared_and_reset_by_new_limits():
+    set_rate_limit("openai", None, requests_per_minute=100)
+    limiter = get_rate_limiter("openai", "gpt-4o")
+    assert get_rate_limiter("openai", "gpt-4o") is limiter
+    set_rate_limit("openai", None, requests_per_minute=50)
+    assert get_rate_limiter("openai", "gpt-4o").requests.capacity == 50
+
+
+def test_call_reports_latency_and_usage(monkeypatch):
+    calls, usages = [], []
+    monkeypatch.setattr(rate_limit, "_call_observers", [lambda latency, error: calls.append(error)])
+    monkeypatch.setattr(rate_limit, "_usage_observers", [usages.append])
+
+    class Response(object):
+        usage = {"total_tokens": 3}
+
+    assert isinstance(rate_limit._call(None, lambda **kwargs: Response(), messages=[]), Response)
+    error = ValueError("boom")
+
+    def fail(**kwargs):
+        raise error
+
+    with pytest.raises(ValueError):
+        rate_limit._call(None, fail, messages=[])
+    assert calls == [None, error]
+    assert usages == [{"total_tokens": 3}]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_completion_corrects_the_token_estimate(monkeypatch, use_async):
+    calls = []
+    monkeypatch.setattr(rate_limit, "_call_observers", [lambda latency, error: calls.append(error)])
+    monkeypatch.setattr(rate_limit, "_usage_observers", [])
+    response = SimpleNamespace(usage=SimpleNamespace(total_tokens=10))
+
+    async def acompletion(**kwargs):
+        return response
+
+    monkeypatch.setattr(rate_limit.litellm, "completion", lambda **kwargs: response)
+    monkeypatch.setattr(rate_limit.litellm, "acompletion", acompletion)
+    set_rate_limit("openai", None, tokens_per_minute=10_000)
+    kwargs = dict(model="gpt-4o", custom_llm_provider="openai", messages=[], max_tokens=1_000)
+    if use_async:
+        assert asyncio.run(rate_limit.acompletion(**kwargs)) is response
+    else:
+        assert rate_limit.completion(**kwargs) is response
+    # the 1000 tokens reserved up front are given back but for the 10 used
+    assert get_rate_limiter("openai", "gpt-4o").tokens.level == pytest.approx(9_990, abs=1)
+    assert calls == [None]
@@ -0,0 +1,92 @@
+# Copyright Sierra
+
+import pytest
+
+from tau_bench.envs.airline.data import load_data as load_airline_data
+from tau_bench.envs.airline.tools import ALL_TOOLS as AIRLINE_TOOLS
+from tau_bench.envs.retail.data import load_data as load_retail_data
+from tau_bench.envs.retail.tools import ALL_TOOLS as RETAIL_TOOLS
+from tau_bench.envs.snapshot import EpisodeData, load_snapshot, read_through_view
+
+RETAIL_CALLS = {
+    "calculate": {"expression": "2 * (3 + 4)"},
+    "find_user_id_by_email": {"email": "noah.brown7922@example.com"},
+    "find_user_id_by_name_zip": {"first_name": "Noah", "last_name": "Brown", "zip": "80279"},
+    "get_order_details": {"order_id": "#W2611340"},
+    "get_product_details": {"product_id": "9523456873"},
+    "get_user_details": {"user_id": "noah_brown_6181"},
+    "list_all_product_types": {},
+    "think": {"thought": "..."},
+    "transfer_to_human_agents": {"summary": "..."},
+}
+AIRLINE_CALLS = {
+    "calculate": {"expression": "2 * (3 + 4)"},
+    "get_reservation_details": {"reservation_id": "4WQ150"},
+    "get_user_details": {"user_id": "mia_li_3668"},
+    "list_all_airports": {},
+    "search_direct_flight": {"origin": "JFK", "destination": "SEA", "date": "2024-05-16"},
+    "search_onestop_flight": {"origin": "JFK", "destination": "SEA", "date": "2024-05-16"},
+    "think": {"thought": "..."},
+    "transfer_to_human_agents": {"summary": "..."},
+}
+
+
+@pytest.mark.parametrize(
+    "data_load_func, tools, calls",
+    [(load_retail_data, RETAIL_TOOLS, RETAIL_CALLS), (load_airline_data, AIRLINE_TOOLS, AIRLINE_CALLS)],
+    ids=["retail", "airline"],
+)
+def test_read_only_tools_leave_the_overlay_empty(data_load_func, tools, calls):
+    read_tools = {
+        tool.get_info()["function"]["name"]: tool for tool in tools if tool.read_only
+    }
+    assert sorted(read_tools) == sorted(calls)
+    data = EpisodeData(load_snapshot(data_load_func))
+    for name, kwargs in calls.items():
+        result = read_through_view(read_tools[name]._raw_invoke)(data=data, **kwargs)
+        assert not result.startswith("Error"), (name, result)
+    assert {name: table.overlay for name, table in data.tables.items()} == {
+        name: {} for name in data.tables
+    }
+
+
+def test_only_data_lookups_get_the_read_chain():
+    read_supervised = {
+        tool.get_info()["function"]["name"]
+        for tool in RETAIL_TOOLS + AIRLINE_TOOLS
+        if tool.supervision == "read"
+    }
+    assert read_supervised == set(RETAIL_CALLS) - {"calculate", "transfer_to_human_agents"} | set(
+        AIRLINE_CALLS
+    ) - {"calculate", "search_direct_flight", "search_onestop_flight", "transfer_to_human_agents"}
+
+
+def test_tools_declare_their_classification():
+    from tau_bench.envs.airline.tools import OPTIONAL_TOOLS, SearchMultistopFlight
+    from tau_bench.envs.tool import Tool
+
+    assert SearchMultistopFlight.read_only and SearchMultistopFlight.supervision == "read"
+    assert SearchMultistopFlight not in AIRLINE_TOOLS
+    assert OPTIONAL_TOOLS == [SearchMultistopFlight]
+    with pytest.raises(ValueError):
+
+        class Misclassified(Tool):
+            supervision = "write"
+
+            @staticmethod
+            def invoke(data):
+                return ""
+
+            @staticmethod
+            def get_info():
+                return {"function": {"name": "misclassified", "parameters": {}}}
+
+
+def test_extra_tools_are_opt_in():
+    from tau_bench.envs.airline.tools import SearchMultistopFlight
+    from tau_bench.envs.base import with_extra_tools
+
+    assert with_extra_tools(AIRLINE_TOOLS, [SearchMultistopFlight]) == AIRLINE_TOOLS
+    assert with_extra_tools(AIRLINE_TOOLS, [SearchMultistopFlight], ["search_multistop_flight"]) == AIRLINE_TOOLS + [SearchMultistopFlight]
+    with pytest.raises(ValueError):
+        with_extra_tools(RETAIL_TOOLS, [], ["search_multistop_flight"])
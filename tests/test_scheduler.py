@@ -0,0 +1,42 @@
+# Copyright Sierra
+
+import pytest
+
+from tau_bench.runner.scheduler import build_work_queue, expected_episode_cost
+from tau_bench.types import Action, Task
+
+
+def make_task(num_actions: int) -> Task:
+    return Task(
+        user_id="user",
+        actions=[Action(name="think", kwargs={}) for _ in range(num_actions)],
+        instruction="",
+        outputs=[],
+    )
+
+
+TASKS = [make_task(n) for n in [1, 5, 3]]
+
+
+def test_fifo_is_trial_major():
+    work = build_work_queue(range(3), num_trials=2, tasks=TASKS)
+    assert work == [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2)]
+
+
+def test_completed_pairs_are_skipped():
+    # checkpoint indexes are keyed (task_id, trial); work items (trial, task_id)
+    completed = {(0, 0), (2, 1)}
+    work = build_work_queue(range(3), num_trials=2, tasks=TASKS, completed=completed)
+    assert work == [(0, 1), (0, 2), (1, 0), (1, 1)]
+
+
+def test_longest_first():
+    work = build_work_queue(range(3), num_trials=2, tasks=TASKS, order="longest-first")
+    costs = [expected_episode_cost(TASKS[idx]) for _, idx in work]
+    assert costs == sorted(costs, reverse=True)
+    assert sorted(work) == sorted(build_work_queue(range(3), num_trials=2, tasks=TASKS))
+
+
+def test_unknown_order():
+    with pytest.raises(ValueError):
+        build_work_queue(range(3), num_trials=1, tasks=TASKS, order="random")
@@ -0,0 +1,150 @@
+# Copyright Sierra
+
+import json
+import random
+
+import pytest
+
+from tau_bench.envs.hashing import table_digest
+from tau_bench.envs.snapshot import (
+    CowTable,
+    EpisodeData,
+    TableIndex,
+    copy_record,
+    data_digest,
+    dumps_record,
+    find_all,
+    find_first,
+    peek,
+)
+
+# base tables are cached by id(), so they live as long as the module
+BASE = {
+    "users": {
+        f"user_{idx}": {"name": f"name {idx}", "zip": str(idx % 5), "orders": [f"#{idx}"]}
+        for idx in range(40)
+    },
+    "orders": {f"#{idx}": {"user_id": f"user_{idx}", "status": "pending"} for idx in range(40)},
+}
+ZIP_INDEX = TableIndex(lambda record: record["zip"])
+
+
+def apply_random_ops(seed: int, table, reference) -> None:
+    rng = random.Random(seed)
+    for step in range(200):
+        keys = list(reference)
+        op = rng.choice(["read", "write", "insert", "delete", "replace"])
+        if op == "read" and keys:
+            key = rng.choice(keys)
+            assert table[key] == reference[key]
+        elif op == "write" and keys:
+            key = rng.choice(keys)
+            zip_code = str(rng.randrange(7))
+            table[key]["zip"] = zip_code
+            reference[key]["zip"] = zip_code
+        elif op == "insert":
+            key = f"new_{step}"
+            record = {"name": key, "zip": str(rng.randrange(7)), "orders": []}
+            table[key] = copy_record(record)
+            reference[key] = record
+        elif op == "delete" and keys:
+            key = rng.choice(keys)
+            del table[key]
+            del reference[key]
+        elif op == "replace" and keys:
+            # tools never re-add a deleted record, so only live keys are replaced
+            key = rng.choice(keys)
+            record = {"name": "again", "zip": "0", "orders": []}
+            table[key] = copy_record(record)
+            reference[key] = record
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_cow_table_matches_plain_dict(seed):
+    table = CowTable(BASE["users"])
+    reference = copy_record(BASE["users"])
+    apply_random_ops(seed, table, reference)
+    assert list(table) == list(reference)
+    assert list(table.items()) == list(reference.items())
+    assert len(table) == len(reference)
+    for key in list(BASE["users"]) + ["new_0", "missing"]:
+        assert (key in table) == (key in reference)
+    for zip_code in map(str, range(7)):
+        assert find_first(table, ZIP_INDEX, zip_code) == find_first(reference, ZIP_INDEX, zip_code)
+        assert find_all(table, ZIP_INDEX, zip_code) == find_all(reference, ZIP_INDEX, zip_code)
+    assert table.digest() == table_digest(reference)
+    for key in reference:
+        assert peek(table, key) == reference[key]
+        assert dumps_record(table, key) == json.dumps(reference[key])
+    # the snapshot itself is never written to
+    assert BASE["users"]["user_0"]["name"] == "name 0"
+
+
+def test_lookup_copies_and_iteration_does_not():
+    table = CowTable(BASE["users"])
+    list(table.items())
+    assert table.peek("user_1") is BASE["users"]["user_1"]
+    assert table.overlay == {}
+    record = table["user_1"]
+    assert record is not BASE["users"]["user_1"]
+    assert table.overlay == {"user_1": record}
+
+
+def test_deleted_records_are_gone():
+    table = CowTable(BASE["users"])
+    del table["user_1"]
+    with pytest.raises(KeyError):
+        table["user_1"]
+    with pytest.raises(KeyError):
+        table.peek("user_1")
+    with pytest.raises(KeyError):
+        del table["user_1"]
+    assert "user_1" not in table
+    assert len(table) == len(BASE["users"]) - 1
+
+
+def test_savepoint_is_independent():
+    data = EpisodeData(BASE)
+    data["users"]["user_2"]["zip"] = "x"
+    savepoint = data.savepoint()
+    savepoint["users"]["user_2"]["zip"] = "y"
+    savepoint["users"]["user_3"]["zip"] = "y"
+    assert data["users"]["user_2"]["zip"] == "x"
+    assert "user_3" not in data["users"].overlay
+    data.commit(savepoint)
+    assert data["users"]["user_3"]["zip"] == "y"
+
+
+def test_commit_after_a_write_conflicts():
+    data = EpisodeData(BASE)
+    savepoint = data.savepoint()
+    data.tool_results.bump()
+    with pytest.raises(RuntimeError):
+        data.commit(savepoint)
+
+
+def test_data_digest_matches_plain_data():
+    data = EpisodeData(BASE)
+    reference = copy_record(BASE)
+    assert data_digest(data) == data_digest(reference)
+    data["orders"]["#3"]["status"] = "cancelled"
+    reference["orders"]["#3"]["status"] = "cancelled"
+    assert data_digest(data) == data_digest(reference)
+    assert data_digest(data) != data_digest(BASE)
+
+
+def test_read_view_does_not_copy():
+    data = EpisodeData(BASE)
+    data["users"]["user_4"]["zip"] = "x"
+    view = data.read_view()
+    assert view["users"]["user_1"] is BASE["users"]["user_1"]
+    # the episode's own copy is what the view reads
+    assert view["users"]["user_4"]["zip"] == "x"
+    assert view.tool_results is data.tool_results
+    assert list(data["users"].overlay) == ["user_4"]
+    with pytest.raises(TypeError):
+        view["users"]["user_1"] = {}
+    with pytest.raises(TypeError):
+        del view["users"]["user_1"]
+    assert find_first(view["users"], ZIP_INDEX, "x") == "user_4"
+    assert data_digest(view) == data_digest(data)
@@ -0,0 +1,120 @@
+# Copyright Sierra
+
+import threading
+import time
+
+import pytest
+
+from tau_bench.envs.snapshot import EpisodeData
+from tau_bench.envs.speculation import set_speculative_execution, speculative
+from tau_bench.envs.tool_cache import bump_on_write
+
+BASE = {"users": {"user_0": {"name": "name 0"}}}
+
+
+@pytest.fixture(autouse=True)
+def speculation_on():
+    set_speculative_execution(True, max_concurrent_calls=4)
+    yield
+    set_speculative_execution(False)
+
+
+def make_tool(delay=0.0, result=None):
+    runs = []
+
+    def write(data, key, name):
+        time.sleep(delay)
+        data["users"][key] = {"name": name}
+        runs.append((data, name))
+        return result or f"set {key}"
+
+    return bump_on_write(write), runs
+
+
+def deciding(decide):
+    """A stand-in for `supervise`: `decide(kwargs)` is what the call runs with, or None to reject it."""
+
+    def supervision(func):
+        def supervised(**kwargs):
+            final_kwargs = decide(kwargs)
+            if final_kwargs is None:
+                return "rejected"
+            return func(**final_kwargs)
+
+        return supervised
+
+    return supervision
+
+
+def test_an_approved_call_commits_the_speculative_run():
+    data = EpisodeData(BASE)
+    write, runs = make_tool()
+    version = data.tool_results.version
+    result = speculative(deciding(lambda kwargs: kwargs))(write)(data=data, key="user_1", name="new")
+    assert result == "set user_1"
+    assert data["users"]["user_1"] == {"name": "new"}
+    assert data.tool_results.version > version
+    # it only ran on the savepoint
+    assert len(runs) == 1 and runs[0][0] is not data
+
+
+def test_a_rejected_call_rolls_back():
+    data = EpisodeData(BASE)
+    write, runs = make_tool(delay=0.1)
+    result = speculative(deciding(lambda kwargs: None))(write)(data=data, key="user_1", name="new")
+    assert result == "rejected"
+    assert "user_1" not in data["users"]
+    # the rolled-back run finished before the call returned
+    assert len(runs) == 1
+
+
+def test_a_failing_run_is_still_supervised():
+    data = EpisodeData(BASE)
+    write, runs = make_tool(result="Error: user not found")
+    result = speculative(deciding(lambda kwargs: None))(write)(data=data, key="user_1", name="new")
+    assert result == "rejected"
+
+
+def test_a_modified_call_runs_on_the_data_and_rolls_back():
+    data = EpisodeData(BASE)
+    write, runs = make_tool()
+    supervision = deciding(lambda kwargs: {**kwargs, "name": "modified"})
+    result = speculative(supervision)(write)(data=data, key="user_1", name="new")
+    assert result == "set user_1"
+    assert data["users"]["user_1"] == {"name": "modified"}
+    assert [(run_data is data, name) for run_data, name in runs] == [(False, "new"), (True, "modified")]
+
+
+def test_a_stale_savepoint_cannot_be_committed():
+    data = EpisodeData(BASE)
+    savepoint = data.savepoint()
+    data.tool_results.bump()
+    with pytest.raises(RuntimeError):
+        data.commit(savepoint)
+
+
+def test_concurrent_steps_do_not_lose_writes():
+    data = EpisodeData(BASE)
+    write, runs = make_tool()
+    second_done = threading.Event()
+
+    def wait_for_second(kwargs):
+        # the first call is approved after the second one has written
+        assert second_done.wait(5)
+        return kwargs
+
+    first = speculative(deciding(wait_for_second))(write)
+    second = speculative(deciding(lambda kwargs: kwargs))(write)
+    thread = threading.Thread(target=first, kwargs=dict(data=data, key="user_1", name="first"))
+    thread.start()
+    assert second(data=data, key="user_2", name="second") == "set user_2"
+    second_done.set()
+    thread.join(5)
+    # the first savepoint went stale, so the first call ran again on the data
+    assert data["users"]["user_1"] == {"name": "first"}
+    assert data["users"]["user_2"] == {"name": "second"}
+    assert sorted((run_data is data, name) for run_data, name in runs) == [
+        (False, "first"),
+        (False, "second"),
+        (True, "first"),
+    ]
@@ -0,0 +1,269 @@
+# Copyright Sierra
+
+import asyncio
+import inspect
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from entropy_labs.mocking.policies import MockPolicy
+from entropy_labs.sentinel_api_client.sentinel_api_client.models.supervisor_type import SupervisorType
+from entropy_labs.supervision.config import (
+    ModifiedData,
+    SupervisionDecision,
+    SupervisionDecisionType,
+)
+
+from tau_bench.envs import supervision
+from tau_bench.envs.base import respond_to_user_async
+from tau_bench.envs.retail.tools import ALL_TOOLS as RETAIL_TOOLS
+from tau_bench.envs.supervision import register_supervised_functions, supervise
+from tau_bench.envs.supervision_mode import mode_gated, set_supervision_mode
+
+
+def test_chains_are_built_when_registered(monkeypatch):
+    monkeypatch.setattr(supervision, "_unregistered", [])
+    registered = []
+    monkeypatch.setattr(
+        supervision.supervision_config,
+        "register_pending_supervised_function",
+        lambda func, chains, ignored: registered.append((func.__qualname__, chains, ignored)),
+    )
+    built = []
+
+    def chains():
+        built.append(True)
+        return [["supervisor"]]
+
+    @supervise(supervision_functions=chains, ignored_attributes=["data"])
+    def tool(data):
+        return data
+
+    assert built == []
+    register_supervised_functions()
+    register_supervised_functions()
+    assert built == [True]
+    assert registered == [(tool.__wrapped__.__qualname__, [["supervisor"]], ["data"])]
+
+
+def test_tools_are_registered_with_their_domain_chains(monkeypatch):
+    monkeypatch.setattr(supervision, "_unregistered", list(supervision._unregistered))
+    registered = {}
+    monkeypatch.setattr(
+        supervision.supervision_config,
+        "register_pending_supervised_function",
+        lambda func, chains, ignored: registered.setdefault(func.__qualname__, chains),
+    )
+    register_supervised_functions()
+    for tool in RETAIL_TOOLS:
+        chains = registered[f"{tool.__name__}.invoke"]
+        assert isinstance(chains, list)
+        assert len(chains) == (1 if tool.supervision == "read" else 3)
+        assert all(type(chain) is list and len(chain) == 1 for chain in chains)
+
+
+def decide(kind, explanation="", wait_for=None, delay=0.0, modified=None, calls=None, then=None):
+    """A stub supervisor that makes the decision `kind` (a `SupervisionDecisionType` name)."""
+
+    def supervisor(func, **kwargs):
+        if calls is not None:
+            calls.append(explanation)
+        if wait_for is not None:
+            assert wait_for.wait(5)
+        time.sleep(delay)
+        if then is not None:
+            then.set()
+        return SupervisionDecision(
+            decision=getattr(SupervisionDecisionType, kind),
+            explanation=explanation,
+            modified=ModifiedData(tool_args=[], tool_kwargs=modified) if modified else None,
+        )
+
+    return supervisor
+
+
+@pytest.fixture
+def supervised(monkeypatch):
+    """Build a function supervised by stub supervisor chains, with the API stubbed out."""
+    monkeypatch.setattr(supervision, "_unregistered", [])
+    supervision.set_max_concurrent_calls(4)
+    state = SimpleNamespace(chains=[], functions={})
+    context = SimpleNamespace(
+        get_supervised_function_entry=lambda name: {"tool_id": "tool", "ignored_attributes": ["data"]},
+        get_api_messages=lambda: [None],
+        to_task_state=lambda: None,
+        get_supervisor_by_id=lambda supervisor_id: state.functions.get(supervisor_id),
+        openai_messages=[],
+    )
+    monkeypatch.setattr(
+        supervision,
+        "supervision_config",
+        SimpleNamespace(
+            get_all_runs=lambda: [SimpleNamespace(supervision_context=context)],
+            client=None,
+            global_mock_policy=MockPolicy.NO_MOCK,
+            override_local_policy=False,
+        ),
+    )
+    monkeypatch.setattr(
+        supervision,
+        "create_tool_request_group",
+        lambda tool_id, tool_requests, client: SimpleNamespace(id="group", tool_requests=tool_requests),
+    )
+    monkeypatch.setattr(supervision, "get_supervisor_chains_for_tool", lambda tool_id, client: state.chains)
+    monkeypatch.setattr(supervision, "send_supervision_request", lambda **kwargs: "request")
+    monkeypatch.setattr(supervision, "send_supervision_result", lambda **kwargs: None)
+
+    def build(chains, supervision_decorator=None):
+        for idx, chain in enumerate(chains):
+            supervisors = []
+            for position, supervisor_func in enumerate(chain):
+                state.functions[(idx, position)] = supervisor_func
+                supervisors.append(SimpleNamespace(id=(idx, position), type=SupervisorType.CLIENT_SUPERVISOR))
+            state.chains.append(SimpleNamespace(chain_id=idx, supervisors=supervisors))
+        calls = []
+
+        def tool(data, **kwargs):
+            calls.append(kwargs)
+            return "ran"
+
+        decorator = supervise(supervision_functions=chains, ignored_attributes=["data"])
+        if supervision_decorator is not None:
+            decorator = supervision_decorator(decorator)
+        return decorator(tool), calls
+
+    yield build
+    supervision.set_max_concurrent_calls(1)
+
+
+def test_first_stopping_chain_in_chain_order_wins(supervised):
+    tool, calls = supervised(
+        [
+            [decide("APPROVE")],
+            [decide("REJECT", "slow rejection", delay=0.2)],
+            [decide("REJECT", "fast rejection")],
+        ]
+    )
+    result = tool(data={}, x=0)
+    assert "slow rejection" in result
+    assert "fast rejection" not in result
+    assert calls == []
+
+
+def test_a_later_stop_waits_for_earlier_chains(supervised):
+    released = threading.Event()
+    approvals = []
+    tool, calls = supervised(
+        [
+            # only decides once the later chain has rejected
+            [decide("APPROVE", "approved", wait_for=released, delay=0.1, calls=approvals)],
+            [decide("TERMINATE", "terminated", then=released)],
+        ]
+    )
+    result = tool(data={}, x=0)
+    assert result.startswith("Execution of")
+    assert "terminated" in result
+    assert approvals == ["approved"]
+    assert calls == []
+
+
+def test_an_escalation_hands_over_to_the_next_supervisor(supervised):
+    consulted = []
+    tool, calls = supervised(
+        [
+            [decide("ESCALATE", "unsure", calls=consulted), decide("APPROVE", "approved", calls=consulted)],
+            [decide("APPROVE")],
+        ]
+    )
+    assert tool(data={}, x=0) == "ran"
+    assert consulted == ["unsure", "approved"]
+    assert calls == [{"x": 0}]
+
+
+def test_a_trailing_escalation_counts_against_the_call(supervised):
+    tool, calls = supervised([[decide("APPROVE")], [decide("ESCALATE", "unsure")]])
+    result = tool(data={}, x=0)
+    assert "rejected by some supervisors" in result
+    assert "unsure" in result
+    assert calls == []
+
+
+def test_chains_after_a_stop_are_cancelled(supervised):
+    rejected = threading.Event()
+    consulted = []
+    tool, calls = supervised(
+        [
+            [decide("REJECT", "rejected", then=rejected)],
+            [
+                decide("ESCALATE", "running", wait_for=rejected, delay=0.1, calls=consulted),
+                decide("APPROVE", "never asked", calls=consulted),
+            ],
+        ]
+    )
+    assert "rejected" in tool(data={}, x=0)
+    # the later chain finishes its running supervisor, then stops
+    time.sleep(0.3)
+    assert consulted == ["running"]
+    assert calls == []
+
+
+def test_the_first_modification_in_chain_order_applies(supervised):
+    tool, calls = supervised(
+        [
+            [decide("APPROVE")],
+            [decide("MODIFY", delay=0.1, modified={"x": 1, "data": "replaced"})],
+            [decide("MODIFY", modified={"x": 2})],
+        ]
+    )
+    data = {}
+    assert tool(data=data, x=0) == "ran"
+    assert calls == [{"x": 1}]
+
+
+def test_supervision_mode_gates_the_supervisors(supervised):
+    tool, calls = supervised(
+        [[decide("REJECT", "rejected")]],
+        supervision_decorator=lambda decorator: mode_gated(decorator, read_only=False),
+    )
+    try:
+        set_supervision_mode("off")
+        assert tool(data={}, x=0) == "ran"
+        set_supervision_mode("read-only")
+        assert tool(data={}, x=1) == "ran"
+        set_supervision_mode("full")
+        assert "rejected" in tool(data={}, x=2)
+    finally:
+        set_supervision_mode("full")
+    assert calls == [{"x": 0}, {"x": 1}]
+
+
+@pytest.mark.parametrize("mode, supervised_in_mode", [("off", False), ("read-only", False), ("full", True)])
+def test_supervision_mode_gates_async_replies(supervised, mode, supervised_in_mode):
+    supervised([[decide("REJECT", "rejected")]])
+    replies = []
+
+    async def step_async(content):
+        replies.append(content)
+        return "reply"
+
+    env = SimpleNamespace(user=SimpleNamespace(step_async=step_async))
+
+    async def respond():
+        # as `Env.step_async` calls it
+        observation = await asyncio.to_thread(respond_to_user_async, self=env, content="hi")
+        if inspect.isawaitable(observation):
+            observation = await observation
+        return observation
+
+    try:
+        set_supervision_mode(mode)
+        observation = asyncio.run(respond())
+    finally:
+        set_supervision_mode("full")
+    if supervised_in_mode:
+        assert "rejected" in observation
+        assert replies == []
+    else:
+        assert observation == "reply"
+        assert replies == ["hi"]
@@ -0,0 +1,71 @@
+# Copyright Sierra
+
+import json
+from types import SimpleNamespace
+
+from entropy_labs.supervision import supervisors as entropy_supervisors
+
+from tau_bench.envs.supervision_profile import (
+    LATENCY_GROWTH,
+    SupervisionProfile,
+    profiled_supervisor,
+    profiling,
+)
+
+LATENCIES = [0.01 * idx for idx in range(1, 101)]
+
+
+def record(profile, latencies):
+    for latency in latencies:
+        profile.record("Supervisor", "GetOrderDetails", "approve", latency)
+
+
+def test_percentiles_come_from_the_histogram():
+    profile = SupervisionProfile()
+    record(profile, LATENCIES)
+    summary = profile.summary()["Supervisor"]
+    assert summary["invocations"] == 100
+    assert abs(summary["latency_total"] - sum(LATENCIES)) < 1e-9
+    # a bucket's upper bound is at most one bucket width above the latency
+    assert 0.50 <= summary["latency_p50"] < 0.50 * LATENCY_GROWTH
+    assert 0.95 <= summary["latency_p95"] < 0.95 * LATENCY_GROWTH
+    assert sum(summary["latency_histogram"].values()) == 100
+    assert "latencies" not in summary
+
+
+def test_merged_summaries_match_one_profile():
+    whole, first, second = SupervisionProfile(), SupervisionProfile(), SupervisionProfile()
+    record(whole, LATENCIES)
+    record(first, LATENCIES[:30])
+    record(second, LATENCIES[30:])
+    # summaries are merged after a round trip through the results file
+    summaries = [json.loads(json.dumps(profile.summary())) for profile in (first, second)]
+    merged = SupervisionProfile.merged(summaries).summary()["Supervisor"]
+    expected = whole.summary()["Supervisor"]
+    assert abs(merged.pop("latency_total") - expected.pop("latency_total")) < 1e-9
+    assert merged == expected
+
+
+def test_supervisor_tokens_are_counted(monkeypatch):
+    def create(**kwargs):
+        return SimpleNamespace(usage=SimpleNamespace(prompt_tokens=30, completion_tokens=5))
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(entropy_supervisors, "client", client)
+
+    def supervisor(func, **kwargs):
+        entropy_supervisors.client.chat.completions.create(model="gpt-4o", messages=[])
+        return SimpleNamespace(decision="reject")
+
+    supervisor.__name__ = "Stub Supervisor"
+
+    def invoke(data):
+        pass
+
+    invoke.__qualname__ = "GetOrderDetails.invoke"
+    with profiling(SupervisionProfile()) as profile:
+        profiled_supervisor(supervisor)(invoke, tool_args=(), tool_kwargs={})
+    summary = profile.summary()["Stub Supervisor"]
+    assert summary["decisions"] == {"reject": 1}
+    assert (summary["prompt_tokens"], summary["completion_tokens"]) == (30, 5)
+    assert summary["tokens_by_tool"] == {"GetOrderDetails": 35}
@@ -0,0 +1,74 @@
+# Copyright Sierra
+
+import pytest
+
+from tau_bench.envs.tool_cache import ToolResultCache, bump_on_write, memoize_read
+
+
+class Data(dict):
+    def __init__(self) -> None:
+        super().__init__()
+        self.tool_results = ToolResultCache()
+
+
+def counting_tool():
+    calls = []
+
+    def invoke(data, **kwargs):
+        calls.append(kwargs)
+        return f"result {len(calls)}"
+
+    return invoke, calls
+
+
+def test_repeated_reads_hit():
+    invoke, calls = counting_tool()
+    read = memoize_read("get", invoke)
+    data = Data()
+    assert read(data=data, id="a") == "result 1"
+    assert read(data=data, id="a") == "result 1"
+    assert read(data=data, id="b") == "result 2"
+    assert data.tool_results.stats() == {"hits": 1, "misses": 2, "data_version": 0}
+
+
+def test_writes_invalidate_reads():
+    invoke, calls = counting_tool()
+    read = memoize_read("get", invoke)
+    write = bump_on_write(lambda data, **kwargs: "ok")
+    data = Data()
+    read(data=data, id="a")
+    write(data=data)
+    assert read(data=data, id="a") == "result 2"
+    assert data.tool_results.version == 1
+
+
+def test_errors_are_not_cached():
+    attempts = []
+
+    def invoke(data, **kwargs):
+        attempts.append(kwargs)
+        raise ValueError("not found")
+
+    read = memoize_read("get", invoke)
+    data = Data()
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            read(data=data, id="a")
+    assert len(attempts) == 2
+
+
+def test_arguments_are_told_apart_by_type():
+    invoke, calls = counting_tool()
+    read = memoize_read("get", invoke)
+    data = Data()
+    read(data=data, n=1)
+    read(data=data, n=True)
+    assert len(calls) == 2
+
+
+def test_plain_data_is_not_memoized():
+    invoke, calls = counting_tool()
+    read = memoize_read("get", invoke)
+    read(data={}, id="a")
+    read(data={}, id="a")
+    assert len(calls) == 2
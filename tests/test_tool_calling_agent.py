@@ -0,0 +1,91 @@
+# Copyright Sierra
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from tau_bench.agents import tool_calling_agent
+from tau_bench.agents.tool_calling_agent import ToolCallingAgent
+from tau_bench.types import EnvInfo, EnvResetResponse, EnvResponse, Task
+
+
+class Message(object):
+    def __init__(self, **fields) -> None:
+        self.fields = fields
+
+    def model_dump(self):
+        return dict(self.fields)
+
+
+def response(message: Message):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=message)], _hidden_params={"response_cost": 0.5}
+    )
+
+
+MESSAGES = [
+    Message(
+        role="assistant",
+        content=None,
+        tool_calls=[
+            {"id": "call_0", "function": {"name": "get_user", "arguments": json.dumps({"id": "u"})}},
+            {"id": "call_1", "function": {"name": "ignored", "arguments": "{}"}},
+        ],
+    ),
+    Message(role="assistant", content="done", tool_calls=None),
+]
+
+
+class StubEnv(object):
+    def __init__(self) -> None:
+        self.actions = []
+        self.info = EnvInfo(task=Task(user_id="u", actions=[], instruction="", outputs=[]))
+
+    def reset(self, task_index=None):
+        return EnvResetResponse(observation="hello", info=self.info)
+
+    def step(self, action):
+        self.actions.append(action)
+        done = len(self.actions) == 2
+        return EnvResponse(observation=f"obs {len(self.actions)}", reward=float(done), done=done, info=self.info)
+
+    async def reset_async(self, task_index=None):
+        return self.reset(task_index)
+
+    async def step_async(self, action):
+        return self.step(action)
+
+
+@pytest.fixture
+def stub_model(monkeypatch):
+    run = SimpleNamespace(supervision_context=SimpleNamespace(update_messages=lambda messages: None))
+    monkeypatch.setattr(
+        tool_calling_agent, "supervision_config", SimpleNamespace(get_all_runs=lambda: [run])
+    )
+    replies = {"sync": iter(MESSAGES), "async": iter(MESSAGES)}
+
+    def completion(**kwargs):
+        return response(next(replies["sync"]))
+
+    async def acompletion(**kwargs):
+        return response(next(replies["async"]))
+
+    monkeypatch.setattr(tool_calling_agent, "completion", completion)
+    monkeypatch.setattr(tool_calling_agent, "acompletion", acompletion)
+
+
+def test_solve_and_solve_async_agree(stub_model):
+    agent = ToolCallingAgent(tools_info=[], wiki="wiki", model="m", provider="p")
+    env, async_env = StubEnv(), StubEnv()
+    result = agent.solve(env)
+    async_result = asyncio.run(agent.solve_async(async_env))
+    assert result == async_result
+    assert env.actions == async_env.actions
+    assert result.reward == 1.0
+    assert result.total_cost == 1.0
+    assert [m["role"] for m in result.messages] == ["system", "user", "assistant", "tool", "assistant", "user"]
+    # only the first tool call is kept
+    assert len(result.messages[2]["tool_calls"]) == 1
+    assert result.messages[3]["content"] == "obs 1"
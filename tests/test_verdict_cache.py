@@ -0,0 +1,133 @@
+# Copyright Sierra
+
+from types import SimpleNamespace
+
+import pytest
+from entropy_labs.supervision.config import SupervisionDecision, SupervisionDecisionType
+
+from tau_bench.envs.verdict_cache import (
+    FEEDBACK_MARKER,
+    VerdictCache,
+    cached_supervisor,
+    caching,
+    conversation_digest,
+)
+
+KEY = ("Supervisor", "GetOrderDetails.invoke:{}", "digest")
+
+
+def test_a_decision_is_reused_at_most_max_reuses_times():
+    cache = VerdictCache(max_reuses=3)
+    cache.put(KEY, "approve")
+    assert [cache.get(KEY) for _ in range(4)] == ["approve"] * 3 + [None]
+    assert cache.stats() == {"Supervisor": {"hits": 3, "misses": 1, "hit_rate": 0.75}}
+
+
+def test_zero_reuses_disables_reuse():
+    cache = VerdictCache(max_reuses=0)
+    cache.put(KEY, "approve")
+    assert cache.get(KEY) is None
+
+
+def test_least_recently_used_decisions_are_evicted():
+    cache = VerdictCache(max_entries=2)
+    keys = [("Supervisor", f"action {idx}", "digest") for idx in range(3)]
+    cache.put(keys[0], 0)
+    cache.put(keys[1], 1)
+    cache.get(keys[0])
+    cache.put(keys[2], 2)
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == 0
+    assert cache.get(keys[2]) == 2
+
+
+def test_merged_stats_add_up():
+    first, second = VerdictCache(), VerdictCache()
+    first.put(KEY, "approve")
+    first.get(KEY)
+    second.get(KEY)
+    merged = VerdictCache.merged_stats([first.stats(), second.stats()])
+    assert merged == {"Supervisor": {"hits": 1, "misses": 1, "hit_rate": 0.5}}
+
+
+def test_rejected_rounds_leave_the_digest_unchanged():
+    conversation = [{"role": "user", "content": "cancel my order"}]
+    retried = conversation + [
+        {"role": "assistant", "content": None, "tool_calls": [{"id": "call_0", "function": {"name": "cancel"}}]},
+        {"role": "tool", "tool_call_id": "call_0", "content": f"rejected. {FEEDBACK_MARKER}."},
+    ]
+    answered = conversation + [{"role": "assistant", "content": "done"}]
+    assert conversation_digest(retried) == conversation_digest(conversation)
+    assert conversation_digest(answered) != conversation_digest(conversation)
+
+
+def make_supervisor():
+    calls = []
+
+    def supervisor(func, supervision_context, ignored_attributes, tool_args, tool_kwargs, **kwargs):
+        calls.append(tool_kwargs)
+        return SimpleNamespace(decision="reject")
+
+    supervisor.__name__ = "Stub Supervisor"
+    return cached_supervisor(supervisor), calls
+
+
+def ask(supervisor):
+    def tool(data, order_id):
+        pass
+
+    return supervisor(
+        tool,
+        supervision_context=SimpleNamespace(openai_messages=[]),
+        ignored_attributes=["data"],
+        tool_args=(),
+        tool_kwargs={"data": {}, "order_id": "#W1"},
+        supervision_request_id=None,
+        decision=None,
+    )
+
+
+def test_decisions_are_only_reused_within_an_episode():
+    supervisor, calls = make_supervisor()
+    ask(supervisor)
+    ask(supervisor)
+    # no episode, no cache
+    assert len(calls) == 2
+    for trial in range(2):
+        with caching(VerdictCache(max_reuses=2)) as cache:
+            for _ in range(4):
+                ask(supervisor)
+        # asked, reused twice, asked again
+        assert cache.stats() == {"Stub Supervisor": {"hits": 2, "misses": 2, "hit_rate": 0.5}}
+    assert len(calls) == 2 + 2 * 2
+
+
+@pytest.mark.parametrize("failure", ["raises", "falls back"])
+def test_failed_supervisor_calls_are_not_cached(failure):
+    calls = []
+
+    def supervisor(func, supervision_context, ignored_attributes, tool_args, tool_kwargs, **kwargs):
+        calls.append(tool_kwargs)
+        if len(calls) == 1:
+            if failure == "raises":
+                raise RuntimeError("rate limited")
+            # what llm_supervisor returns when the model call fails
+            return SupervisionDecision(
+                decision=SupervisionDecisionType.ESCALATE,
+                explanation="Error during LLM supervision: rate limited",
+                modified=None,
+            )
+        return SupervisionDecision(decision=SupervisionDecisionType.REJECT, explanation="no", modified=None)
+
+    supervisor.__name__ = "Stub Supervisor"
+    supervisor = cached_supervisor(supervisor)
+    with caching(VerdictCache(max_reuses=2)):
+        if failure == "raises":
+            with pytest.raises(RuntimeError):
+                ask(supervisor)
+        else:
+            assert ask(supervisor).decision == SupervisionDecisionType.ESCALATE
+        decisions = [ask(supervisor).decision for _ in range(3)]
+    assert decisions == [SupervisionDecisionType.REJECT] * 3
+    # the failed call, the verdict, then two reuses of it
+    assert len(calls) == 2
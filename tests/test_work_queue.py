@@ -0,0 +1,116 @@
+# Copyright Sierra
+
+import pytest
+
+from tau_bench.runner import work_queue
+from tau_bench.runner.checkpoint import CheckpointWriter
+from tau_bench.runner.work_queue import DONE, LEASED, PENDING, WorkQueue, run_queue_worker
+from tau_bench.types import EnvRunResult
+
+
+class Clock(object):
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(work_queue.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return WorkQueue(str(tmp_path / "sweep.sqlite"), lease_seconds=60)
+
+
+def test_claims_in_enqueue_order(queue):
+    assert queue.enqueue([(0, 2), (0, 1), (1, 2)]) == 3
+    assert queue.claim("a") == (0, 2)
+    assert queue.claim("b") == (0, 1)
+    assert queue.claim("a") == (1, 2)
+    assert queue.claim("a") is None
+    assert queue.counts() == {PENDING: 0, LEASED: 3, DONE: 0}
+
+
+def test_enqueue_keeps_existing_pairs(queue):
+    queue.enqueue([(0, 0), (0, 1)])
+    queue.claim("a")
+    assert queue.enqueue([(0, 0), (0, 2)]) == 1
+    assert queue.counts() == {PENDING: 2, LEASED: 1, DONE: 0}
+    assert queue.claim("b") == (0, 1)
+
+
+def test_expired_lease_is_reclaimed(queue, clock):
+    queue.enqueue([(0, 0)])
+    assert queue.claim("a") == (0, 0)
+    clock.now += 59
+    assert queue.claim("b") is None
+    clock.now += 2
+    assert queue.claim("b") == (0, 0)
+
+
+def test_complete_needs_a_live_lease(queue, clock):
+    queue.enqueue([(0, 0)])
+    queue.claim("a")
+    clock.now += 61
+    assert not queue.complete("a", (0, 0))
+    assert queue.claim("b") == (0, 0)
+    # the first worker finishing late does not take the pair back
+    assert not queue.complete("a", (0, 0))
+    assert queue.counts() == {PENDING: 0, LEASED: 1, DONE: 0}
+    assert queue.complete("b", (0, 0))
+    assert queue.is_finished()
+
+
+def test_heartbeat_extends_lease(queue, clock):
+    queue.enqueue([(0, 0)])
+    queue.claim("a")
+    clock.now += 50
+    queue.heartbeat("a")
+    clock.now += 50
+    assert queue.claim("b") is None
+    # another worker's heartbeat does not count
+    queue.heartbeat("b")
+    clock.now += 20
+    assert queue.claim("b") == (0, 0)
+
+
+def test_finished_once_everything_is_done(queue):
+    queue.enqueue([(0, 0), (0, 1)])
+    assert not queue.is_finished()
+    for _ in range(2):
+        item = queue.claim("a")
+        assert queue.complete("a", item)
+    assert queue.is_finished()
+    assert queue.counts() == {PENDING: 0, LEASED: 0, DONE: 2}
+
+
+def test_several_queues_share_a_file(tmp_path, clock):
+    path = str(tmp_path / "sweep.sqlite")
+    WorkQueue(path).enqueue([(0, 0), (0, 1)])
+    other = WorkQueue(path)
+    assert other.claim("b") == (0, 0)
+    assert WorkQueue(path).claim("c") == (0, 1)
+
+
+def test_worker_drops_results_whose_lease_was_lost(queue, clock, tmp_path):
+    queue.enqueue([(0, 0), (0, 1)])
+
+    def run_item(item):
+        trial, idx = item
+        if idx == 0:
+            # the episode outlives its lease and another worker takes it
+            clock.now += 61
+            assert queue.claim("b") == (0, 0)
+            assert queue.complete("b", (0, 0))
+        return EnvRunResult(task_id=idx, reward=1.0, info={}, traj=[], trial=trial)
+
+    with CheckpointWriter(str(tmp_path / "shard.ckpt.jsonl")) as writer:
+        results = run_queue_worker(queue, "a", run_item, writer, poll_interval=0)
+    assert [(r.trial, r.task_id) for r in results] == [(0, 1)]
+    assert queue.is_finished()